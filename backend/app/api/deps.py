@@ -7,6 +7,7 @@ from sqlmodel import Session
 from app.api.utils.CustomOAuth2PasswordBearer import CustomOAuth2PasswordBearer
 from app.core.config import settings
 from app.core.db import get_engine
+from app.services.gigachat_client import GigaChatClient, get_gigachat_client
 from app.services.pdf_processor import PDFProcessor
 
 reusable_oauth2 = CustomOAuth2PasswordBearer(
@@ -25,3 +26,5 @@ SessionDep = Annotated[Session, Depends(get_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 PDFProcessorDep = Annotated[PDFProcessor, Depends(get_processor)]
+
+GigaChatClientDep = Annotated[GigaChatClient, Depends(get_gigachat_client)]
@@ -22,7 +22,7 @@ router = APIRouter(
     responses={401: {"model": UnauthorizedMessage}},
 )
 async def login(session: SessionDep, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]) -> Token | HTTPException:
-    user = authenticate_user(session=session, username=form_data.username, password=form_data.password)
+    user = await authenticate_user(session=session, username=form_data.username, password=form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,23 +1,119 @@
 
+import logging
+import time
+
 from fastapi import APIRouter
+from starlette.responses import StreamingResponse
 
-from app.api.deps import SessionDep, PDFProcessorDep
+from app.api.deps import SessionDep, PDFProcessorDep, GigaChatClientDep
 from app.api.schemas import GenerateAnswerQuery
-from app.api.utils.chat_api import user_query_summarizer, create_final_answer
-from app.api.utils.doc_search_query import doc_search_query
+from app.api.utils.chat_api import build_final_answer_prompt, create_final_answer, stream_final_answer
+from app.api.utils.chat_pipeline import ChatPipeline
+from app.api.utils.sse import SSE_HEADERS, sse_event
+from app.core.config import settings
+from app.core.executors import db_executor, inference_executor, run_in_executor
+from app.core.tracing import span
+from app.crud.documents import DocumentCRUD
+from app.services.gigachat_client import GigaChatError
+from app.services.semantic_cache import answer_cache
+
 
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
 
+def _context_chunks() -> int:
+    """Сколько чанков попадает в промпт: после переранжирования достаточно меньшего числа"""
+    return settings.RERANK_TOP_K if settings.RERANK_ENABLED else 5
+
+
 @router.post("/generate_answer")
 async def generate_answer(
     session: SessionDep,
     processor: PDFProcessorDep,
+    llm_client: GigaChatClientDep,
+    qenerate_answer_query: GenerateAnswerQuery
+):
+    started = time.perf_counter()
+    if settings.ANSWER_CACHE_ENABLED:
+        # Близкие по смыслу вопросы уже отвечены - обходимся без LLM и поиска
+        query_embedding = await processor.asearch_query(qenerate_answer_query.query)
+        corpus_version = await run_in_executor(db_executor, DocumentCRUD(session).get_corpus_version)
+        cached = answer_cache.lookup(query_embedding, corpus_version)
+        if cached is not None:
+            return {
+                'summary_query': cached.summary_query,
+                'decision': cached.decision,
+                'timings': {'cache': round(time.perf_counter() - started, 4)},
+            }
+
+    pipeline = ChatPipeline(processor, llm_client, limit=_context_chunks())
+    retrieval = await pipeline.retrieve(qenerate_answer_query.query)
+
+    answer_started = time.perf_counter()
+    with span("pipeline.answer"):
+        # Токенизация контекста - CPU-работа, она не должна блокировать event loop
+        prompt = await run_in_executor(
+            inference_executor, build_final_answer_prompt, qenerate_answer_query.query, retrieval.docs
+        )
+        final_result = await create_final_answer(llm_client, qenerate_answer_query.query, retrieval.docs, prompt)
+    retrieval.timings['answer'] = time.perf_counter() - answer_started
+    retrieval.timings['total'] = time.perf_counter() - started
+
+    if settings.ANSWER_CACHE_ENABLED and retrieval.summary_query is not None:
+        answer_cache.store(query_embedding, corpus_version, retrieval.summary_query, final_result)
+
+    return {
+        'summary_query': retrieval.summary_query,
+        'decision': final_result,
+        'timings': retrieval.timings_breakdown(),
+        'timed_out': retrieval.timed_out,
+        'prompt': prompt.stats(),
+    }
+
+
+@router.post("/generate_answer/stream")
+async def generate_answer_stream(
+    processor: PDFProcessorDep,
+    llm_client: GigaChatClientDep,
     qenerate_answer_query: GenerateAnswerQuery
 ):
-    summary_query = user_query_summarizer(qenerate_answer_query.query)
-    docs = doc_search_query(session, summary_query, processor)
-    final_result = create_final_answer(qenerate_answer_query.query, docs)
+    """
+    Тот же пайплайн, что и generate_answer, но в виде Server-Sent Events:
+    summary -> documents -> token... -> done (или error)
+    """
+    query = qenerate_answer_query.query
+
+    async def events():
+        started = time.perf_counter()
+        try:
+            retrieval = await ChatPipeline(processor, llm_client, limit=_context_chunks()).retrieve(query)
+            yield sse_event("summary", {"summary_query": retrieval.summary_query})
+            yield sse_event("documents", retrieval.docs)
+
+            answer_started = time.perf_counter()
+            prompt = await run_in_executor(inference_executor, build_final_answer_prompt, query, retrieval.docs)
+            decision = []
+            async for token in stream_final_answer(llm_client, query, retrieval.docs, prompt):
+                decision.append(token)
+                yield sse_event("token", {"text": token})
+            retrieval.timings["answer"] = time.perf_counter() - answer_started
+            retrieval.timings["total"] = time.perf_counter() - started
+
+            yield sse_event("done", {
+                "summary_query": retrieval.summary_query,
+                "decision": "".join(decision),
+                "timings": retrieval.timings_breakdown(),
+                "timed_out": retrieval.timed_out,
+                "prompt": prompt.stats(),
+            })
+        except GigaChatError as e:
+            logger.warning("Ошибка GigaChat в потоке ответа: %s", e)
+            yield sse_event("error", {"detail": str(e)})
+        except Exception:
+            # Заголовки 200 уже отправлены: клиент узнает об ошибке только из события
+            logger.exception("Ошибка при генерации потокового ответа")
+            yield sse_event("error", {"detail": "Внутренняя ошибка сервера"})
 
-    return {'summary_query':summary_query, 'decision': final_result}
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
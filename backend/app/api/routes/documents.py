@@ -1,13 +1,14 @@
+import time
 from typing import Optional
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
 
 
 from starlette.responses import JSONResponse
 
 from app.api.deps import SessionDep, PDFProcessorDep
-from app.api.utils.doc_search_query import doc_search_query
-from app.models.documents import SearchQuery
+from app.api.utils.doc_search_query import search_chunks
+from app.models.documents import SearchQuery, SearchResponse, SearchResult
 
 router = APIRouter(prefix="/api/docs", tags=["docs"])
 
@@ -37,12 +38,33 @@ async def parse_docs(
     )
 
 
-@router.post("/search_query")
+@router.post("/search_query", response_model=SearchResponse)
 async def search_query(
     session: SessionDep,
     processor: PDFProcessorDep,
     search: SearchQuery,
+    response: Response,
 ):
-    result = doc_search_query(session, search.query, processor)
+    started = time.perf_counter()
+    outcome = await search_chunks(
+        session,
+        search.query,
+        processor,
+        limit=search.limit,
+        min_similarity=search.min_similarity,
+        ef_search=search.ef_search,
+        probes=search.probes,
+        doc_type=search.doc_type,
+        mode=search.mode,
+        rerank=search.rerank,
+    )
+    # Время каждой стадии поиска видно в DevTools браузера и в логах прокси
+    response.headers["Server-Timing"] = outcome.server_timing()
 
-    return result
+    return SearchResponse(
+        query=search.query,
+        results=[SearchResult.from_row(row) for row in outcome.results],
+        total_found=len(outcome.results),
+        processing_time=round(time.perf_counter() - started, 4),
+        timings={stage: round(seconds, 4) for stage, seconds in outcome.timings.items()},
+    )
@@ -4,6 +4,7 @@ from sqlalchemy.exc import IntegrityError
 
 from app.api.deps import reusable_oauth2, SessionDep
 from app.api.utils.token_utils import get_token_data_or_raise_exception
+from app.core.executors import bcrypt_executor, db_executor, run_in_executor
 from app.core.security import decode_jwt_token, get_password_hash
 from app.models.responses import DetailMessage, UnauthorizedMessage
 from app.models.tokens import TokenData
@@ -33,13 +34,14 @@ async def get_user_info(token: Annotated[str, Depends(reusable_oauth2)]) -> Toke
     responses={409: {"model": DetailMessage}},
 )
 async def create_user(session: SessionDep, user_upload: UserUpload) -> dict[str, str]:
+    hashed_password = await run_in_executor(bcrypt_executor, get_password_hash, password=user_upload.plain_password)
     users_for_write_db = UserInDb(
         **dict(user_upload),
-        hashed_password=get_password_hash(password=user_upload.plain_password),
+        hashed_password=hashed_password,
         photo_file_name="path/to/file"
     )
     try:
-        users.create_user(session=session, user=users_for_write_db)
+        await run_in_executor(db_executor, users.create_user, session=session, user=users_for_write_db)
         return {"status": "created"}
 
     except IntegrityError:
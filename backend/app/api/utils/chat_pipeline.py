@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from app.api.utils.chat_api import user_query_summarizer
+from app.api.utils.doc_search_query import SearchOutcome, reciprocal_rank_fusion, search_chunks
+from app.core.config import settings
+from app.core.tracing import span
+from app.services.gigachat_client import GigaChatClient
+from app.services.pdf_processor import PDFProcessor
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetrievalResult:
+    summary_query: Optional[str]
+    docs: List[dict]
+    # Время стадий в секундах; для поисков добавляются их внутренние стадии: raw_search.embed и т.д.
+    timings: Dict[str, float] = field(default_factory=dict)
+    # Стадии, не уложившиеся в свой дедлайн
+    timed_out: List[str] = field(default_factory=list)
+
+    def timings_breakdown(self) -> Dict[str, float]:
+        return {stage: round(seconds, 4) for stage, seconds in self.timings.items()}
+
+
+class ChatPipeline:
+    """
+    Подготовка контекста для ответа.
+
+    Поиск по исходному вопросу запускается одновременно с суммаризацией, поэтому
+    вызов LLM больше не стоит на критическом пути перед поиском. Когда готова
+    суммаризация, при summary_search выполняется второй поиск по ней, и результаты
+    обоих поисков сливаются RRF. У каждой стадии свой дедлайн, а у всей подготовки -
+    общий: ответ строится по тем поискам, что успели завершиться.
+    """
+
+    def __init__(
+            self,
+            processor: PDFProcessor,
+            llm_client: GigaChatClient,
+            limit: int = 5,
+            summary_search: Optional[bool] = None,
+            summary_timeout: Optional[float] = None,
+            search_timeout: Optional[float] = None,
+            retrieval_deadline: Optional[float] = None,
+    ):
+        self.processor = processor
+        self.llm_client = llm_client
+        self.limit = limit
+        self.summary_search = settings.PIPELINE_SUMMARY_SEARCH if summary_search is None else summary_search
+        self.summary_timeout = summary_timeout or settings.PIPELINE_SUMMARY_TIMEOUT
+        self.search_timeout = search_timeout or settings.PIPELINE_SEARCH_TIMEOUT
+        self.retrieval_deadline = retrieval_deadline or settings.PIPELINE_RETRIEVAL_DEADLINE
+
+    async def retrieve(self, query: str) -> RetrievalResult:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + self.retrieval_deadline
+        result = RetrievalResult(summary_query=None, docs=[])
+
+        searches = {"raw_search": (loop.time(), asyncio.create_task(self._search(query)))}
+        summary_task = asyncio.create_task(self._timed(result, "summary", user_query_summarizer(self.llm_client, query)))
+
+        try:
+            summary_timeout = min(self.summary_timeout, deadline - loop.time())
+            result.summary_query = await asyncio.wait_for(summary_task, summary_timeout)
+        except asyncio.TimeoutError:
+            result.timed_out.append("summary")
+        except BaseException:
+            for _, task in searches.values():
+                task.cancel()
+            raise
+
+        if self.summary_search and result.summary_query and result.summary_query.strip() != query.strip():
+            searches["summary_search"] = (loop.time(), asyncio.create_task(self._search(result.summary_query)))
+
+        outcomes = await self._collect(searches, result, deadline)
+        if outcomes:
+            start = time.perf_counter()
+            result.docs = reciprocal_rank_fusion(
+                [outcome.results for outcome in outcomes], k=settings.HYBRID_RRF_K, limit=self.limit
+            ) if len(outcomes) > 1 else outcomes[0].results
+            result.timings["merge"] = time.perf_counter() - start
+
+        result.timings["retrieval"] = loop.time() - started
+        return result
+
+    async def _collect(
+            self,
+            searches: Dict[str, Tuple[float, asyncio.Task]],
+            result: RetrievalResult,
+            deadline: float
+    ) -> List[SearchOutcome]:
+        """Ждет поиски до их дедлайнов (от момента запуска поиска); опоздавшие отменяются, упавшие пропускаются"""
+        loop = asyncio.get_running_loop()
+        outcomes = []
+        for stage, (started, task) in searches.items():
+            timeout = max(0.0, min(started + self.search_timeout, deadline) - loop.time())
+            try:
+                outcome, seconds = await asyncio.wait_for(task, timeout)
+            except asyncio.TimeoutError:
+                result.timed_out.append(stage)
+                continue
+            except Exception as e:
+                logger.warning("Ошибка стадии %s: %s", stage, e)
+                continue
+
+            result.timings[stage] = seconds
+            for sub_stage, seconds in outcome.timings.items():
+                result.timings[f"{stage}.{sub_stage}"] = seconds
+            outcomes.append(outcome)
+        return outcomes
+
+    async def _search(self, query: str) -> Tuple[SearchOutcome, float]:
+        # Сессия не передается: поиск отменяется по дедлайну, а запрос к БД в этот
+        # момент еще идет в потоке db_executor - там же сессия открывается и закрывается
+        start = time.perf_counter()
+        with span("pipeline.search"):
+            outcome = await search_chunks(None, query, self.processor, limit=self.limit)
+        return outcome, time.perf_counter() - start
+
+    @staticmethod
+    async def _timed(result: RetrievalResult, stage: str, coro):
+        start = time.perf_counter()
+        try:
+            with span(f"pipeline.{stage}"):
+                return await coro
+        finally:
+            result.timings[stage] = time.perf_counter() - start
@@ -1,12 +1,134 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
 from sqlmodel import Session
 
+from app.core.config import settings
+from app.core.db import get_engine
+from app.core.executors import db_executor, inference_executor, run_in_executor
+from app.core.tracing import span
 from app.crud.documents import DocumentChunkCRUD
 from app.services.pdf_processor import PDFProcessor
+from app.services.reranker import RerankStats, get_reranker
+
+
+@dataclass
+class SearchOutcome:
+    results: List[dict]
+    # Время каждой стадии поиска в секундах: embed, vector, lexical, fusion, rerank
+    timings: Dict[str, float] = field(default_factory=dict)
+    rerank_stats: Optional[RerankStats] = None
+
+    def server_timing(self) -> str:
+        """Значение заголовка Server-Timing"""
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.timings.items())
+
+
+def reciprocal_rank_fusion(result_lists: List[List[dict]], k: int = 60, limit: int = 5) -> List[dict]:
+    """
+    Слияние ранжированных списков: score = сумма 1 / (k + позиция) по спискам,
+    где встретился чанк. Поля чанка из разных списков объединяются.
+    """
+    scores: Dict = {}
+    merged: Dict = {}
+    for results in result_lists:
+        for position, row in enumerate(results, start=1):
+            scores[row["id"]] = scores.get(row["id"], 0.0) + 1.0 / (k + position)
+            merged.setdefault(row["id"], {}).update(row)
+
+    ranked = sorted(scores, key=scores.get, reverse=True)[:limit]
+    return [{**merged[chunk_id], "score": scores[chunk_id]} for chunk_id in ranked]
+
+
+async def _timed(timings: Dict[str, float], stage: str, coro):
+    start = time.perf_counter()
+    try:
+        with span(f"search.{stage}"):
+            return await coro
+    finally:
+        timings[stage] = time.perf_counter() - start
+
+
+async def _vector_leg(
+        session: Optional[Session],
+        query: str,
+        processor: PDFProcessor,
+        timings: Dict[str, float],
+        **search_params,
+) -> List[dict]:
+    query_embedding = await _timed(timings, "embed", processor.asearch_query(query))
+    search = DocumentChunkCRUD(session).search_similar_chunks_sqlmodel if session is not None else _vector_search
+    return await _timed(timings, "vector", run_in_executor(db_executor, search, query_embedding, **search_params))
+
+
+def _vector_search(query_embedding: List[float], **search_params) -> List[dict]:
+    # Сессия живет только в потоке БД: если поиск отменят по дедлайну, поток
+    # доработает запрос и сам закроет сессию, event loop ее не трогает
+    with Session(get_engine()) as session:
+        return DocumentChunkCRUD(session).search_similar_chunks_sqlmodel(query_embedding, **search_params)
+
+
+def _lexical_search(query: str, limit: int, doc_type: Optional[str]) -> List[dict]:
+    # Своя сессия: лексический поиск идет параллельно с векторным в другом потоке
+    with Session(get_engine()) as session:
+        return DocumentChunkCRUD(session).search_lexical_chunks(query, limit=limit, doc_type=doc_type)
+
+
+def _rerank(query: str, results: List[dict], top_k: int) -> Tuple[List[dict], RerankStats]:
+    # Модель загружается в потоке инференса, если ее не загрузили при старте приложения
+    return get_reranker().rerank(query, results, top_k)
+
+
+async def search_chunks(
+        session: Optional[Session],
+        query: str,
+        processor: PDFProcessor,
+        limit: int = 5,
+        min_similarity: float = 0.3,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        doc_type: Optional[str] = None,
+        mode: Optional[str] = None,
+        rerank: Optional[bool] = None,
+) -> SearchOutcome:
+    """
+    Поиск чанков: vector (эмбеддинги), lexical (tsvector) или hybrid - оба поиска
+    выполняются одновременно и сливаются reciprocal rank fusion.
+    С rerank из RERANK_CANDIDATES кандидатов кросс-энкодер оставляет limit лучших.
+    Без session векторный поиск открывает свою сессию в потоке БД - так делают
+    вызовы, которые могут отменить по дедлайну.
+    """
+    mode = mode or settings.SEARCH_MODE
+    rerank = settings.RERANK_ENABLED if rerank is None else rerank
+    timings: Dict[str, float] = {}
+
+    # Сколько строк вернуть из поиска (после слияния) и сколько взять от каждого вида поиска
+    retrieve = max(limit, settings.RERANK_CANDIDATES) if rerank else limit
+    candidates = retrieve if mode != "hybrid" else max(retrieve, settings.HYBRID_CANDIDATES)
 
+    legs = []
+    if mode in ("vector", "hybrid"):
+        legs.append(_vector_leg(
+            session, query, processor, timings,
+            limit=candidates, min_similarity=min_similarity, doc_type=doc_type, ef_search=ef_search, probes=probes,
+        ))
+    if mode in ("lexical", "hybrid"):
+        legs.append(_timed(timings, "lexical", run_in_executor(db_executor, _lexical_search, query, candidates, doc_type)))
+    result_lists = await asyncio.gather(*legs)
 
-def doc_search_query(session: Session, query: str, processor: PDFProcessor):
-    query_embedding = processor.search_query(query)
+    if mode != "hybrid":
+        results = result_lists[0]
+    else:
+        start = time.perf_counter()
+        with span("search.fusion"):
+            results = reciprocal_rank_fusion(result_lists, k=settings.HYBRID_RRF_K, limit=retrieve)
+        timings["fusion"] = time.perf_counter() - start
 
-    document_crud = DocumentChunkCRUD(session)
-    result = document_crud.search_similar_chunks_sqlmodel(query_embedding)
-    return result
+    outcome = SearchOutcome(results=results, timings=timings)
+    if rerank and results:
+        outcome.results, outcome.rerank_stats = await _timed(timings, "rerank", run_in_executor(
+            inference_executor, _rerank, query, results, limit
+        ))
+    return outcome
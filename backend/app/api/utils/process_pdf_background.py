@@ -1,34 +1,48 @@
-from sqlmodel import Session
-from app.core.db import get_engine
-from app.services.pdf_processor import PDFProcessor
+import logging
+from typing import Optional
 
-def process_pdf_background(title, doc_type, doc_number, source_url):
+from app.services.ingestion import IngestionJob, IngestionRunner, IngestionSummary, log_summary
+
+
+logger = logging.getLogger(__name__)
+
+
+BAZA_DOC_DIR = './app/services/baza_doc/'
+
+DEFAULT_FILE_LIST = [
+    'SP-54.pdf',
+    'глава-4-ЖК-РФ.pdf',
+    'Постановление Правительства РФ от 28.01.2006 N 47.pdf',
+    #'СП 255.1325800.2016.pdf'
+    'СанПин.pdf'
+]
+
+
+def process_pdf_background(
+        title,
+        doc_type,
+        doc_number,
+        source_url,
+        file_path_list: Optional[list[str]] = None,
+        parse_workers: Optional[int] = None,
+        embed_workers: int = 1,
+        incremental: bool = False,
+) -> IngestionSummary:
     """Фоновая задача для обработки PDF"""
 
-    file_path_list = [
-        'SP-54.pdf',
-        'глава-4-ЖК-РФ.pdf',
-        'Постановление Правительства РФ от 28.01.2006 N 47.pdf',
-        #'СП 255.1325800.2016.pdf'
-        'СанПин.pdf'
+    jobs = [
+        IngestionJob(
+            file_path=BAZA_DOC_DIR + file_path,
+            title=file_path,
+            doc_type=doc_type,
+            doc_number=file_path,
+            source_url=source_url,
+        )
+        for file_path in (file_path_list or DEFAULT_FILE_LIST)
     ]
 
-    for file_path in file_path_list:
-        with open('./app/services/baza_doc/' + file_path, "rb") as f:
-            file_binary = f.read()
-        # Создаем новую сессию внутри фоновой задачи
-        with Session(get_engine()) as session:
-            try:
-                print('Обработка...')
-                processor = PDFProcessor()
-                document = processor.save_doc_and_embeddings_to_database(
-                    session=session,
-                    file_binary=file_binary,
-                    title=file_path,
-                    doc_type=doc_type,
-                    doc_number=file_path,
-                    source_url=source_url
-                )
-                print(f"PDF обработан: {document.title}, чанков: {len(document.chunks)}")
-            except Exception as e:
-                print(f"Ошибка обработки PDF: {str(e)}")
+    logger.info("Загрузка документов: %d", len(jobs))
+    runner = IngestionRunner(parse_workers=parse_workers, embed_workers=embed_workers, incremental=incremental)
+    summary = runner.run(jobs)
+    log_summary(summary)
+    return summary
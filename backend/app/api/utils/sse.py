@@ -0,0 +1,15 @@
+import json
+from typing import Any
+
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # Отключает буферизацию ответа в nginx для этого запроса
+    "X-Accel-Buffering": "no",
+}
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Форматирует одно событие Server-Sent Events"""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
@@ -70,8 +70,117 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    # Пул соединений с БД (один engine на процесс)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 30_000
+
+    # Пулы потоков для блокирующей работы (инференс, bcrypt, синхронный SQLAlchemy)
+    INFERENCE_THREADS: int = 2
+    BCRYPT_THREADS: int = 4
+    DB_THREADS: int = 15
+    EVENT_LOOP_LAG_INTERVAL: float = 0.5
+
+    # Трейсы OpenTelemetry (пакеты opentelemetry-sdk и opentelemetry-exporter-otlp-proto-http);
+    # метрики Prometheus на /metrics собираются всегда. Без endpoint - OTEL_EXPORTER_OTLP_ENDPOINT из окружения
+    OTEL_ENABLED: bool = False
+    OTEL_SERVICE_NAME: str | None = None
+    OTEL_EXPORTER_OTLP_ENDPOINT: str | None = None
+
+    # ANN-индекс по document_chunks.embedding (pgvector)
+    VECTOR_INDEX_TYPE: Literal["hnsw", "ivfflat"] = "hnsw"
+    HNSW_M: int = 16
+    HNSW_EF_CONSTRUCTION: int = 64
+    IVFFLAT_LISTS: int = 100
+    # Итеративное сканирование индекса при фильтрах по документу (pgvector >= 0.8, для старых версий - off)
+    VECTOR_ITERATIVE_SCAN: Literal["off", "strict_order", "relaxed_order"] = "relaxed_order"
+
+    # Поиск чанков: vector, lexical (tsvector) или hybrid (оба с reciprocal rank fusion)
+    SEARCH_MODE: Literal["vector", "lexical", "hybrid"] = "hybrid"
+    # Кандидатов от каждого вида поиска для слияния и константа k формулы RRF
+    HYBRID_CANDIDATES: int = 20
+    HYBRID_RRF_K: int = 60
+
+    # Переранжирование кросс-энкодером: из RERANK_CANDIDATES кандидатов остаются лучшие
+    RERANK_ENABLED: bool = False
+    RERANK_MODEL_NAME: str = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+    RERANK_DEVICE: str = "cpu"
+    RERANK_MAX_LENGTH: int = 512
+    RERANK_CANDIDATES: int = 20
+    RERANK_BATCH_SIZE: int = 16
+    # Сколько чанков после переранжирования уходит в промпт GigaChat
+    RERANK_TOP_K: int = 3
+    # Бюджет на переранжирование; None - без ограничения
+    RERANK_LATENCY_BUDGET_MS: float | None = 300.0
+
+    # Бэкенд извлечения текста PDF: auto - быстрый бэкенд с постраничным откатом на pdfplumber
+    PDF_TEXT_BACKEND: Literal["auto", "pypdf", "pdfminer", "pdfplumber"] = "auto"
+    PDF_FAST_TEXT_BACKEND: Literal["pypdf", "pdfminer"] = "pypdf"
+
+    # Параллельное извлечение текста больших PDF по диапазонам страниц (1 - без пула процессов)
+    PDF_EXTRACT_WORKERS: int = 1
+    PDF_PARALLEL_MIN_PAGES: int = 200
+    PDF_PAGES_PER_TASK: int = 50
+
+    # Разбивка на чанки: clause - по пунктам нормативного документа в пределах бюджета
+    # токенов модели эмбеддингов, window - окно 400 слов с перекрытием 50
+    CHUNKING_STRATEGY: Literal["clause", "window"] = "clause"
+    # Не больше max_seq_length модели (256 у all-MiniLM-L6-v2), иначе хвост чанка не попадет в эмбеддинг
+    CHUNK_MAX_TOKENS: int = 256
+
+    # Каталог хранилища исходных файлов документов (адресация по SHA256)
+    BLOB_STORE_DIR: str = "./data/blobs"
+
+    # Размер пачки при массовой вставке чанков
+    INGEST_BATCH_SIZE: int = 500
+
     CHAT_TOKEN: str
 
+    # Клиент GigaChat; для нагрузочных тестов адреса указывают на benchmarks.gigachat_stub
+    GIGACHAT_OAUTH_URL: str = "https://ngw.devices.sberbank.ru:9443/api/v2/oauth"
+    GIGACHAT_API_URL: str = "https://gigachat.devices.sberbank.ru/api/v1"
+    GIGACHAT_SCOPE: str = "GIGACHAT_API_PERS"
+    GIGACHAT_TIMEOUT: float = 60.0
+    GIGACHAT_MAX_RETRIES: int = 3
+    GIGACHAT_MAX_CONCURRENCY: int = 16
+    GIGACHAT_VERIFY_SSL: bool = False
+
+    # Пайплайн generate_answer: поиск по вопросу идет одновременно с суммаризацией,
+    # затем (PIPELINE_SUMMARY_SEARCH) поиск по суммаризации; дедлайны в секундах
+    PIPELINE_SUMMARY_SEARCH: bool = True
+    PIPELINE_SUMMARY_TIMEOUT: float = 15.0
+    PIPELINE_SEARCH_TIMEOUT: float = 5.0
+    PIPELINE_RETRIEVAL_DEADLINE: float = 20.0
+
+    # Промпт ответа: бюджет токенов на фрагменты документов. Токены считаются
+    # токенизатором PROMPT_TOKENIZER_NAME (Hugging Face), без него - по числу символов
+    PROMPT_CONTEXT_TOKEN_BUDGET: int = 2000
+    PROMPT_TOKENIZER_NAME: str | None = None
+    PROMPT_CHARS_PER_TOKEN: float = 3.0
+
+    # Семантический кэш ответов generate_answer
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95
+    ANSWER_CACHE_TTL_SECONDS: float = 3600.0
+    ANSWER_CACHE_MAX_ENTRIES: int = 1000
+
+    # Модель эмбеддингов (загружается один раз на процесс при старте приложения)
+    EMBEDDING_MODEL_NAME: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_DEVICE: str = "cpu"
+    EMBEDDING_WARMUP: bool = True
+
+    # Микро-батчинг эмбеддингов конкурентных поисковых запросов
+    EMBEDDING_BATCHING_ENABLED: bool = True
+    EMBEDDING_BATCH_MAX_SIZE: int = 32
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 5.0
+
+    # Кэш эмбеддингов поисковых запросов; Redis (пакет redis) - общий кэш для всех воркеров
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 10_000
+    EMBEDDING_CACHE_REDIS_URL: str | None = None
+    EMBEDDING_CACHE_REDIS_TTL_SECONDS: int = 60 * 60 * 24
+
     def _check_default_secret(self, var_name: str, value: str | None) -> None:
         if value == "changethis" or not value:
             message = (
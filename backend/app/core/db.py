@@ -1,16 +1,142 @@
-from sqlalchemy import text
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import Engine, QueuePool, inspect, text
 from sqlmodel import create_engine, SQLModel
 
 import app.models
 from app.core.config import settings
+from app.core.metrics import DB_POOL_CHECKED_OUT, DB_POOL_CHECKOUT_WAIT, DB_POOL_SATURATION
+
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool, который замеряет время ожидания свободного соединения"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+
+VECTOR_INDEX_NAME = "ix_document_chunks_embedding_ann"
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+# Ревизии до и после схемы, которую раньше создавал SQLModel.metadata.create_all
+VECTOR_EXTENSION_REVISION = "3f2a9c1d7b40"
+BASELINE_REVISION = "1c7e5a0b9d24"
+# Ключ pg_advisory_xact_lock: воркеры, стартующие одновременно, мигрируют схему по очереди
+MIGRATION_LOCK_KEY = 7_310_452_118
+
+_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine(echo=False) -> Engine:
+    """Возвращает единственный на процесс engine с общим пулом соединений"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = _create_engine(echo=echo)
+    return _engine
+
+
+def init_db(rebuild: bool = False) -> None:
+    """
+    Однократная подготовка БД при старте: схема приводится к последней ревизии
+    Alembic. rebuild - откатить все ревизии и применить заново (данные удаляются).
+    """
+    migrate_db(rebuild=rebuild)
+
+    logger.info("Схема БД обновлена до последней ревизии")
+
+
+def alembic_config():
+    from alembic.config import Config
+
+    config = Config(str(ALEMBIC_INI))
+    # Путь к миграциям не зависит от текущего каталога
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "migrations"))
+    return config
+
+
+def migrate_db(rebuild: bool = False) -> None:
+    """Схемой владеет только Alembic: alembic upgrade head (с rebuild - сначала downgrade base)"""
+    from alembic import command
+    from alembic.runtime.migration import MigrationContext
+
+    config = alembic_config()
+    with get_engine().begin() as conn:
+        # Построение индексов на большой таблице дольше statement_timeout приложения
+        conn.execute(text("SET LOCAL statement_timeout = 0"))
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        config.attributes["connection"] = conn
+        # Миграции с данными не импортируют настройки приложения: каталог передается явно
+        config.attributes["blob_store_dir"] = settings.BLOB_STORE_DIR
+
+        current = MigrationContext.configure(conn).get_current_revision()
+        if current in (None, VECTOR_EXTENSION_REVISION) and inspect(conn).has_table("documents"):
+            # Таблицы созданы create_all до перехода на миграции: их схема - базовая ревизия
+            command.stamp(config, BASELINE_REVISION)
+        if rebuild:
+            command.downgrade(config, "base")
+        command.upgrade(config, "head")
+
+
+def vector_index_ddl(index_type: Optional[str] = None) -> str:
+    """DDL ANN-индекса по косинусному расстоянию для document_chunks.embedding"""
+    index_type = index_type or settings.VECTOR_INDEX_TYPE
+    if index_type == "hnsw":
+        params = f"m = {settings.HNSW_M}, ef_construction = {settings.HNSW_EF_CONSTRUCTION}"
+    elif index_type == "ivfflat":
+        params = f"lists = {settings.IVFFLAT_LISTS}"
+    else:
+        raise ValueError(f"Неизвестный тип векторного индекса: {index_type}")
+
+    return (
+        f"CREATE INDEX IF NOT EXISTS {VECTOR_INDEX_NAME} ON document_chunks "
+        f"USING {index_type} (embedding vector_cosine_ops) WITH ({params})"
+    )
+
+
+def create_vector_index(conn, index_type: Optional[str] = None) -> None:
+    """
+    Пересоздает ANN-индекс. IVFFlat подбирает центроиды по имеющимся данным,
+    поэтому его нужно строить после загрузки корпуса.
+    """
+    conn.execute(text(f"DROP INDEX IF EXISTS {VECTOR_INDEX_NAME}"))
+    conn.execute(text(vector_index_ddl(index_type)))
+
+
+def ensure_vector_index(conn, index_type: Optional[str] = None) -> None:
+    """Создает ANN-индекс, если его нет; существующий индекс не трогает, поиск не прерывается"""
+    conn.execute(text(vector_index_ddl(index_type)))
+
 
+def _create_engine(echo: bool) -> Engine:
+    engine = create_engine(
+        url=str(settings.SQLALCHEMY_DATABASE_URI),
+        echo=echo,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"},
+    )
 
-def get_engine(echo=False):
-    engine = create_engine(url=str(settings.SQLALCHEMY_DATABASE_URI), echo=echo)
-    # Получаем сырое соединение из engine
-    with engine.connect() as conn:
-        conn.execute(text('CREATE EXTENSION IF NOT EXISTS vector'))
-        conn.commit()
+    # Метрики пула считаются в момент чтения /metrics
+    pool = engine.pool
+    capacity = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    DB_POOL_CHECKED_OUT.set_function(pool.checkedout)
+    DB_POOL_SATURATION.set_function(lambda: pool.checkedout() / capacity if capacity else 0.0)
 
-        print("✅ Расширение vector включено")
     return engine
@@ -0,0 +1,41 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from app.core.config import settings
+from app.core.metrics import EVENT_LOOP_LAG
+
+
+T = TypeVar("T")
+
+# Отдельные ограниченные пулы для каждого вида блокирующей работы,
+# чтобы медленный инференс не занимал потоки, нужные для БД и наоборот
+inference_executor = ThreadPoolExecutor(max_workers=settings.INFERENCE_THREADS, thread_name_prefix="inference")
+bcrypt_executor = ThreadPoolExecutor(max_workers=settings.BCRYPT_THREADS, thread_name_prefix="bcrypt")
+db_executor = ThreadPoolExecutor(max_workers=settings.DB_THREADS, thread_name_prefix="db")
+
+
+async def run_in_executor(executor: Executor, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Выполняет блокирующий вызов в указанном пуле, не занимая event loop.
+    Контекст (в том числе текущий span трейса) переносится в поток, как в asyncio.to_thread.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor, functools.partial(context.run, func, *args, **kwargs))
+
+
+async def monitor_event_loop_lag(interval: float) -> None:
+    """Фоновая задача: насколько позже запланированного просыпается event loop"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - start - interval))
+
+
+def shutdown_executors() -> None:
+    for executor in (inference_executor, bcrypt_executor, db_executor):
+        executor.shutdown(wait=False, cancel_futures=True)
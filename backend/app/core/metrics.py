@@ -0,0 +1,66 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+
+# Пул соединений с БД
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Время ожидания свободного соединения в пуле",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Количество выданных из пула соединений",
+)
+DB_POOL_SATURATION = Gauge(
+    "db_pool_saturation_ratio",
+    "Доля занятых соединений от pool_size + max_overflow",
+)
+
+# Кэш эмбеддингов запросов
+EMBEDDING_CACHE_REQUESTS = Counter(
+    "embedding_cache_requests_total",
+    "Обращения к кэшу эмбеддингов запросов",
+    ["result"],
+)
+EMBEDDING_CACHE_EVICTIONS = Counter(
+    "embedding_cache_evictions_total",
+    "Вытеснения из локального кэша эмбеддингов запросов",
+)
+
+# Event loop
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "Задержка пробуждения event loop относительно запланированного времени",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+# HTTP-запросы и стадии обработки (app.core.tracing)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Длительность HTTP-запроса до отправки последнего байта ответа",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0),
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Запросы, обрабатываемые в данный момент",
+    ["method"],
+)
+STAGE_DURATION = Histogram(
+    "stage_duration_seconds",
+    "Длительность стадии обработки: кодирование запроса, SQL-поиск, вызовы GigaChat, стадии загрузки",
+    ["stage"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+STAGE_ERRORS = Counter(
+    "stage_errors_total",
+    "Стадии, завершившиеся исключением (в том числе отменой по дедлайну)",
+    ["stage", "error"],
+)
+
+# Клиент GigaChat
+GIGACHAT_FAILED_ATTEMPTS = Counter(
+    "gigachat_failed_attempts_total",
+    "Неудачные попытки запросов к GigaChat (повторяются до max_retries) по причине: transport, 401 или HTTP-статус",
+    ["reason"],
+)
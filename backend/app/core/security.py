@@ -5,6 +5,7 @@ from jwt.exceptions import InvalidTokenError
 
 from app.api.deps import SessionDep
 from app.core.config import settings
+from app.core.executors import bcrypt_executor, db_executor, run_in_executor
 from app.crud.users import get_user_by_username
 from app.models.users import UserInDb
 from app.models.tokens import TokenData
@@ -34,11 +35,14 @@ def get_password_hash(password: str) -> str:
     return __bytes_to_string(hashed_password)
 
 
-def authenticate_user(session: SessionDep, username: str, password: str) -> UserInDb | None:
-    user = get_user_by_username(session=session, username=username)
+async def authenticate_user(session: SessionDep, username: str, password: str) -> UserInDb | None:
+    user = await run_in_executor(db_executor, get_user_by_username, session=session, username=username)
     if user is None:
         return None
-    if not verify_password(plain_password=password, hashed_password=user.hashed_password):
+    is_valid = await run_in_executor(
+        bcrypt_executor, verify_password, plain_password=password, hashed_password=user.hashed_password
+    )
+    if not is_valid:
         return None
     return user
 
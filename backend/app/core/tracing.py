@@ -0,0 +1,126 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from app.core.config import settings
+from app.core.metrics import HTTP_REQUESTS_IN_PROGRESS, HTTP_REQUEST_DURATION, STAGE_DURATION, STAGE_ERRORS
+
+
+logger = logging.getLogger(__name__)
+
+# Трейсер OpenTelemetry; None - трейсы не собираются, остаются только метрики Prometheus
+_tracer = None
+
+
+def setup_tracing() -> None:
+    """Включает экспорт трейсов OpenTelemetry по OTLP/HTTP, если задан OTEL_ENABLED"""
+    global _tracer
+    if not settings.OTEL_ENABLED or _tracer is not None:
+        return
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError as e:
+        raise RuntimeError(
+            "Для OTEL_ENABLED нужны пакеты opentelemetry-sdk и opentelemetry-exporter-otlp-proto-http"
+        ) from e
+
+    provider = TracerProvider(resource=Resource.create({"service.name": settings.OTEL_SERVICE_NAME or settings.PROJECT_NAME}))
+    exporter = OTLPSpanExporter(endpoint=settings.OTEL_EXPORTER_OTLP_ENDPOINT) if settings.OTEL_EXPORTER_OTLP_ENDPOINT \
+        else OTLPSpanExporter()
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("app")
+    logger.info("Трейсы OpenTelemetry включены")
+
+
+def shutdown_tracing() -> None:
+    global _tracer
+    if _tracer is not None:
+        from opentelemetry import trace
+        trace.get_tracer_provider().shutdown()
+        _tracer = None
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    STAGE_DURATION.labels(stage=stage).observe(seconds)
+
+
+@contextmanager
+def _otel_span(name: str, attributes: Dict[str, Any]) -> Iterator[Optional[Any]]:
+    if _tracer is None:
+        yield None
+        return
+    # Исключение записывается в span и помечает его ошибкой
+    with _tracer.start_as_current_span(name, attributes=attributes) as otel_span:
+        yield otel_span
+
+
+@contextmanager
+def span(stage: str, **attributes: Any) -> Iterator[Optional[Any]]:
+    """
+    Стадия обработки: длительность попадает в гистограмму stage_duration_seconds,
+    а при включенном OpenTelemetry - еще и в дочерний span текущего трейса.
+    Не использовать вокруг yield в генераторах: контекст трейса должен
+    открываться и закрываться в одной задаче.
+    """
+    start = time.perf_counter()
+    try:
+        with _otel_span(stage, attributes) as otel_span:
+            yield otel_span
+    except BaseException as e:
+        STAGE_ERRORS.labels(stage=stage, error=type(e).__name__).inc()
+        raise
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI-middleware: длительность и статус каждого HTTP-запроса по шаблону маршрута
+    и корневой span запроса. Чистый ASGI, чтобы не буферизовать потоковые ответы:
+    длительность SSE-ответа считается до отправки последнего байта.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        HTTP_REQUESTS_IN_PROGRESS.labels(method=method).inc()
+        attributes = {"http.method": method, "http.target": scope["path"]}
+        try:
+            with _otel_span(f"{method} {scope['path']}", attributes) as otel_span:
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    if otel_span is not None:
+                        otel_span.update_name(f"{method} {self._route(scope)}")
+                        otel_span.set_attribute("http.status_code", status["code"])
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.labels(method=method).dec()
+            HTTP_REQUEST_DURATION.labels(method=method, route=self._route(scope), status=str(status["code"])).observe(
+                time.perf_counter() - start
+            )
+
+    @staticmethod
+    def _route(scope: Dict[str, Any]) -> str:
+        # Шаблон маршрута (/users/{user_id}), а не путь - иначе число меток не ограничено
+        route = scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
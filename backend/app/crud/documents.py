@@ -2,12 +2,68 @@ from sqlmodel import Session, select, update, and_, desc
 from datetime import datetime
 
 
-from sqlalchemy import Update, func
-from typing import List, Optional
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import Float, Integer, String, Update, bindparam, delete, func, insert, literal, text
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from typing import Iterable, List, Optional
 import uuid
+from app.core.config import settings
+from app.core.tracing import span
+from app.models.chunks import TextChunk
 from app.models.documents import Document, DocumentChunk, DocumentCreate, DocumentResponse
 
 
+# Расстояние считается один раз во внутреннем запросе, который идет по ANN-индексу с фильтрами
+# документа; порог применяется к уже отобранным ближайшим соседям, а внешний ORDER BY
+# восстанавливает точный порядок после relaxed_order. Текст запроса неизменен, поэтому
+# psycopg после нескольких выполнений на соединении использует серверный prepared statement.
+SEARCH_SIMILAR_CHUNKS_SQL = text("""
+    WITH nearest AS MATERIALIZED (
+        SELECT c.id, c.document_id, c.chunk_index, c.content, c.page_number, c.clause_number,
+               d.title AS document_title, d.doc_number,
+               c.embedding <=> CAST(:query_embedding AS vector) AS distance
+        FROM document_chunks c
+        JOIN documents d ON d.id = c.document_id
+        WHERE d.is_active
+          AND (:doc_type IS NULL OR d.doc_type = :doc_type)
+        ORDER BY distance
+        LIMIT :limit
+    )
+    SELECT id, document_id, chunk_index, content, page_number, clause_number, document_title, doc_number, distance
+    FROM nearest
+    WHERE distance <= :max_distance
+    ORDER BY distance
+""").bindparams(
+    bindparam("query_embedding", type_=Vector(384)),
+    bindparam("max_distance", type_=Float),
+    bindparam("doc_type", type_=String),
+    bindparam("limit", type_=Integer),
+).columns(distance=Float)
+
+# Лексический поиск по tsvector (GIN-индекс): слова запроса объединяются через ИЛИ,
+# ts_rank_cd поднимает чанки, где совпало больше слов и они стоят рядом.
+# Идентификаторы вида 54.13330 и 5.2.1 парсер tsvector сохраняет целиком
+SEARCH_LEXICAL_CHUNKS_SQL = text("""
+    SELECT c.id, c.document_id, c.chunk_index, c.content, c.page_number, c.clause_number,
+           d.title AS document_title, d.doc_number,
+           ts_rank_cd(c.search_vector, q.query) AS rank
+    FROM document_chunks c
+    JOIN documents d ON d.id = c.document_id
+    CROSS JOIN (
+        SELECT CAST(replace(CAST(plainto_tsquery('russian', :query) AS TEXT), '&', '|') AS tsquery) AS query
+    ) q
+    WHERE c.search_vector @@ q.query
+      AND d.is_active
+      AND (:doc_type IS NULL OR d.doc_type = :doc_type)
+    ORDER BY rank DESC
+    LIMIT :limit
+""").bindparams(
+    bindparam("query", type_=String),
+    bindparam("doc_type", type_=String),
+    bindparam("limit", type_=Integer),
+).columns(rank=Float)
+
+
 class DocumentCRUD:
     def __init__(self, session: Session):
         self.session = session
@@ -21,6 +77,13 @@ class DocumentCRUD:
         self.session.refresh(document_data)
         return document_data
 
+    def add_document(self, document_data: DocumentCreate) -> Document:
+        """Добавляет документ в текущую транзакцию без коммита"""
+        document = Document(**document_data.model_dump())
+        self.session.add(document)
+        self.session.flush()
+        return document
+
     # READ операции
     def get_document_by_title(self, title: str) -> Optional[Document]:
         """Получает документ по точному совпадению title"""
@@ -37,6 +100,21 @@ class DocumentCRUD:
         statement = select(Document).where(Document.doc_type == doc_type)
         return list(self.session.exec(statement).all())
 
+    def get_document_version(self, title: str) -> Optional[tuple[uuid.UUID, str]]:
+        """ID и file_hash документа по title, без загрузки файла и текста"""
+        statement = select(Document.id, Document.file_hash).where(Document.title == title)
+        return self.session.exec(statement).first()
+
+    def get_corpus_version(self) -> str:
+        """Версия корпуса: хеш от отсортированных file_hash всех документов"""
+        statement = select(
+            func.md5(func.coalesce(
+                func.string_agg(Document.file_hash, aggregate_order_by(literal(','), Document.file_hash)),
+                ''
+            ))
+        )
+        return self.session.exec(statement).one()
+
     # UPDATE операции
     def update_document_by_title(self, title: str, update_data: dict) -> Optional[Document]:
         """Обновляет документ по title"""
@@ -54,6 +132,19 @@ class DocumentCRUD:
         self.session.refresh(document)
         return document
 
+    def update_document_content(self, document_id: uuid.UUID, document_data: DocumentCreate) -> Document:
+        """Заменяет файл и метаданные документа в текущей транзакции без коммита"""
+        document = self.session.get(Document, document_id)
+        for key, value in document_data.model_dump(exclude_unset=True).items():
+            if hasattr(document, key):
+                setattr(document, key, value)
+
+        document.updated_at = datetime.utcnow()
+        document.last_checked = document.updated_at
+        self.session.add(document)
+        self.session.flush()
+        return document
+
     # DELETE операции
     def delete_document_by_title(self, title: str) -> bool:
         """Удаляет документ по title"""
@@ -77,6 +168,68 @@ class DocumentChunkCRUD:
         self.session.refresh(chunk_data)
         return chunk_data
 
+    def bulk_create_chunks(
+            self,
+            document_id: uuid.UUID,
+            chunks: Iterable[TextChunk],
+            batch_size: int = 500
+    ) -> List[uuid.UUID]:
+        """
+        Вставляет чанки документа многострочными INSERT пачками по batch_size.
+        Коммит не выполняется: документ и его чанки фиксируются вызывающим кодом
+        одной транзакцией.
+
+        Returns:
+            List[uuid.UUID]: ID вставленных чанков в исходном порядке
+        """
+        ids = []
+        batch = []
+        now = datetime.utcnow()
+
+        for chunk in chunks:
+            chunk_id = uuid.uuid4()
+            ids.append(chunk_id)
+            batch.append({
+                'id': chunk_id,
+                'document_id': document_id,
+                'content': chunk.content,
+                'chunk_index': chunk.chunk_index,
+                'page_number': chunk.page_number,
+                'clause_number': chunk.clause_number,
+                'embedding': chunk.embedding,
+                'word_count': chunk.word_count,
+                'content_hash': chunk.content_hash,
+                'created_at': now,
+                'updated_at': now,
+            })
+            if len(batch) >= batch_size:
+                self.session.execute(insert(DocumentChunk), batch)
+                batch = []
+
+        if batch:
+            self.session.execute(insert(DocumentChunk), batch)
+
+        return ids
+
+    def get_chunk_hashes(self, document_id: uuid.UUID) -> List[tuple[uuid.UUID, str]]:
+        """Пары (id, content_hash) чанков документа без загрузки текста и эмбеддингов"""
+        statement = select(DocumentChunk.id, DocumentChunk.content_hash).where(DocumentChunk.document_id == document_id)
+        return list(self.session.exec(statement).all())
+
+    def bulk_update_chunk_positions(self, rows: List[dict]) -> None:
+        """Обновляет chunk_index, page_number и др. по первичному ключу пачками, без коммита"""
+        if not rows:
+            return
+        now = datetime.utcnow()
+        self.session.execute(update(DocumentChunk), [{**row, 'updated_at': now} for row in rows])
+
+    def delete_chunks(self, chunk_ids: List[uuid.UUID]) -> int:
+        """Удаляет чанки по ID одним запросом, без коммита"""
+        if not chunk_ids:
+            return 0
+        result = self.session.execute(delete(DocumentChunk).where(DocumentChunk.id.in_(chunk_ids)))
+        return result.rowcount
+
     def get_chunks_by_document_title(self, title: str) -> List[DocumentChunk]:
         """Получает все чанки документа по его title"""
         statement = select(DocumentChunk).join(Document).where(Document.title == title)
@@ -105,34 +258,94 @@ class DocumentChunkCRUD:
             query_embedding: List[float],
             limit: int = 5,
             min_similarity: float = 0.3,
-            doc_type: Optional[str] = None
+            doc_type: Optional[str] = None,
+            ef_search: Optional[int] = None,
+            probes: Optional[int] = None
     ) -> List[dict]:
         """
-        Семантический поиск чанков с использованием SQLModel
+        Семантический поиск чанков одним запросом SEARCH_SIMILAR_CHUNKS_SQL
+
+        ef_search/probes задают точность ANN-индекса только для текущей транзакции
         """
-        statement = (
-            select(
-                DocumentChunk.id,
-                DocumentChunk.content,
-                DocumentChunk.page_number,
-                Document.title.label("document_title"),
-                Document.doc_number,
-                (DocumentChunk.embedding.cosine_distance(query_embedding)).label("dissimilarity")
-            )
-            .join(Document)
-            .order_by((DocumentChunk.embedding.cosine_distance(query_embedding))) #.desc()
-            .limit(limit)
-        )
-        results = self.session.exec(statement).all()
+        self.set_ann_search_params(ef_search=ef_search, probes=probes, iterative_scan=settings.VECTOR_ITERATIVE_SCAN)
+
+        with span("db.vector_search", limit=limit):
+            rows = self.session.execute(
+                SEARCH_SIMILAR_CHUNKS_SQL,
+                {
+                    "query_embedding": query_embedding,
+                    "max_distance": 1.0 - min_similarity,
+                    "doc_type": doc_type,
+                    "limit": limit,
+                },
+            ).all()
+        return [
+            {
+                "id": row.id,
+                "document_id": row.document_id,
+                "chunk_index": row.chunk_index,
+                "content": row.content,
+                "page_number": row.page_number,
+                "clause_number": row.clause_number,
+                "document_title": row.document_title,
+                "doc_number": row.doc_number,
+                "similarity": 1.0 - row.distance,
+            }
+            for row in rows
+        ]
 
+    def search_lexical_chunks(
+            self,
+            query: str,
+            limit: int = 5,
+            doc_type: Optional[str] = None
+    ) -> List[dict]:
+        """Полнотекстовый поиск чанков по search_vector (без эмбеддингов)"""
+        if not query.strip():
+            return []
+        with span("db.lexical_search", limit=limit):
+            rows = self.session.execute(
+                SEARCH_LEXICAL_CHUNKS_SQL,
+                {"query": query, "doc_type": doc_type, "limit": limit},
+            ).all()
         return [
             {
                 "id": row.id,
+                "document_id": row.document_id,
+                "chunk_index": row.chunk_index,
                 "content": row.content,
                 "page_number": row.page_number,
+                "clause_number": row.clause_number,
                 "document_title": row.document_title,
                 "doc_number": row.doc_number,
-                "similarity": (1.0 - float(row.dissimilarity))
+                "lexical_rank": row.rank,
             }
-            for row in results if row.dissimilarity <= (1 - min_similarity)
+            for row in rows
         ]
+
+    def set_ann_search_params(
+            self,
+            ef_search: Optional[int] = None,
+            probes: Optional[int] = None,
+            iterative_scan: Optional[str] = None
+    ) -> None:
+        """Устанавливает параметры ANN-поиска pgvector на время текущей транзакции одним запросом"""
+        config = {}
+        if iterative_scan not in (None, "off"):
+            # Итеративное сканирование (pgvector >= 0.8): индекс дочитывается, пока фильтры
+            # WHERE не пропустят limit строк. Старые версии отвергают эти параметры,
+            # поэтому off (значение по умолчанию в pgvector) не устанавливается
+            config["hnsw.iterative_scan"] = iterative_scan
+            config["ivfflat.iterative_scan"] = "relaxed_order"
+        if ef_search is not None:
+            config["hnsw.ef_search"] = str(ef_search)
+        if probes is not None:
+            config["ivfflat.probes"] = str(probes)
+        if not config:
+            return
+
+        calls, params = [], {}
+        for i, (name, value) in enumerate(config.items()):
+            calls.append(f"set_config(:name_{i}, :value_{i}, true)")
+            params.update({f"name_{i}": name, f"value_{i}": value})
+        self.session.execute(text(f"SELECT {', '.join(calls)}"), params)
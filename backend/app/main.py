@@ -1,20 +1,66 @@
+import asyncio
+import contextlib
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
+from prometheus_client import make_asgi_app
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
 from app.core.config import settings
+from app.core.db import init_db
+from app.core.executors import inference_executor, monitor_event_loop_lag, shutdown_executors
+from app.core.tracing import RequestMetricsMiddleware, setup_tracing, shutdown_tracing
+from app.services.embedding_batcher import start_embedding_batcher, stop_embedding_batcher
+from app.services.embedding_model import model_registry
+from app.services.gigachat_client import close_gigachat_client
+from app.services.prompt_builder import get_token_counter
+from app.services.reranker import get_reranker
+
+
+# Логи приложения (загрузка моделей, миграции, ошибки стадий); uvicorn настраивает только свои логгеры
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
     return f"{route.tags[0]}-{route.name}"
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_tracing()
+    # Engine создается и схема мигрируется один раз на процесс, а не на каждый запрос
+    init_db()
+
+    # Модель эмбеддингов загружается один раз до приема запросов
+    model_registry.get()
+    if settings.EMBEDDING_WARMUP:
+        model_registry.warmup()
+    if settings.RERANK_ENABLED:
+        get_reranker()
+    # Токенизатор промпта тоже загружается заранее, а не в первом запросе к чату
+    get_token_counter()
+    await start_embedding_batcher(executor=inference_executor)
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag(settings.EVENT_LOOP_LAG_INTERVAL))
+    yield
+
+    lag_monitor.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await lag_monitor
+    await stop_embedding_batcher()
+    await close_gigachat_client()
+    shutdown_executors()
+    shutdown_tracing()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     root_path=settings.API_V1_STR,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 
 # Set all CORS enabled origins
@@ -27,4 +73,7 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+app.add_middleware(RequestMetricsMiddleware)
+
 app.include_router(api_router)
+app.mount("/metrics", make_asgi_app())
@@ -0,0 +1,25 @@
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+@dataclass(slots=True)
+class TextChunk:
+    """Чанк текста документа до сохранения в БД (без словаря на каждый экземпляр)"""
+    content: str
+    chunk_index: int
+    page_number: int
+    word_count: int
+    start_position: int
+    end_position: int
+    clause_number: Optional[str] = None
+    content_hash: Optional[str] = None
+    embedding: Optional[Any] = None
+
+
+@dataclass
+class ChunkDiff:
+    """Изменения пачки чанков документа при повторной загрузке"""
+    new: List[TextChunk] = field(default_factory=list)  # нужны эмбеддинги и вставка
+    kept: List[Dict[str, Any]] = field(default_factory=list)  # id сохраненного чанка и его новые позиции
+    stale_ids: List[uuid.UUID] = field(default_factory=list)  # больше нет в документе
@@ -1,7 +1,9 @@
 from pgvector.sqlalchemy import Vector
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy import Column, LargeBinary, Text
-from typing import Optional, List, Dict, Any
+from sqlalchemy import Column, Computed, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import declared_attr, deferred
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime, date
 from pydantic import BaseModel
 import uuid
@@ -30,12 +32,8 @@ class Document(TimestampModel, table=True):
     file_hash: str = Field(index=True, description="SHA256 хеш файла для отслеживания изменений")
     mime_type: str = Field(default="application/pdf")
 
-    # Файл
-    file_binary: Optional[bytes] = Field(
-        sa_column=Column(LargeBinary),
-        description="Бинарные данные файла (для DATABASE)"
-    )
-    file_content: str = Field(sa_column=Column(Text), description="Текстовая часть документа")
+    # Файл хранится в BlobStore, в строке только ссылка
+    blob_ref: Optional[str] = Field(default=None, max_length=80, description="Ссылка на файл в хранилище блобов: sha256:<hash>")
 
     # Метаданные источника
     source_url: Optional[str] = Field(description="URL источника документа")
@@ -47,6 +45,8 @@ class Document(TimestampModel, table=True):
     # Связи
     chunks: List["DocumentChunk"] = Relationship(back_populates="document")
 
+SEARCH_VECTOR_EXPRESSION = "to_tsvector('russian', coalesce(clause_number, '') || ' ' || content)"
+
 
 class DocumentChunk(TimestampModel, table=True):
     __tablename__ = "document_chunks"
@@ -62,6 +62,7 @@ class DocumentChunk(TimestampModel, table=True):
     content: str = Field(description="Текстовая часть документа")
     chunk_index: int = Field(description="Порядковый номер чанка в документе")
     page_number: int = Field(description="Номер страницы в исходном документе")
+    clause_number: Optional[str] = Field(default=None, max_length=32, description="Номер первого пункта чанка: 5.2.1")
 
     # Векторное представление
     embedding: Optional[Any] = Field(
@@ -71,10 +72,30 @@ class DocumentChunk(TimestampModel, table=True):
 
     # Метаданные чанка
     word_count: int = Field(description="Количество слов в чанке")
+    content_hash: Optional[str] = Field(default=None, max_length=64, description="SHA256 хеш content для инкрементальной загрузки")
+
+    # Полнотекстовый индекс: вычисляется PostgreSQL при вставке и изменении чанка
+    search_vector: Optional[Any] = Field(
+        default=None,
+        sa_column=Column(TSVECTOR, Computed(SEARCH_VECTOR_EXPRESSION, persisted=True)),
+        description="tsvector номера пункта и текста (russian)"
+    )
 
     # Связи
     document: Document = Relationship(back_populates="chunks")
 
+    __table_args__ = (
+        Index("ix_document_chunks_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+    @declared_attr.directive
+    def __mapper_args__(cls):
+        # Эмбеддинг и tsvector загружаются только при обращении к атрибуту или явном select
+        return {"properties": {
+            "embedding": deferred(cls.__table__.c.embedding),
+            "search_vector": deferred(cls.__table__.c.search_vector),
+        }}
+
 
 # Pydantic модели для API
 class DocumentCreate(SQLModel):
@@ -84,8 +105,7 @@ class DocumentCreate(SQLModel):
     file_hash: str
     source_url: Optional[str] = None
     publication_date: Optional[date] = None
-    file_content: str
-    file_binary: Optional[bytes] = None
+    blob_ref: Optional[str] = None
 
 
 class DocumentChunkCreate(SQLModel):
@@ -112,19 +132,47 @@ class SearchQuery(SQLModel):
     query: str = Field(default='Удаление перегородки')
     limit: int = Field(default=3, ge=1, le=20)
     min_similarity: float = Field(default=0.3, ge=-1.0, le=1.0)
+    doc_type: Optional[str] = Field(default=None, description="Искать только в документах этого типа: СП, СНиП, ГОСТ")
+    mode: Optional[Literal["vector", "lexical", "hybrid"]] = Field(
+        default=None, description="Вид поиска: vector, lexical или hybrid; по умолчанию SEARCH_MODE"
+    )
+    rerank: Optional[bool] = Field(default=None, description="Переранжировать кросс-энкодером; по умолчанию RERANK_ENABLED")
+    # Точность ANN-поиска: больше значение - выше recall и выше задержка
+    ef_search: Optional[int] = Field(default=None, ge=1, le=1000, description="hnsw.ef_search для HNSW-индекса")
+    probes: Optional[int] = Field(default=None, ge=1, le=1000, description="ivfflat.probes для IVFFlat-индекса")
 
 
 class SearchResult(SQLModel):
     chunk_id: uuid.UUID
     content: str
-    similarity_score: float
+    # Косинусная близость; нет у чанков, найденных только лексическим поиском
+    similarity_score: Optional[float] = None
+    # Оценка, по которой упорядочена выдача: кросс-энкодер, RRF, близость или ранг ts_rank_cd
+    score: Optional[float] = None
     document_title: str
     doc_number: Optional[str]
     page_number: int
+    clause_number: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row: dict) -> "SearchResult":
+        score = next((row[key] for key in ("rerank_score", "score", "similarity", "lexical_rank") if key in row), None)
+        return cls(
+            chunk_id=row["id"],
+            content=row["content"],
+            similarity_score=row.get("similarity"),
+            score=score,
+            document_title=row["document_title"],
+            doc_number=row.get("doc_number"),
+            page_number=row["page_number"],
+            clause_number=row.get("clause_number"),
+        )
 
 
 class SearchResponse(SQLModel):
     query: str
     results: List[SearchResult]
     total_found: int
+    # Полное время поиска и время каждой стадии (embed, vector, lexical, fusion, rerank) в секундах
     processing_time: float
+    timings: Dict[str, float] = Field(default_factory=dict)
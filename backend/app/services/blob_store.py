@@ -0,0 +1,131 @@
+import hashlib
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+from app.core.config import settings
+
+
+BLOB_REF_PREFIX = "sha256:"
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def make_blob_ref(file_hash: str) -> str:
+    """Ссылка на блоб по SHA256 содержимого (совпадает с Document.file_hash)"""
+    return f"{BLOB_REF_PREFIX}{file_hash}"
+
+
+def blob_ref_hash(blob_ref: str) -> str:
+    if not blob_ref.startswith(BLOB_REF_PREFIX):
+        raise ValueError(f"Неизвестный формат ссылки на блоб: {blob_ref}")
+    file_hash = blob_ref[len(BLOB_REF_PREFIX):]
+    if len(file_hash) != 64 or not all(ch in "0123456789abcdef" for ch in file_hash):
+        raise ValueError(f"Некорректный хеш в ссылке на блоб: {blob_ref}")
+    return file_hash
+
+
+class BlobStore(ABC):
+    """
+    Хранилище файлов, адресуемых по содержимому: ссылка на файл - это его SHA256,
+    поэтому одинаковые файлы хранятся один раз, а записанный блоб не меняется
+    """
+
+    @abstractmethod
+    def put_stream(self, stream: Iterable[bytes]) -> str:
+        """Записывает поток байтов и возвращает ссылку на блоб"""
+        ...
+
+    @abstractmethod
+    def open(self, blob_ref: str) -> BinaryIO:
+        ...
+
+    @abstractmethod
+    def exists(self, blob_ref: str) -> bool:
+        ...
+
+    @abstractmethod
+    def delete(self, blob_ref: str) -> None:
+        ...
+
+    def put_bytes(self, data: bytes) -> str:
+        return self.put_stream([data])
+
+    def put_file(self, file_path: str) -> str:
+        with open(file_path, "rb") as f:
+            return self.put_stream(iter(lambda: f.read(READ_CHUNK_SIZE), b""))
+
+    def iter_blob(self, blob_ref: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[bytes]:
+        """Потоковое чтение блоба частями, например для StreamingResponse"""
+        with self.open(blob_ref) as f:
+            yield from iter(lambda: f.read(chunk_size), b"")
+
+    def read_bytes(self, blob_ref: str) -> bytes:
+        with self.open(blob_ref) as f:
+            return f.read()
+
+
+class LocalBlobStore(BlobStore):
+    """
+    Блобы в локальной файловой системе: root/ab/cd/<sha256>.
+    Запись идет во временный файл того же каталога с подсчетом хеша на лету
+    и атомарно переименовывается; если такой блоб уже есть, временный файл удаляется.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self._tmp_dir = self.root / "tmp"
+        self._tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, blob_ref: str) -> Path:
+        file_hash = blob_ref_hash(blob_ref)
+        return self.root / file_hash[:2] / file_hash[2:4] / file_hash
+
+    def put_stream(self, stream: Iterable[bytes]) -> str:
+        sha256_hash = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for block in stream:
+                    sha256_hash.update(block)
+                    f.write(block)
+                f.flush()
+                os.fsync(f.fileno())
+
+            blob_ref = make_blob_ref(sha256_hash.hexdigest())
+            path = self._path(blob_ref)
+            if path.exists():
+                os.unlink(tmp_path)
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, path)
+            return blob_ref
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def open(self, blob_ref: str) -> BinaryIO:
+        return open(self._path(blob_ref), "rb")
+
+    def exists(self, blob_ref: str) -> bool:
+        return self._path(blob_ref).exists()
+
+    def delete(self, blob_ref: str) -> None:
+        self._path(blob_ref).unlink(missing_ok=True)
+
+
+_blob_store: Optional[BlobStore] = None
+_blob_store_lock = threading.Lock()
+
+
+def get_blob_store() -> BlobStore:
+    """Хранилище блобов процесса (каталог BLOB_STORE_DIR)"""
+    global _blob_store
+    if _blob_store is None:
+        with _blob_store_lock:
+            if _blob_store is None:
+                _blob_store = LocalBlobStore(settings.BLOB_STORE_DIR)
+    return _blob_store
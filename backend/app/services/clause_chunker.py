@@ -0,0 +1,227 @@
+import re
+from collections import Counter
+from itertools import chain, islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from transformers import PreTrainedTokenizerBase
+
+from app.models.chunks import TextChunk
+
+
+# Пункт "5.2.1 Текст", пункт приложения "А.3 Текст"
+CLAUSE_RE = re.compile(r"^(?P<number>(?:\d{1,2}|[А-ЯЁA-Z])(?:\.\d{1,3}){1,5})\.?\s+(?=[А-ЯЁA-Z«(])")
+# Раздел "5 Общие положения" - только короткая строка, чтобы не путать со строками таблиц
+SECTION_RE = re.compile(r"^(?P<number>\d{1,2})\.?\s+(?=[А-ЯЁA-Z][а-яёa-z])")
+SECTION_MAX_WORDS = 12
+APPENDIX_RE = re.compile(r"^(?P<number>Приложение\s+[А-ЯЁA-Z])\b")
+
+# Колонтитулы, которые удаляются на краях страницы всегда: номер страницы
+PAGE_NUMBER_RE = re.compile(r"^(?:[-–—]\s*)?\d{1,4}(?:\s*[-–—])?$|^(?:с\.|стр\.?|страница)\s*\d+(?:\s*из\s*\d+)?$", re.IGNORECASE)
+SENTENCE_END = (".", ";", ":", "!", "?")
+
+
+def match_clause_heading(line: str) -> Optional[str]:
+    """Номер пункта, раздела или приложения, с которого начинается строка"""
+    match = CLAUSE_RE.match(line) or APPENDIX_RE.match(line)
+    if match:
+        return match.group("number")
+    match = SECTION_RE.match(line)
+    if match and len(line.split()) <= SECTION_MAX_WORDS:
+        return match.group("number")
+    return None
+
+
+class BoilerplateFilter:
+    """
+    Удаляет колонтитулы: строки у верхнего и нижнего края страницы, которые
+    (с точностью до цифр) повторяются на большей части страниц выборки,
+    и строки с одним номером страницы. Заголовки пунктов не удаляются никогда:
+    с точностью до цифр они тоже повторяются на краях страниц.
+    """
+
+    def __init__(self, edge_lines: int = 2, min_share: float = 0.5, min_pages: int = 3):
+        self.edge_lines = edge_lines
+        self.min_share = min_share
+        self.min_pages = min_pages
+        self.repeated: set[str] = set()
+
+    @staticmethod
+    def _normalize(line: str) -> str:
+        return re.sub(r"\d+", "#", " ".join(line.lower().split()))
+
+    def _edges(self, lines: List[str]) -> set[str]:
+        return set(lines[:self.edge_lines] + lines[-self.edge_lines:])
+
+    def fit(self, pages_lines: List[List[str]]) -> None:
+        counts = Counter(
+            normalized
+            for lines in pages_lines
+            for normalized in {
+                self._normalize(line) for line in self._edges(lines) if not self._is_heading(line)
+            }
+        )
+        threshold = max(self.min_pages, self.min_share * len(pages_lines))
+        self.repeated = {line for line, count in counts.items() if count >= threshold}
+
+    def clean(self, lines: List[str]) -> List[str]:
+        edge_count = min(self.edge_lines, len(lines))
+        edge_indexes = set(range(edge_count)) | set(range(len(lines) - edge_count, len(lines)))
+        return [
+            line for index, line in enumerate(lines)
+            if index not in edge_indexes
+            or self._is_heading(line)
+            or not (PAGE_NUMBER_RE.match(line) or self._normalize(line) in self.repeated)
+        ]
+
+    @staticmethod
+    def _is_heading(line: str) -> bool:
+        return match_clause_heading(line.strip()) is not None
+
+
+class ClauseChunker:
+    """
+    Разбивка нормативного документа (СП, СНиП, ГОСТ) по структуре.
+
+    Текст делится на пункты по заголовкам вида "5.2.1", "А.3", "Приложение Б",
+    после чего целые пункты одного раздела упаковываются в чанк, пока он
+    помещается в бюджет токенов модели эмбеддингов. Пункт длиннее бюджета
+    режется на части, по возможности по концу предложения. Колонтитулы
+    определяются по первым sample_pages страницам и удаляются.
+
+    Токены считаются токенизатором модели по словам: для WordPiece (BERT, MiniLM)
+    сумма токенов слов равна числу токенов текста.
+    """
+
+    def __init__(self, tokenizer: PreTrainedTokenizerBase, max_tokens: int = 256, sample_pages: int = 20):
+        self.tokenizer = tokenizer
+        # Служебные токены ([CLS], [SEP]) тоже занимают место в окне модели
+        self.max_tokens = max_tokens - tokenizer.num_special_tokens_to_add(pair=False)
+        self.sample_pages = sample_pages
+
+    def count_tokens(self, words: List[str]) -> List[int]:
+        if not words:
+            return []
+        encoded = self.tokenizer(words, add_special_tokens=False)["input_ids"]
+        return [len(ids) for ids in encoded]
+
+    def iter_chunks(self, pages: Iterable[Dict]) -> Iterator[TextChunk]:
+        pages = iter(pages)
+        sample = [(page['page_number'], page['text'].splitlines()) for page in islice(pages, self.sample_pages)]
+        boilerplate = BoilerplateFilter()
+        boilerplate.fit([lines for _, lines in sample])
+
+        all_pages = chain(sample, ((page['page_number'], page['text'].splitlines()) for page in pages))
+        packer = _ClausePacker(self.max_tokens)
+        for clause_number, words, word_pages in self._iter_clauses(all_pages, boilerplate):
+            yield from packer.add(clause_number, words, word_pages, self.count_tokens(words))
+        yield from packer.flush()
+
+    @staticmethod
+    def _iter_clauses(
+            pages: Iterable[Tuple[int, List[str]]],
+            boilerplate: BoilerplateFilter
+    ) -> Iterator[Tuple[Optional[str], List[str], List[int]]]:
+        """Пункты документа: (номер, слова, номер страницы каждого слова)"""
+        clause_number: Optional[str] = None
+        words: List[str] = []
+        word_pages: List[int] = []
+
+        for page_number, lines in pages:
+            for line in boilerplate.clean(lines):
+                line = line.strip()
+                heading = match_clause_heading(line)
+                if heading is not None:
+                    if words:
+                        yield clause_number, words, word_pages
+                    clause_number, words, word_pages = heading, [], []
+
+                line_words = line.split()
+                words.extend(line_words)
+                word_pages.extend([page_number] * len(line_words))
+
+        if words:
+            yield clause_number, words, word_pages
+
+
+class _ClausePacker:
+    """Собирает чанки из целых пунктов в пределах бюджета токенов"""
+
+    def __init__(self, max_tokens: int):
+        self.max_tokens = max_tokens
+        self.chunk_index = 0
+        self.position = 0  # позиция первого слова текущего чанка в документе
+        self._reset()
+
+    def _reset(self) -> None:
+        self.clause_number: Optional[str] = None
+        self.words: List[str] = []
+        self.page_number: Optional[int] = None
+        self.tokens = 0
+
+    def add(self, clause_number: Optional[str], words: List[str], word_pages: List[int], token_counts: List[int]) -> Iterator[TextChunk]:
+        total = sum(token_counts)
+        same_section = bool(self.words) and _section(clause_number) == _section(self.clause_number)
+        if not (same_section and self.tokens + total <= self.max_tokens):
+            yield from self.flush()
+
+        if total <= self.max_tokens:
+            self._append(clause_number, words, word_pages[0], total)
+            return
+
+        # Пункт длиннее бюджета: режем на части, каждая часть - отдельный чанк
+        start = 0
+        while start < len(words):
+            end = self._split_point(words, token_counts, start)
+            self._append(clause_number, words[start:end], word_pages[start], sum(token_counts[start:end]))
+            start = end
+            if start < len(words):
+                yield from self.flush()
+
+    def _split_point(self, words: List[str], token_counts: List[int], start: int) -> int:
+        """Конец части пункта: последний конец предложения, умещающийся в бюджет"""
+        tokens = 0
+        end = start
+        while end < len(token_counts) and tokens + token_counts[end] <= self.max_tokens:
+            tokens += token_counts[end]
+            end += 1
+        if end == start:
+            return start + 1
+        if end == len(token_counts):
+            return end
+
+        # Не режем раньше середины окна, иначе части получаются слишком мелкими
+        for index in range(end - 1, (start + end) // 2, -1):
+            if words[index].endswith(SENTENCE_END):
+                return index + 1
+        return end
+
+    def _append(self, clause_number: Optional[str], words: List[str], page_number: int, tokens: int) -> None:
+        if not self.words:
+            self.clause_number = clause_number
+            self.page_number = page_number
+        self.words.extend(words)
+        self.tokens += tokens
+
+    def flush(self) -> Iterator[TextChunk]:
+        if not self.words:
+            return
+        yield TextChunk(
+            content=' '.join(self.words),
+            chunk_index=self.chunk_index,
+            page_number=self.page_number,
+            word_count=len(self.words),
+            start_position=self.position,
+            end_position=self.position + len(self.words) - 1,
+            clause_number=self.clause_number,
+        )
+        self.chunk_index += 1
+        self.position += len(self.words)
+        self._reset()
+
+
+def _section(clause_number: Optional[str]) -> Optional[str]:
+    """Раздел верхнего уровня: "5" для "5.2.1", "Приложение А" для "А.3" """
+    if clause_number is None:
+        return None
+    head = clause_number.split(".")[0]
+    return f"Приложение {head}" if head.isalpha() else head
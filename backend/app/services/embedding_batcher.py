@@ -0,0 +1,148 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from app.core.config import settings
+from app.core.tracing import span
+from app.services.embedding_model import model_registry
+
+
+class EmbeddingBatcher:
+    """
+    Микро-батчинг эмбеддингов для конкурентных запросов.
+
+    Тексты из разных запросов собираются в пачку в течение max_wait_ms
+    (или пока не наберется max_batch_size), кодируются одним вызовом encode
+    в рабочем потоке, после чего каждому запросу возвращается его вектор.
+    Пока кодируется одна пачка, следующая уже копится в очереди.
+    """
+
+    def __init__(
+            self,
+            model: SentenceTransformer,
+            model_name: str,
+            max_batch_size: int = 32,
+            max_wait_ms: float = 5.0,
+            executor: Optional[Executor] = None,
+    ):
+        self.model = model
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        # Пачка, которая собиралась или кодировалась, завершается в _run; здесь - ожидающие в очереди
+        queued = []
+        while not self._queue.empty():
+            queued.append(self._queue.get_nowait())
+        _fail_stopped(queued)
+
+    async def encode(self, text: str) -> np.ndarray:
+        if self._task is None:
+            raise RuntimeError("EmbeddingBatcher не запущен")
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            try:
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Остановка во время сбора пачки: ее запросы уже вынуты из очереди
+                _fail_stopped(batch)
+                raise
+
+            await self._encode_batch(loop, batch)
+
+    async def _encode_batch(self, loop: asyncio.AbstractEventLoop, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        # Запросы, которые успели отменить, не кодируем
+        batch = [(text, future) for text, future in batch if not future.done()]
+        if not batch:
+            return
+
+        texts = [text for text, _ in batch]
+        try:
+            with span("embedding.encode", batch_size=len(texts)):
+                embeddings = await loop.run_in_executor(self.executor, self.model.encode, texts)
+        except asyncio.CancelledError:
+            # Остановка во время кодирования: результат пачки уже никто не получит
+            _fail_stopped(batch)
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
+
+def _fail_stopped(batch: List[Tuple[str, asyncio.Future]]) -> None:
+    for _, future in batch:
+        if not future.done():
+            future.set_exception(RuntimeError("EmbeddingBatcher остановлен"))
+
+
+_batcher: Optional[EmbeddingBatcher] = None
+
+
+def get_embedding_batcher() -> Optional[EmbeddingBatcher]:
+    """Запущенный батчер процесса или None, если батчинг выключен"""
+    return _batcher
+
+
+async def start_embedding_batcher(executor: Optional[Executor] = None) -> None:
+    global _batcher
+    if not settings.EMBEDDING_BATCHING_ENABLED:
+        return
+
+    _batcher = EmbeddingBatcher(
+        model=model_registry.get(),
+        model_name=settings.EMBEDDING_MODEL_NAME,
+        max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+        max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS,
+        executor=executor,
+    )
+    await _batcher.start()
+
+
+async def stop_embedding_batcher() -> None:
+    global _batcher
+    if _batcher is not None:
+        await _batcher.stop()
+        _batcher = None
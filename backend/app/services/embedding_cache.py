@@ -0,0 +1,190 @@
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import EMBEDDING_CACHE_EVICTIONS, EMBEDDING_CACHE_REQUESTS
+
+
+logger = logging.getLogger(__name__)
+
+
+class RedisEmbeddingBackend:
+    """
+    Общий для всех воркеров uvicorn кэш эмбеддингов в Redis.
+    Векторы хранятся как сырые байты float32. Из event loop используются
+    методы aget/aset (redis.asyncio). Ошибка Redis не прерывает поиск:
+    чтение считается промахом, запись пропускается.
+    """
+
+    def __init__(self, url: str, ttl_seconds: int, prefix: str = "query-embedding:", socket_timeout: float = 0.5):
+        try:
+            import redis
+            import redis.asyncio
+        except ImportError as e:
+            raise RuntimeError("Для EMBEDDING_CACHE_REDIS_URL нужен пакет redis: pip install redis") from e
+
+        timeouts = {"socket_timeout": socket_timeout, "socket_connect_timeout": socket_timeout}
+        self._redis = redis.Redis.from_url(url, **timeouts)
+        self._async_redis = redis.asyncio.Redis.from_url(url, **timeouts)
+        self._errors = redis.RedisError
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        try:
+            value = self._redis.get(self._redis_key(key))
+        except self._errors as e:
+            logger.warning("Ошибка чтения кэша эмбеддингов из Redis, считаем промахом: %s", e)
+            return None
+        return self._decode(value)
+
+    async def aget(self, key: str) -> Optional[np.ndarray]:
+        try:
+            value = await self._async_redis.get(self._redis_key(key))
+        except self._errors as e:
+            logger.warning("Ошибка чтения кэша эмбеддингов из Redis, считаем промахом: %s", e)
+            return None
+        return self._decode(value)
+
+    def set(self, key: str, embedding: np.ndarray) -> None:
+        try:
+            self._redis.set(self._redis_key(key), embedding.tobytes(), ex=self.ttl_seconds)
+        except self._errors as e:
+            logger.warning("Ошибка записи кэша эмбеддингов в Redis: %s", e)
+
+    async def aset(self, key: str, embedding: np.ndarray) -> None:
+        try:
+            await self._async_redis.set(self._redis_key(key), embedding.tobytes(), ex=self.ttl_seconds)
+        except self._errors as e:
+            logger.warning("Ошибка записи кэша эмбеддингов в Redis: %s", e)
+
+    @staticmethod
+    def _decode(value: Optional[bytes]) -> Optional[np.ndarray]:
+        if value is None:
+            return None
+        return np.frombuffer(value, dtype=np.float32)
+
+    def _redis_key(self, key: str) -> str:
+        return self.prefix + hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+class QueryEmbeddingCache:
+    """
+    Ограниченный LRU-кэш эмбеддингов поисковых запросов.
+
+    Ключ - имя модели и нормализованный текст запроса, значение - компактный
+    неизменяемый массив float32. При промахе в локальном кэше проверяется
+    общий backend, если он задан.
+    """
+
+    def __init__(self, max_entries: int, shared_backend: Optional[RedisEmbeddingBackend] = None):
+        self.max_entries = max_entries
+        self.shared_backend = shared_backend
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model_name: str, query: str) -> Optional[np.ndarray]:
+        key = self.make_key(model_name, query)
+        embedding = self._get_local(key)
+        if embedding is None and self.shared_backend is not None:
+            embedding = self._shared_hit(key, self.shared_backend.get(key))
+        if embedding is None:
+            self._record("miss")
+        return embedding
+
+    async def aget(self, model_name: str, query: str) -> Optional[np.ndarray]:
+        """get для event loop: общий backend опрашивается без блокировки loop"""
+        key = self.make_key(model_name, query)
+        embedding = self._get_local(key)
+        if embedding is None and self.shared_backend is not None:
+            embedding = self._shared_hit(key, await self.shared_backend.aget(key))
+        if embedding is None:
+            self._record("miss")
+        return embedding
+
+    def put(self, model_name: str, query: str, embedding: np.ndarray) -> np.ndarray:
+        """Сохраняет эмбеддинг и возвращает его неизменяемую float32-копию из кэша"""
+        key, embedding = self._put_local(self.make_key(model_name, query), embedding)
+        if self.shared_backend is not None:
+            self.shared_backend.set(key, embedding)
+        return embedding
+
+    async def aput(self, model_name: str, query: str, embedding: np.ndarray) -> np.ndarray:
+        """put для event loop"""
+        key, embedding = self._put_local(self.make_key(model_name, query), embedding)
+        if self.shared_backend is not None:
+            await self.shared_backend.aset(key, embedding)
+        return embedding
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+        }
+
+    @staticmethod
+    def make_key(model_name: str, query: str) -> str:
+        normalized = " ".join(unicodedata.normalize("NFC", query).split())
+        return f"{model_name}\x00{normalized}"
+
+    def _get_local(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self._record("hit")
+            return embedding
+
+    def _shared_hit(self, key: str, embedding: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        if embedding is not None:
+            self._store_local(key, embedding)
+            self._record("shared_hit")
+        return embedding
+
+    def _put_local(self, key: str, embedding: np.ndarray) -> Tuple[str, np.ndarray]:
+        embedding = np.array(embedding, dtype=np.float32)
+        embedding.flags.writeable = False
+        self._store_local(key, embedding)
+        return key, embedding
+
+    def _store_local(self, key: str, embedding: np.ndarray) -> None:
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+                EMBEDDING_CACHE_EVICTIONS.inc()
+
+    def _record(self, result: str) -> None:
+        if result == "miss":
+            self.misses += 1
+        else:
+            self.hits += 1
+        EMBEDDING_CACHE_REQUESTS.labels(result=result).inc()
+
+
+def _create_query_embedding_cache() -> QueryEmbeddingCache:
+    shared_backend = None
+    if settings.EMBEDDING_CACHE_REDIS_URL:
+        shared_backend = RedisEmbeddingBackend(
+            url=settings.EMBEDDING_CACHE_REDIS_URL,
+            ttl_seconds=settings.EMBEDDING_CACHE_REDIS_TTL_SECONDS,
+        )
+    return QueryEmbeddingCache(max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES, shared_backend=shared_backend)
+
+
+query_embedding_cache = _create_query_embedding_cache()
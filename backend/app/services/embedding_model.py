@@ -0,0 +1,108 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sentence_transformers import SentenceTransformer
+from transformers import AutoTokenizer, PreTrainedTokenizerBase
+
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class EmbeddingModelStats:
+    model_name: str
+    device: str
+    load_time: float
+    memory_bytes: int
+
+
+class EmbeddingModelRegistry:
+    """
+    Реестр моделей эмбеддингов уровня процесса.
+
+    Каждая пара (модель, устройство) загружается с диска ровно один раз и дальше
+    переиспользуется всеми запросами и потоками процесса. Инференс SentenceTransformer
+    не меняет состояние модели, поэтому один экземпляр можно безопасно вызывать
+    из нескольких потоков; блокировка нужна только на время загрузки.
+    Каждый воркер uvicorn — отдельный процесс и держит свою копию модели.
+    """
+
+    def __init__(self):
+        self._models: Dict[Tuple[str, str], SentenceTransformer] = {}
+        self._stats: Dict[Tuple[str, str], EmbeddingModelStats] = {}
+        self._tokenizers: Dict[str, PreTrainedTokenizerBase] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name: Optional[str] = None, device: Optional[str] = None) -> SentenceTransformer:
+        """Возвращает загруженную модель, при первом обращении загружает её"""
+        key = (model_name or settings.EMBEDDING_MODEL_NAME, device or settings.EMBEDDING_DEVICE)
+
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                model = self._load(*key)
+        return model
+
+    def get_tokenizer(self, model_name: Optional[str] = None) -> PreTrainedTokenizerBase:
+        """
+        Токенизатор модели. Если модель уже загружена, берется её токенизатор,
+        иначе загружается только токенизатор (процессам разбивки PDF веса модели не нужны)
+        """
+        model_name = model_name or settings.EMBEDDING_MODEL_NAME
+        for (name, _), model in self._models.items():
+            if name == model_name:
+                return model.tokenizer
+
+        with self._lock:
+            tokenizer = self._tokenizers.get(model_name)
+            if tokenizer is None:
+                tokenizer = AutoTokenizer.from_pretrained(model_name)
+                self._tokenizers[model_name] = tokenizer
+        return tokenizer
+
+    def warmup(self, model_name: Optional[str] = None, device: Optional[str] = None) -> None:
+        """Прогоняет пробный encode, чтобы первый запрос не платил за ленивую инициализацию"""
+        self.get(model_name, device).encode(["прогрев модели"])
+
+    def stats(self) -> List[EmbeddingModelStats]:
+        """Время загрузки и объем памяти всех загруженных моделей"""
+        return list(self._stats.values())
+
+    def _load(self, model_name: str, device: str) -> SentenceTransformer:
+        start = time.perf_counter()
+        model = SentenceTransformer(model_name, device=device)
+        model.eval()
+        load_time = time.perf_counter() - start
+
+        stats = EmbeddingModelStats(
+            model_name=model_name,
+            device=device,
+            load_time=load_time,
+            memory_bytes=self._model_memory_bytes(model),
+        )
+        self._models[(model_name, device)] = model
+        self._stats[(model_name, device)] = stats
+
+        logger.info(
+            "Модель %s загружена на %s за %.2f с, %.1f МБ",
+            model_name, device, load_time, stats.memory_bytes / 2 ** 20,
+        )
+        return model
+
+    @staticmethod
+    def _model_memory_bytes(model: SentenceTransformer) -> int:
+        """Объем параметров и буферов модели в байтах"""
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+
+model_registry = EmbeddingModelRegistry()
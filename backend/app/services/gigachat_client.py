@@ -0,0 +1,245 @@
+import asyncio
+import json
+import random
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import GIGACHAT_FAILED_ATTEMPTS
+from app.core.tracing import observe_stage, span
+
+
+# Ответы, после которых запрос имеет смысл повторить
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class GigaChatError(Exception):
+    pass
+
+
+class GigaChatClient:
+    """
+    Асинхронный клиент GigaChat.
+
+    Держит постоянный пул HTTP/2-соединений, кэширует OAuth-токен до момента
+    незадолго до истечения и обновляет его под блокировкой (одно обновление
+    на всех конкурентных вызывающих). Запросы ограничены по времени и по числу
+    одновременных к API, временные ошибки повторяются с экспоненциальной задержкой.
+    Слот из лимита занят только на время обмена с API: пауза перед повтором и
+    запрос токена его не держат.
+    """
+
+    def __init__(
+            self,
+            auth_key: str,
+            oauth_url: str,
+            api_url: str,
+            scope: str = "GIGACHAT_API_PERS",
+            timeout: float = 60.0,
+            max_retries: int = 3,
+            max_concurrency: int = 16,
+            token_refresh_margin: float = 60.0,
+            backoff_base: float = 0.5,
+            verify: bool = False,
+            transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.auth_key = auth_key
+        self.oauth_url = oauth_url
+        self.api_url = api_url.rstrip("/")
+        self.scope = scope
+        self.max_retries = max_retries
+        self.token_refresh_margin = token_refresh_margin
+        self.backoff_base = backoff_base
+
+        self._http = httpx.AsyncClient(
+            http2=True,
+            verify=verify,
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            transport=transport,
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._token: Optional[str] = None
+        self._token_expires_at = 0.0
+        self._token_lock = asyncio.Lock()
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+    async def get_token(self) -> str:
+        """Возвращает действующий access token, при необходимости обновляет его"""
+        if self._token_is_valid():
+            return self._token
+
+        async with self._token_lock:
+            # Пока ждали блокировку, токен мог обновить другой запрос
+            if not self._token_is_valid():
+                await self._refresh_token()
+        return self._token
+
+    async def chat(self, model: str, messages: List[Dict[str, str]], **params) -> str:
+        """Отправляет запрос в /chat/completions и возвращает текст ответа"""
+        request_data = {"model": model, "messages": messages, "stream": False, **params}
+        with span("gigachat.chat", model=model):
+            response = await self._request("POST", f"{self.api_url}/chat/completions", json=request_data)
+        response_body = response.json()
+
+        if "choices" not in response_body:
+            raise GigaChatError(f"Неожиданный ответ GigaChat: {response_body}")
+
+        return response_body["choices"][0]["message"]["content"]
+
+    async def stream_chat(self, model: str, messages: List[Dict[str, str]], **params) -> AsyncIterator[str]:
+        """
+        Запрос в /chat/completions в режиме stream: отдает фрагменты текста по мере генерации.
+        Повторы возможны только до получения первого байта ответа.
+        """
+        request_data = {"model": model, "messages": messages, "stream": True, **params}
+        start = time.perf_counter()
+        # span только до заголовков ответа: контекст трейса нельзя держать открытым через yield
+        with span("gigachat.stream_open", model=model):
+            response = await self._request("POST", f"{self.api_url}/chat/completions", stream=True, json=request_data)
+        try:
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+
+                chunk = json.loads(data)
+                if "choices" not in chunk:
+                    raise GigaChatError(f"Неожиданный ответ GigaChat: {chunk}")
+
+                content = chunk["choices"][0].get("delta", {}).get("content")
+                if content:
+                    yield content
+        finally:
+            await response.aclose()
+            # Слот stream-ответа _request оставляет занятым до конца чтения
+            self._semaphore.release()
+            observe_stage("gigachat.stream", time.perf_counter() - start)
+
+    async def _acquire_slot(self) -> None:
+        """Слот из лимита одновременных запросов к API; ожидание слота - отдельная стадия"""
+        start = time.perf_counter()
+        await self._semaphore.acquire()
+        observe_stage("gigachat.queue", time.perf_counter() - start)
+
+    def _token_is_valid(self) -> bool:
+        return self._token is not None and time.time() < self._token_expires_at - self.token_refresh_margin
+
+    async def _refresh_token(self) -> None:
+        headers = {
+            "Content-Type": "application/x-www-form-urlencoded",
+            "Accept": "application/json",
+            "RqUID": str(uuid4()),
+            "Authorization": f"Basic {self.auth_key}",
+        }
+        with span("gigachat.token"):
+            response = await self._request(
+                "POST", self.oauth_url, authorized=False, headers=headers, data={"scope": self.scope}
+            )
+        response_body = response.json()
+
+        self._token = response_body["access_token"]
+        # expires_at приходит в миллисекундах unix-времени
+        self._token_expires_at = response_body["expires_at"] / 1000
+
+    async def _request(
+            self,
+            method: str,
+            url: str,
+            authorized: bool = True,
+            stream: bool = False,
+            **kwargs
+    ) -> httpx.Response:
+        """
+        Запрос с повторами временных ошибок. Запрос к API (authorized) занимает слот
+        из лимита одновременных только на время попытки; успешный stream-ответ
+        держит слот, пока его не освободит вызывающий.
+        """
+        headers = kwargs.pop("headers", {})
+        last_error: Optional[Exception] = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff_base * 2 ** (attempt - 1) * (1 + random.random()))
+
+            if authorized:
+                headers = {**headers, "Authorization": f"Bearer {await self.get_token()}"}
+            request = self._http.build_request(method, url, headers=headers, **kwargs)
+
+            if authorized:
+                await self._acquire_slot()
+            response = None
+            try:
+                response, last_error = await self._attempt(request, authorized, stream)
+            finally:
+                if authorized and (response is None or not stream):
+                    self._semaphore.release()
+            if response is not None:
+                return response
+
+        raise GigaChatError(f"Запрос к {url} не выполнен после {self.max_retries + 1} попыток") from last_error
+
+    async def _attempt(
+            self,
+            request: httpx.Request,
+            authorized: bool,
+            stream: bool
+    ) -> Tuple[Optional[httpx.Response], Optional[Exception]]:
+        """Одна попытка: (ответ, None) при успехе, (None, ошибка), если запрос стоит повторить"""
+        try:
+            response = await self._http.send(request, stream=stream)
+        except httpx.TransportError as e:
+            GIGACHAT_FAILED_ATTEMPTS.labels(reason="transport").inc()
+            return None, e
+
+        if response.is_error:
+            # Тело ошибки нужно прочитать явно, если ответ открыт в режиме stream
+            await response.aread()
+            await response.aclose()
+
+        if response.status_code == 401 and authorized:
+            # Токен отозван раньше срока - получаем новый и повторяем
+            self._token = None
+            GIGACHAT_FAILED_ATTEMPTS.labels(reason="401").inc()
+            return None, GigaChatError(f"GigaChat отклонил токен: {response.text}")
+        if response.status_code in RETRY_STATUS_CODES:
+            GIGACHAT_FAILED_ATTEMPTS.labels(reason=str(response.status_code)).inc()
+            return None, GigaChatError(f"GigaChat вернул {response.status_code}: {response.text}")
+        if response.is_error:
+            raise GigaChatError(f"GigaChat вернул {response.status_code}: {response.text}")
+
+        return response, None
+
+
+_client: Optional[GigaChatClient] = None
+
+
+def get_gigachat_client() -> GigaChatClient:
+    """Единственный на процесс клиент GigaChat с общим пулом соединений и токеном"""
+    global _client
+    if _client is None:
+        _client = GigaChatClient(
+            auth_key=settings.CHAT_TOKEN,
+            oauth_url=settings.GIGACHAT_OAUTH_URL,
+            api_url=settings.GIGACHAT_API_URL,
+            scope=settings.GIGACHAT_SCOPE,
+            timeout=settings.GIGACHAT_TIMEOUT,
+            max_retries=settings.GIGACHAT_MAX_RETRIES,
+            max_concurrency=settings.GIGACHAT_MAX_CONCURRENCY,
+            verify=settings.GIGACHAT_VERIFY_SSL,
+        )
+    return _client
+
+
+async def close_gigachat_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,368 @@
+import logging
+import multiprocessing
+import os
+import pickle
+import tempfile
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+from sqlalchemy import Engine
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import get_engine
+from app.core.tracing import observe_stage
+from app.crud.documents import DocumentCRUD
+from app.models.chunks import ChunkDiff, TextChunk
+from app.models.documents import DocumentCreate
+from app.services.blob_store import get_blob_store
+from app.services.embedding_model import model_registry
+from app.services.pdf_extractors import count_pdf_pages
+from app.services.pdf_processor import PDFProcessor
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IngestionJob:
+    file_path: str
+    title: str
+    doc_type: str
+    doc_number: Optional[str] = None
+    source_url: Optional[str] = None
+
+
+@dataclass
+class FileReport:
+    file_path: str
+    status: str = "pending"  # pending, done, skipped, failed
+    pages: int = 0
+    chunks: int = 0
+    embedded_chunks: int = 0
+    deleted_chunks: int = 0
+    document_id: Optional[uuid.UUID] = None
+    stage_seconds: Dict[str, float] = field(default_factory=dict)
+    embed_wait_seconds: float = 0.0  # писатель ждал эмбеддинги пачек
+    error: Optional[str] = None
+
+
+@dataclass
+class ParsedDocument:
+    """Результат стадии parse: чанки лежат пачками во временном файле chunks_path"""
+    job: IngestionJob
+    file_hash: str
+    pages: int
+    chunks: int
+    chunks_path: str
+    parse_seconds: float
+
+
+class EmbeddingError(Exception):
+    """Ошибка стадии embed во время потоковой записи документа"""
+
+
+@dataclass
+class IngestionSummary:
+    reports: List[FileReport]
+    total_seconds: float
+
+    def stage_throughput(self) -> Dict[str, float]:
+        """Пропускная способность стадий: страниц/с для parse, чанков/с для embed и write"""
+        done = [report for report in self.reports if report.status == "done"]
+        units = {
+            "parse": sum(report.pages for report in done),
+            "embed": sum(report.embedded_chunks for report in done),
+            "write": sum(report.chunks for report in done),
+        }
+        throughput = {}
+        for stage, count in units.items():
+            seconds = sum(report.stage_seconds.get(stage, 0.0) for report in done)
+            throughput[stage] = count / seconds if seconds else 0.0
+        return throughput
+
+
+def parse_document(job: IngestionJob, batch_size: int) -> ParsedDocument:
+    """
+    Стадия parse (процесс-воркер): чтение PDF, хеш, разбивка на чанки.
+    Пачки чанков по мере разбивки сбрасываются во временный файл, поэтому ни воркер,
+    ни основной процесс не держат в памяти все чанки документа.
+    """
+    start = time.perf_counter()
+    with open(job.file_path, "rb") as f:
+        file_binary = f.read()
+
+    processor = PDFProcessor()
+    chunk_count = 0
+    fd, chunks_path = tempfile.mkstemp(prefix="ingest-", suffix=".chunks")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for batch in processor.read_and_split(file_binary, batch_size):
+                pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+                chunk_count += len(batch)
+    except BaseException:
+        os.unlink(chunks_path)
+        raise
+
+    return ParsedDocument(
+        job=job,
+        file_hash=processor.compute_binary_hash(file_binary),
+        pages=count_pdf_pages(file_binary),
+        chunks=chunk_count,
+        chunks_path=chunks_path,
+        parse_seconds=time.perf_counter() - start,
+    )
+
+
+def iter_chunk_batches(chunks_path: str) -> Iterator[List[TextChunk]]:
+    """Пачки чанков, сброшенные parse_document, по одной"""
+    with open(chunks_path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def _init_embedding_worker(model_name: str, device: str) -> None:
+    # Модель загружается один раз на процесс-воркер
+    model_registry.get(model_name, device)
+
+
+def embed_texts(texts: List[str], model_name: str, device: str, batch_size: int) -> tuple[np.ndarray, float]:
+    """Стадия embed (процесс-воркер): эмбеддинги float32 для списка текстов"""
+    start = time.perf_counter()
+    model = model_registry.get(model_name, device)
+    embeddings = model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    return embeddings.astype(np.float32, copy=False), time.perf_counter() - start
+
+
+class IngestionRunner:
+    """
+    Параллельная загрузка набора PDF.
+
+    Парсинг идет в пуле процессов, воркер сбрасывает чанки документа пачками во
+    временный файл. Запись в БД выполняет один писатель в текущем процессе: он читает
+    пачки по одной, заранее отправляет следующие в пул процессов эмбеддинга (модель
+    загружается один раз на воркер) и вставляет готовые, по транзакции на документ.
+    В памяти одновременно только несколько пачек, сколько бы страниц ни было в документе.
+    Стадии перекрываются: пока пишется один документ, другие парсятся, а его следующие
+    пачки кодируются.
+
+    В режиме incremental документы с неизменным file_hash пропускаются, а у
+    измененных кодируются и вставляются только чанки с новым content_hash;
+    исчезнувшие чанки удаляются, остальные сохраняют свои эмбеддинги.
+    """
+
+    def __init__(
+            self,
+            parse_workers: Optional[int] = None,
+            embed_workers: int = 1,
+            embed_batch_size: int = 32,
+            engine: Optional[Engine] = None,
+            on_progress: Optional[Callable[[FileReport], None]] = None,
+            incremental: bool = False,
+    ):
+        self.parse_workers = parse_workers or max(1, (os.cpu_count() or 2) - embed_workers)
+        self.embed_workers = embed_workers
+        self.embed_batch_size = embed_batch_size
+        self.engine = engine
+        self.on_progress = on_progress or log_progress
+        self.incremental = incremental
+        self._document_ids: Dict[str, uuid.UUID] = {}
+
+    def run(self, jobs: Iterable[IngestionJob]) -> IngestionSummary:
+        jobs = list(jobs)
+        reports = {job.file_path: FileReport(file_path=job.file_path) for job in jobs}
+        start = time.perf_counter()
+
+        # spawn: воркеры не наследуют потоки и состояние torch родительского процесса
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(self.parse_workers, mp_context=context) as parse_pool, \
+                ProcessPoolExecutor(
+                    self.embed_workers,
+                    mp_context=context,
+                    initializer=_init_embedding_worker,
+                    initargs=(settings.EMBEDDING_MODEL_NAME, settings.EMBEDDING_DEVICE),
+                ) as embed_pool:
+            parse_futures = {
+                parse_pool.submit(parse_document, job, settings.INGEST_BATCH_SIZE): job
+                for job in jobs
+                if not (self.incremental and self._unchanged(job, reports[job.file_path]))
+            }
+
+            for future in as_completed(parse_futures):
+                report = reports[parse_futures[future].file_path]
+                parsed = self._on_parsed(future, report)
+                if parsed is None:
+                    continue
+                try:
+                    self._write(parsed, embed_pool, report)
+                finally:
+                    os.unlink(parsed.chunks_path)
+
+        return IngestionSummary(reports=list(reports.values()), total_seconds=time.perf_counter() - start)
+
+    def _unchanged(self, job: IngestionJob, report: FileReport) -> bool:
+        """Документ уже загружен с тем же file_hash; запоминает ID измененных документов"""
+        with open(job.file_path, "rb") as f:
+            file_hash = PDFProcessor().compute_binary_hash(f.read())
+
+        with Session(self.engine or get_engine()) as session:
+            version = DocumentCRUD(session).get_document_version(job.title)
+        if version is None:
+            return False
+
+        document_id, stored_hash = version
+        if stored_hash != file_hash:
+            self._document_ids[job.file_path] = document_id
+            return False
+
+        report.status = "skipped"
+        report.document_id = document_id
+        self.on_progress(report)
+        return True
+
+    def _on_parsed(self, future: Future, report: FileReport) -> Optional[ParsedDocument]:
+        try:
+            parsed = future.result()
+        except Exception as e:
+            self._fail(report, "parse", e)
+            return None
+
+        report.pages = parsed.pages
+        report.chunks = parsed.chunks
+        report.stage_seconds["parse"] = parsed.parse_seconds
+        # parse и embed идут в процессах пула - их время учитывается здесь, по отчету воркера
+        observe_stage("ingest.parse", parsed.parse_seconds)
+        return parsed
+
+    def _embed_ahead(self, embed_pool: Executor, diffs: Iterator[ChunkDiff], report: FileReport) -> Iterator[ChunkDiff]:
+        """
+        Стадия embed: пачки изменений с эмбеддингами новых чанков. Следующие пачки
+        кодируются заранее, в работе не больше двух пачек на процесс пула.
+        """
+        def submit(diff: ChunkDiff) -> Optional[Future]:
+            if not diff.new:
+                return None
+            return embed_pool.submit(
+                embed_texts,
+                [chunk.content for chunk in diff.new],
+                settings.EMBEDDING_MODEL_NAME,
+                settings.EMBEDDING_DEVICE,
+                self.embed_batch_size,
+            )
+
+        in_flight = deque((diff, submit(diff)) for diff in islice(diffs, self.embed_workers * 2))
+        try:
+            while in_flight:
+                diff, future = in_flight.popleft()
+                if future is not None:
+                    wait_start = time.perf_counter()
+                    try:
+                        embeddings, embed_seconds = future.result()
+                    except Exception as e:
+                        raise EmbeddingError(str(e)) from e
+                    report.embed_wait_seconds += time.perf_counter() - wait_start
+                    for chunk, embedding in zip(diff.new, embeddings):
+                        chunk.embedding = embedding
+                    report.embedded_chunks += len(diff.new)
+                    report.stage_seconds["embed"] = report.stage_seconds.get("embed", 0.0) + embed_seconds
+                    observe_stage("ingest.embed", embed_seconds)
+                report.deleted_chunks += len(diff.stale_ids)
+
+                next_diff = next(diffs, None)
+                if next_diff is not None:
+                    in_flight.append((next_diff, submit(next_diff)))
+                yield diff
+        finally:
+            # Запись прервана ошибкой: заранее отправленные пачки не нужны
+            for _, future in in_flight:
+                if future is not None:
+                    future.cancel()
+
+    def _write(self, parsed: ParsedDocument, embed_pool: Executor, report: FileReport) -> None:
+        """
+        Стадия write: единственный писатель, документ и чанки одной транзакцией.
+        Чанки вставляются пачками по мере готовности эмбеддингов.
+        """
+        start = time.perf_counter()
+        try:
+            blob_ref = get_blob_store().put_file(parsed.job.file_path)
+        except Exception as e:
+            self._fail(report, "write", e)
+            return
+
+        document_data = DocumentCreate(
+            title=parsed.job.title,
+            doc_type=parsed.job.doc_type,
+            doc_number=parsed.job.doc_number,
+            file_hash=parsed.file_hash,
+            source_url=parsed.job.source_url,
+            blob_ref=blob_ref,
+        )
+
+        processor = PDFProcessor()
+        document_id = self._document_ids.get(parsed.job.file_path)
+        try:
+            with Session(self.engine or get_engine()) as session:
+                # У измененного документа кодируются и вставляются только чанки с новым content_hash
+                stored = processor.get_stored_chunks(session, document_id) if document_id is not None else {}
+                diffs = self._embed_ahead(
+                    embed_pool, processor.iter_chunk_diffs(stored, iter_chunk_batches(parsed.chunks_path)), report
+                )
+                if document_id is not None:
+                    document = processor.update_document(session, document_id, document_data, diffs)
+                else:
+                    document = processor.save_document(
+                        session, document_data, (chunk for diff in diffs for chunk in diff.new)
+                    )
+                report.document_id = document.id
+        except EmbeddingError as e:
+            self._fail(report, "embed", e)
+            return
+        except Exception as e:
+            self._fail(report, "write", e)
+            return
+
+        # Кодирование идет параллельно с записью: ожидание эмбеддингов не входит во время записи
+        report.stage_seconds["write"] = time.perf_counter() - start - report.embed_wait_seconds
+        observe_stage("ingest.write", report.stage_seconds["write"])
+        report.status = "done"
+        self.on_progress(report)
+
+    def _fail(self, report: FileReport, stage: str, error: Exception) -> None:
+        report.status = "failed"
+        report.error = f"{stage}: {error}"
+        self.on_progress(report)
+
+
+def log_progress(report: FileReport) -> None:
+    if report.status == "done":
+        stages = ", ".join(f"{stage} {seconds:.2f} с" for stage, seconds in report.stage_seconds.items())
+        logger.info(
+            "PDF обработан: %s, страниц: %d, чанков: %d, новых: %d, удалено: %d (%s)",
+            report.file_path, report.pages, report.chunks, report.embedded_chunks, report.deleted_chunks, stages,
+        )
+    elif report.status == "skipped":
+        logger.info("PDF не изменился, пропущен: %s", report.file_path)
+    else:
+        logger.error("Ошибка обработки PDF %s: %s", report.file_path, report.error)
+
+
+def log_summary(summary: IngestionSummary) -> None:
+    done = sum(report.status == "done" for report in summary.reports)
+    skipped = sum(report.status == "skipped" for report in summary.reports)
+    failed = sum(report.status == "failed" for report in summary.reports)
+    throughput = summary.stage_throughput()
+    logger.info(
+        "Загружено файлов: %d, без изменений: %d, с ошибками: %d, за %.1f с; "
+        "parse %.1f стр/с, embed %.1f чанков/с, write %.1f чанков/с",
+        done, skipped, failed, summary.total_seconds, throughput["parse"], throughput["embed"], throughput["write"],
+    )
@@ -0,0 +1,216 @@
+import io
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional
+
+import pdfplumber
+from pdfminer.converter import TextConverter
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from PyPDF2 import PdfReader
+
+from app.core.config import settings
+
+
+class PageExtractor(ABC):
+    """Открытый PDF, из которого можно извлекать текст страниц по индексу"""
+
+    name: str
+
+    @property
+    @abstractmethod
+    def page_count(self) -> int:
+        ...
+
+    @abstractmethod
+    def extract_page(self, index: int) -> Dict:
+        """Метаданные страницы: page_number, text, bbox, width, height, extractor"""
+        ...
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _page_data(self, index: int, text: str, bbox, width, height) -> Dict:
+        return {
+            'page_number': index + 1,
+            'text': text,
+            'bbox': bbox,
+            'width': width,
+            'height': height,
+            'extractor': self.name,
+        }
+
+
+class PdfplumberExtractor(PageExtractor):
+    """Медленный, но наиболее точный по раскладке текста бэкенд"""
+
+    name = "pdfplumber"
+
+    def __init__(self, file_binary: bytes):
+        self._pdf = pdfplumber.open(io.BytesIO(file_binary))
+
+    @property
+    def page_count(self) -> int:
+        return len(self._pdf.pages)
+
+    def extract_page(self, index: int) -> Dict:
+        page = self._pdf.pages[index]
+        page_data = self._page_data(
+            index, page.extract_text() or "", page.bbox if page.bbox else None, page.width, page.height
+        )
+        # Сбрасываем кэш объектов страницы, чтобы память не росла с числом страниц
+        page.close()
+        return page_data
+
+    def close(self) -> None:
+        self._pdf.close()
+
+
+class PypdfExtractor(PageExtractor):
+    """Быстрый бэкенд на PyPDF2: текстовый слой без анализа раскладки"""
+
+    name = "pypdf"
+
+    def __init__(self, file_binary: bytes):
+        self._reader = PdfReader(io.BytesIO(file_binary))
+
+    @property
+    def page_count(self) -> int:
+        return len(self._reader.pages)
+
+    def extract_page(self, index: int) -> Dict:
+        page = self._reader.pages[index]
+        box = page.mediabox
+        width, height = float(box.width), float(box.height)
+        return self._page_data(index, page.extract_text() or "", (0, 0, width, height), width, height)
+
+
+class PdfminerExtractor(PageExtractor):
+    """Быстрый бэкенд на pdfminer с выключенным анализом раскладки (laparams=None)"""
+
+    name = "pdfminer"
+
+    def __init__(self, file_binary: bytes):
+        self._document = PDFDocument(PDFParser(io.BytesIO(file_binary)))
+        self._pages: List[PDFPage] = list(PDFPage.create_pages(self._document))
+        self._resources = PDFResourceManager(caching=True)
+
+    @property
+    def page_count(self) -> int:
+        return len(self._pages)
+
+    def extract_page(self, index: int) -> Dict:
+        page = self._pages[index]
+        output = io.StringIO()
+        device = TextConverter(self._resources, output, laparams=None)
+        try:
+            PDFPageInterpreter(self._resources, device).process_page(page)
+        finally:
+            device.close()
+
+        x0, y0, x1, y1 = page.mediabox
+        return self._page_data(index, output.getvalue(), (x0, y0, x1, y1), x1 - x0, y1 - y0)
+
+
+class FallbackExtractor(PageExtractor):
+    """
+    Постраничный выбор бэкенда: текст берется из быстрого бэкенда, а если он
+    пустой или похож на мусор - страница извлекается заново точным бэкендом
+    """
+
+    name = "auto"
+
+    def __init__(self, file_binary: bytes, fast: PageExtractor):
+        self._file_binary = file_binary
+        self._fast = fast
+        self._accurate: Optional[PageExtractor] = None
+
+    @property
+    def page_count(self) -> int:
+        return self._fast.page_count
+
+    def extract_page(self, index: int) -> Dict:
+        try:
+            page_data = self._fast.extract_page(index)
+        except Exception:
+            page_data = None
+        if page_data is not None and not looks_garbled(page_data['text']):
+            return page_data
+
+        if self._accurate is None:
+            self._accurate = PdfplumberExtractor(self._file_binary)
+        return self._accurate.extract_page(index)
+
+    def close(self) -> None:
+        self._fast.close()
+        if self._accurate is not None:
+            self._accurate.close()
+
+
+EXTRACTORS = {
+    PdfplumberExtractor.name: PdfplumberExtractor,
+    PypdfExtractor.name: PypdfExtractor,
+    PdfminerExtractor.name: PdfminerExtractor,
+}
+
+
+def open_extractor(file_binary: bytes, backend: Optional[str] = None) -> PageExtractor:
+    """Открывает PDF выбранным бэкендом; auto - быстрый бэкенд с откатом на pdfplumber"""
+    backend = backend or settings.PDF_TEXT_BACKEND
+    if backend == "auto":
+        return FallbackExtractor(file_binary, EXTRACTORS[settings.PDF_FAST_TEXT_BACKEND](file_binary))
+    if backend not in EXTRACTORS:
+        raise ValueError(f"Неизвестный бэкенд извлечения текста: {backend}")
+    return EXTRACTORS[backend](file_binary)
+
+
+def count_pdf_pages(file_binary: bytes) -> int:
+    with open_extractor(file_binary) as extractor:
+        return extractor.page_count
+
+
+def iter_pdf_pages(file_binary: bytes, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict]:
+    """Извлекает текст страниц [start, stop) по одной бэкендом из settings.PDF_TEXT_BACKEND"""
+    with open_extractor(file_binary) as extractor:
+        stop = extractor.page_count if stop is None else min(stop, extractor.page_count)
+        for index in range(start, stop):
+            yield extractor.extract_page(index)
+
+
+# Функции процессов-воркеров извлечения лежат здесь, а не в pdf_processor:
+# воркер импортирует только этот модуль, без sentence_transformers и torch
+_worker_pdf_binary: Optional[bytes] = None
+
+
+def init_page_worker(file_binary: bytes) -> None:
+    # Файл передается в процесс-воркер один раз, а не с каждым диапазоном страниц
+    global _worker_pdf_binary
+    _worker_pdf_binary = file_binary
+
+
+def extract_page_range(start: int, stop: int) -> List[Dict]:
+    return list(iter_pdf_pages(_worker_pdf_binary, start, stop))
+
+
+def looks_garbled(text: str) -> bool:
+    """Эвристика: пустой текст, непереведенные глифы (cid:NN), символы замены или мало букв"""
+    stripped = "".join(text.split())
+    if not stripped:
+        return True
+    if "(cid:" in text or "�" in text:
+        return True
+
+    letters = sum(ch.isalpha() for ch in stripped)
+    if letters / len(stripped) < 0.4:
+        return True
+
+    # Слова, склеенные без пробелов, - признак потерянных межсловных интервалов
+    words = text.split()
+    return len(stripped) / len(words) > 25
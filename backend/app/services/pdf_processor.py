@@ -1,20 +1,69 @@
-import io
+import logging
+import multiprocessing
 import uuid
-from typing import List, Dict, Optional
+from array import array
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+from typing import Iterable, Iterator, List, Dict, Optional
 from sqlmodel import Session
-import pdfplumber
+import numpy as np
 from sentence_transformers import SentenceTransformer
 import hashlib
-from app.models.documents import Document, DocumentChunk, DocumentCreate
+from app.core.config import settings
+from app.core.executors import inference_executor, run_in_executor
+from app.core.tracing import span
+from app.models.chunks import ChunkDiff, TextChunk
+from app.models.documents import Document, DocumentCreate
 from app.crud.documents import DocumentCRUD, DocumentChunkCRUD
+from app.services.blob_store import get_blob_store
+from app.services.clause_chunker import ClauseChunker
+from app.services.embedding_batcher import get_embedding_batcher
+from app.services.embedding_cache import query_embedding_cache
+from app.services.embedding_model import model_registry
+from app.services.pdf_extractors import count_pdf_pages, extract_page_range, init_page_worker, iter_pdf_pages
 
 
-class PDFProcessor:
-    def __init__(self):
-        self.embedding_model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2') # sentence-transformers/all-MiniLM-L6-v2 sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2
+logger = logging.getLogger(__name__)
+
 
-    def search_query(self, query:str):
-        return self.embedding_model.encode([query])[0].tolist()
+class PDFProcessor:
+    def __init__(self, embedding_model: Optional[SentenceTransformer] = None, model_name: Optional[str] = None):
+        self.model_name = model_name or settings.EMBEDDING_MODEL_NAME
+        self._embedding_model = embedding_model
+
+    @property
+    def embedding_model(self) -> SentenceTransformer:
+        # Модель берется из реестра процесса при первом обращении: чтение и разбивка PDF
+        # (например, в процессах парсинга) обходятся без загрузки модели
+        if self._embedding_model is None:
+            self._embedding_model = model_registry.get(self.model_name)
+        return self._embedding_model
+
+    def search_query(self, query:str) -> np.ndarray:
+        """Эмбеддинг поискового запроса (float32, только для чтения), повторные запросы берутся из кэша"""
+        embedding = query_embedding_cache.get(self.model_name, query)
+        if embedding is not None:
+            return embedding
+
+        with span("embedding.encode", batch_size=1):
+            embedding = self.embedding_model.encode([query])[0]
+        return query_embedding_cache.put(self.model_name, query, embedding)
+
+    async def asearch_query(self, query: str) -> np.ndarray:
+        """Асинхронный search_query: промахи кэша кодируются пачками вместе с другими запросами"""
+        embedding = await query_embedding_cache.aget(self.model_name, query)
+        if embedding is not None:
+            return embedding
+
+        batcher = get_embedding_batcher()
+        if batcher is not None and batcher.model_name == self.model_name:
+            embedding = await batcher.encode(query)
+        else:
+            with span("embedding.encode", batch_size=1):
+                embedding = (await run_in_executor(inference_executor, self.embedding_model.encode, [query]))[0]
+        return await query_embedding_cache.aput(self.model_name, query, embedding)
 
     # Шаг 1: Чтение PDF файла
     def read_pdf_from_binary(self, file_binary: bytes) -> tuple[str, List[Dict]]:
@@ -24,28 +73,41 @@ class PDFProcessor:
         Returns:
             tuple: (полный_текст, список_страниц_с_метаданными)
         """
-        full_text = ""
-        pages_data = []
-
         try:
-            with pdfplumber.open(io.BytesIO(file_binary)) as pdf:
-                for page_num, page in enumerate(pdf.pages, 1):
-                    page_text = page.extract_text() or ""
-                    full_text += page_text + "\n"
-
-                    pages_data.append({
-                        'page_number': page_num,
-                        'text': page_text,
-                        'bbox': page.bbox if page.bbox else None,
-                        'width': page.width,
-                        'height': page.height
-                    })
-
+            pages_data = list(self.iter_pages(file_binary))
         except Exception as e:
             raise Exception(f"Ошибка чтения PDF: {str(e)}")
 
+        full_text = "\n".join(page['text'] for page in pages_data)
         return full_text.strip(), pages_data
 
+    def iter_pages(self, file_binary: bytes) -> Iterator[Dict]:
+        """
+        Потоково отдает страницы PDF по порядку. Большие документы делятся на
+        диапазоны страниц, которые извлекаются параллельно в пуле процессов;
+        одновременно в работе не больше двух диапазонов на процесс.
+        """
+        workers = settings.PDF_EXTRACT_WORKERS
+        page_count = count_pdf_pages(file_binary)
+        if workers <= 1 or page_count < settings.PDF_PARALLEL_MIN_PAGES:
+            yield from iter_pdf_pages(file_binary)
+            return
+
+        pages_per_task = settings.PDF_PAGES_PER_TASK
+        ranges = iter([(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)])
+
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+                workers, mp_context=context, initializer=init_page_worker, initargs=(file_binary,)
+        ) as pool:
+            in_flight = deque(pool.submit(extract_page_range, *page_range) for page_range in islice(ranges, workers * 2))
+            while in_flight:
+                pages = in_flight.popleft().result()
+                next_range = next(ranges, None)
+                if next_range is not None:
+                    in_flight.append(pool.submit(extract_page_range, *next_range))
+                yield from pages
+
     # Шаг 2: Разбивка текста на чанки
     def split_text_into_chunks(
             self,
@@ -53,82 +115,121 @@ class PDFProcessor:
             pages_data: List[Dict],
             chunk_size: int = 200,
             overlap: int = 50
-    ) -> List[Dict]:
+    ) -> List[TextChunk]:
         """
         Разбивает текст на семантические чанки с учетом границ страниц
 
+        Слова берутся из текста страниц (каждая страница разбивается один раз),
+        text используется только если метаданных страниц нет. Номер страницы
+        чанка ищется бинарным поиском по массиву смещений начала страниц.
+
         Args:
-            text: Полный текст документа
+            text: Полный текст документа (склейка текстов pages_data)
             pages_data: Метаданные страниц
             chunk_size: Максимальное количество слов в чанке
             overlap: Перекрытие между чанками в словах
 
         Returns:
-            List[Dict]: Список чанков с метаданными
+            List[TextChunk]: Список чанков с метаданными
         """
-        words = text.split()
+        words: List[str] = []
+        page_starts = array('q')
+        page_numbers = array('q')
+        for page in pages_data:
+            page_starts.append(len(words))
+            page_numbers.append(page['page_number'])
+            words.extend(page['text'].split())
+        if not pages_data:
+            words = text.split()
+
         chunks = []
+        step = chunk_size - overlap
+        for chunk_index, start_pos in enumerate(range(0, len(words), step)):
+            chunk_words = words[start_pos:start_pos + chunk_size]
+
+            # Последняя страница, начинающаяся не позже start_pos; страницы без слов
+            # делят смещение со следующей и поэтому никогда не выбираются
+            page_index = bisect_right(page_starts, start_pos) - 1
+            page_number = page_numbers[page_index] if page_index >= 0 else 1
+
+            chunks.append(TextChunk(
+                content=' '.join(chunk_words),
+                chunk_index=chunk_index,
+                page_number=page_number,
+                word_count=len(chunk_words),
+                start_position=start_pos,
+                end_position=start_pos + len(chunk_words) - 1
+            ))
+
+        return chunks
+
+    def iter_text_chunks(
+            self,
+            pages: Iterable[Dict],
+            chunk_size: int = 200,
+            overlap: int = 50
+    ) -> Iterator[TextChunk]:
+        """
+        Инкрементальная версия split_text_into_chunks: дает те же чанки, но читает
+        страницы по одной и держит в памяти только текущее окно слов
+        """
+        step = chunk_size - overlap
+        words: List[str] = []
+        word_pages = array('q')
+        base = 0  # позиция words[0] в документе
+        start = 0  # позиция начала следующего чанка
         chunk_index = 0
 
-        # Создаем маппинг позиций в тексте к номерам страниц
-        page_boundaries: List[Dict] = self._create_page_boundaries(pages_data)
-
-        i = 0
-        while i < len(words):
-            # Берем chunk_size слов для чанка
-            chunk_words = words[i:i + chunk_size]
-            chunk_text = ' '.join(chunk_words)
-
-            if not chunk_text.strip():
-                i += chunk_size - overlap
-                continue
-
-            # Определяем номер страницы для этого чанка
-            start_pos = i
-            page_number = self._find_page_for_position(start_pos, page_boundaries)
-
-            chunk_data = {
-                'content': chunk_text,
-                'chunk_index': chunk_index,
-                'page_number': page_number,
-                'word_count': len(chunk_words),
-                'start_position': start_pos,
-                'end_position': i + len(chunk_words) - 1
-            }
-
-            chunks.append(chunk_data)
-            chunk_index += 1
+        for page in pages:
+            page_words = page['text'].split()
+            words.extend(page_words)
+            word_pages.extend(repeat(page['page_number'], len(page_words)))
 
-            # Перемещаемся с учетом overlap
-            i += chunk_size - overlap
+            while base + len(words) >= start + chunk_size:
+                yield self._window_chunk(words, word_pages, start - base, chunk_size, chunk_index, start)
+                chunk_index += 1
+                start += step
 
-        return chunks
+                drop = min(start - base, len(words))
+                del words[:drop]
+                del word_pages[:drop]
+                base += drop
 
-    def _create_page_boundaries(self, pages_data: List[Dict]) -> List[Dict]:
-        """Создает границы страниц для маппинга позиций"""
-        boundaries = []
-        current_position = 0
+        # Хвост документа короче chunk_size
+        while start < base + len(words):
+            yield self._window_chunk(words, word_pages, start - base, chunk_size, chunk_index, start)
+            chunk_index += 1
+            start += step
 
-        for page in pages_data:
-            page_word_count = len(page['text'].split())
-            boundaries.append({
-                'page_number': page['page_number'],
-                'start_position': current_position,
-                'end_position': current_position + page_word_count - 1
-            })
-            current_position += page_word_count
-
-        return boundaries
-
-    def _find_page_for_position(self, position: int, boundaries: List[Dict]) -> int:
-        """Находит номер страницы для позиции в тексте"""
-        for boundary in boundaries:
-            if boundary['start_position'] <= position <= boundary['end_position']:
-                return boundary['page_number']
-        return 1  # fallback
+    def iter_clause_chunks(self, pages: Iterable[Dict], max_tokens: Optional[int] = None) -> Iterator[TextChunk]:
+        """Чанки из целых пунктов документа в пределах бюджета токенов модели эмбеддингов"""
+        chunker = ClauseChunker(
+            model_registry.get_tokenizer(self.model_name),
+            max_tokens=max_tokens or settings.CHUNK_MAX_TOKENS,
+        )
+        return chunker.iter_chunks(pages)
+
+    @staticmethod
+    def _window_chunk(
+            words: List[str],
+            word_pages: array,
+            offset: int,
+            chunk_size: int,
+            chunk_index: int,
+            start_pos: int
+    ) -> TextChunk:
+        chunk_words = words[offset:offset + chunk_size]
+        return TextChunk(
+            content=' '.join(chunk_words),
+            chunk_index=chunk_index,
+            page_number=word_pages[offset],
+            word_count=len(chunk_words),
+            start_position=start_pos,
+            end_position=start_pos + len(chunk_words) - 1
+        )
 
     # Шаг 3: Вычисление эмбеддингов
-    def compute_embeddings(self, chunks: List[Dict]) -> List[Dict]:
+    def compute_embeddings(self, chunks: List[TextChunk]) -> List[TextChunk]:
         """
         Вычисляет эмбеддинги для всех чанков
 
@@ -136,24 +237,24 @@ class PDFProcessor:
             chunks: Список чанков без эмбеддингов
 
         Returns:
-            List[Dict]: Чанки с добавленными эмбеддингами
+            List[TextChunk]: Чанки с добавленными эмбеддингами
         """
-        texts = [chunk['content'] for chunk in chunks]
+        texts = [chunk.content for chunk in chunks]
 
         # Вычисляем эмбеддинги батчами для оптимизации памяти
         batch_size = 32
         embeddings = []
 
         for i in range(0, len(texts), batch_size):
-            print(i)
             batch_texts = texts[i:i + batch_size]
             batch_embeddings = self.embedding_model.encode(batch_texts)
-            embeddings.extend(batch_embeddings.tolist())
+            # float32-массивы передаются в pgvector без промежуточных списков float
+            embeddings.extend(batch_embeddings)
 
         # Добавляем эмбеддинги к чанкам
         for chunk, embedding in zip(chunks, embeddings):
-            chunk['embedding'] = embedding
-        print('chunks', len(chunks), 'embeddings', len(embeddings))
+            chunk.embedding = embedding
+        logger.debug("Вычислено эмбеддингов: %d для %d чанков", len(embeddings), len(chunks))
         return chunks
 
     # Шаг 4: Вычисление хеша из бинарных данных
@@ -163,6 +264,10 @@ class PDFProcessor:
         sha256_hash.update(file_binary)
         return sha256_hash.hexdigest()
 
+    def compute_content_hash(self, content: str) -> str:
+        """SHA256 хеш текста чанка (совпадает с sha256(convert_to(content, 'UTF8')) в PostgreSQL)"""
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
     # Шаг 5: Сохранение в базу данных
     def save_doc_and_embeddings_to_database(
             self,
@@ -174,56 +279,140 @@ class PDFProcessor:
             source_url: Optional[str] = None
     ) -> Document:
         """
-        Полный пайплайн: читает PDF, обрабатывает и сохраняет в БД
+        Полный пайплайн: читает PDF, обрабатывает и сохраняет в БД.
+        Чтение, эмбеддинги и вставка идут пачками чанков, весь документ в памяти не собирается.
         """
-        # Шаг 1: Чтение файла
-        full_text, pages_data = self.read_pdf_from_binary(file_binary)
-
-        # Шаг 2: Вычисление хеша
+        # Шаг 3: Вычисление хеша
         file_hash = self.compute_binary_hash(file_binary)
 
-        # Шаг 4: Создание документа в БД
         document_data = DocumentCreate(
             title=title,
             doc_type=doc_type,
             doc_number=doc_number,
             file_hash=file_hash,
             source_url=source_url,
-            file_binary=file_binary,
-            file_content=full_text
+            blob_ref=get_blob_store().put_bytes(file_binary),
         )
 
-        document_crud = DocumentCRUD(session)
-        document = document_crud.create_document(document_data)
+        # Шаги 1-2 и 4: пачка чанков читается, кодируется и сразу вставляется
+        def embedded_chunks() -> Iterator[TextChunk]:
+            for batch in self.read_and_split(file_binary):
+                with span("ingest.embed", chunks=len(batch)):
+                    self.compute_embeddings(batch)
+                yield from batch
 
-        # Шаг 5: Разбивка на чанки
-        chunks = self.split_text_into_chunks(full_text, pages_data, chunk_size=400, overlap=50)
+        # Шаг 5: Создание документа и чанков в БД
+        with span("ingest.save"):
+            return self.save_document(session, document_data, embedded_chunks())
 
-        # Шаг 6: Вычисление эмбеддингов
-        chunks_with_embeddings = self.compute_embeddings(chunks)
+    def read_and_split(self, file_binary: bytes, batch_size: Optional[int] = None) -> Iterator[List[TextChunk]]:
+        """
+        Шаги без модели: потоковое чтение PDF и разбивка на чанки по мере чтения страниц.
+        Чанки с content_hash отдаются пачками по batch_size (по умолчанию INGEST_BATCH_SIZE);
+        в памяти только текущая страница, окно разбивки и одна пачка.
+        """
+        batch_size = batch_size or settings.INGEST_BATCH_SIZE
+        pages = self.iter_pages(file_binary)
+        if settings.CHUNKING_STRATEGY == "clause":
+            chunks = self.iter_clause_chunks(pages)
+        else:
+            chunks = self.iter_text_chunks(pages, chunk_size=400, overlap=50)
+
+        batch = []
+        for chunk in chunks:
+            chunk.content_hash = self.compute_content_hash(chunk.content)
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def save_document(self, session: Session, document_data: DocumentCreate, chunks: Iterable[TextChunk]) -> Document:
+        """
+        Сохраняет документ и его чанки с эмбеддингами одной транзакцией.
+        Чанки могут поступать генератором: они вставляются пачками по мере поступления.
+        """
+        try:
+            document_crud = DocumentCRUD(session)
+            document = document_crud.add_document(document_data)
+            self._save_chunks_to_db(session, document.id, chunks)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
 
-        # Шаг 7: Сохранение чанков
-        self._save_chunks_to_db(session, document.id, chunks_with_embeddings)
+        return document
+
+    def update_document(
+            self,
+            session: Session,
+            document_id: uuid.UUID,
+            document_data: DocumentCreate,
+            diffs: Iterable[ChunkDiff]
+    ) -> Document:
+        """
+        Обновляет измененный документ одной транзакцией: по каждой пачке изменений
+        (см. iter_chunk_diffs) удаляет устаревшие чанки, переносит позиции сохранившихся
+        и вставляет новые. До коммита поиск видит прежнюю версию документа.
+        """
+        try:
+            document = DocumentCRUD(session).update_document_content(document_id, document_data)
+            chunk_crud = DocumentChunkCRUD(session)
+            for diff in diffs:
+                chunk_crud.delete_chunks(diff.stale_ids)
+                chunk_crud.bulk_update_chunk_positions(diff.kept)
+                self._save_chunks_to_db(session, document_id, diff.new)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
 
         return document
 
+    def get_stored_chunks(self, session: Session, document_id: uuid.UUID) -> Dict[str, List[uuid.UUID]]:
+        """ID сохраненных чанков документа по content_hash (без текста и эмбеддингов)"""
+        stored: Dict[str, List[uuid.UUID]] = {}
+        for chunk_id, content_hash in DocumentChunkCRUD(session).get_chunk_hashes(document_id):
+            stored.setdefault(content_hash, []).append(chunk_id)
+        return stored
+
+    def iter_chunk_diffs(
+            self,
+            stored: Dict[str, List[uuid.UUID]],
+            chunk_batches: Iterable[List[TextChunk]]
+    ) -> Iterator[ChunkDiff]:
+        """
+        Сравнивает пачки новых чанков документа с сохраненными (get_stored_chunks) по content_hash.
+        Совпавшие ID забираются из stored; последняя пачка изменений - оставшиеся, т.е. устаревшие чанки.
+        """
+        for chunks in chunk_batches:
+            diff = ChunkDiff()
+            for chunk in chunks:
+                ids = stored.get(chunk.content_hash)
+                if ids:
+                    diff.kept.append({
+                        'id': ids.pop(),
+                        'chunk_index': chunk.chunk_index,
+                        'page_number': chunk.page_number,
+                        'clause_number': chunk.clause_number,
+                        'word_count': chunk.word_count,
+                    })
+                else:
+                    diff.new.append(chunk)
+            yield diff
+
+        stale_ids = [chunk_id for ids in stored.values() for chunk_id in ids]
+        if stale_ids:
+            yield ChunkDiff(stale_ids=stale_ids)
+
     def _save_chunks_to_db(
             self,
             session: Session,
             document_id: uuid.UUID,
-            chunks: List[Dict]
-    ):
-        """Сохраняет чанки в базу данных"""
+            chunks: Iterable[TextChunk]
+    ) -> List[uuid.UUID]:
+        """Сохраняет чанки в базу данных массовой вставкой, без коммита"""
 
         chunk_crud = DocumentChunkCRUD(session)
-
-        for chunk_data in chunks:
-            chunk = DocumentChunk(
-                document_id=document_id,
-                content=chunk_data['content'],
-                chunk_index=chunk_data['chunk_index'],
-                page_number=chunk_data['page_number'],
-                embedding=chunk_data['embedding'],
-                word_count=chunk_data['word_count']
-            )
-            chunk_crud.create_chunk_document(chunk)
+        return chunk_crud.bulk_create_chunks(document_id, chunks, batch_size=settings.INGEST_BATCH_SIZE)
@@ -0,0 +1,221 @@
+import math
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from transformers import AutoTokenizer, PreTrainedTokenizerBase
+
+from app.core.config import settings
+
+
+# Сколько слов максимум проверяется на совпадение конца одного чанка с началом следующего
+MAX_OVERLAP_WORDS = 200
+# Разделитель фрагментов в контексте промпта
+PASSAGE_SEPARATOR = "\n\n"
+
+
+class TokenCounter:
+    """
+    Подсчет токенов промпта. С PROMPT_TOKENIZER_NAME используется токенизатор
+    с Hugging Face (например, открытый токенизатор GigaChat), без него - оценка
+    по числу символов с запасом для кириллицы.
+    """
+
+    def __init__(self, tokenizer: Optional[PreTrainedTokenizerBase] = None, chars_per_token: float = 3.0):
+        self.tokenizer = tokenizer
+        self.chars_per_token = chars_per_token
+
+    def count(self, text: str) -> int:
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False))
+        return math.ceil(len(text) / self.chars_per_token)
+
+
+_token_counter: Optional[TokenCounter] = None
+_token_counter_lock = threading.Lock()
+
+
+def get_token_counter() -> TokenCounter:
+    """Счетчик токенов процесса; токенизатор загружается при первом вызове (в lifespan)"""
+    global _token_counter
+    if _token_counter is None:
+        with _token_counter_lock:
+            if _token_counter is None:
+                tokenizer = None
+                if settings.PROMPT_TOKENIZER_NAME:
+                    tokenizer = AutoTokenizer.from_pretrained(settings.PROMPT_TOKENIZER_NAME)
+                _token_counter = TokenCounter(tokenizer, settings.PROMPT_CHARS_PER_TOKEN)
+    return _token_counter
+
+
+@dataclass
+class Passage:
+    """Фрагмент контекста: один чанк или несколько соседних чанков одного документа"""
+    rank: int  # позиция лучшего чанка фрагмента в выдаче поиска
+    document_id: object
+    document_title: str
+    doc_number: Optional[str]
+    first_index: Optional[int]
+    last_index: Optional[int]
+    page_number: Optional[int]
+    clause_number: Optional[str]
+    words: List[str]
+
+    def header(self, number: int) -> str:
+        parts = [self.document_title]
+        if self.doc_number and self.doc_number != self.document_title:
+            parts.append(self.doc_number)
+        if self.clause_number:
+            parts.append(f"п. {self.clause_number}")
+        if self.page_number:
+            parts.append(f"стр. {self.page_number}")
+        return f"[{number}] " + ", ".join(parts)
+
+    def render(self, number: int, words: Optional[List[str]] = None) -> str:
+        return f"{self.header(number)}\n{' '.join(self.words if words is None else words)}"
+
+
+@dataclass
+class BuiltPrompt:
+    messages: List[Dict[str, str]]
+    prompt_tokens: int
+    context_tokens: int
+    chunks: int  # чанков на входе
+    passages: int  # фрагментов в промпте после слияния
+    dropped: int  # фрагментов, не вошедших в бюджет
+    truncated: bool  # первый фрагмент обрезан под бюджет
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "context_tokens": self.context_tokens,
+            "prompt_chars": sum(len(message["content"]) for message in self.messages),
+            "chunks": self.chunks,
+            "passages": self.passages,
+            "dropped": self.dropped,
+            "truncated": self.truncated,
+        }
+
+
+def overlap_length(left: List[str], right: List[str], max_words: int = MAX_OVERLAP_WORDS) -> int:
+    """Длина самого длинного конца left, совпадающего с началом right (в словах)"""
+    for length in range(min(len(left), len(right), max_words), 0, -1):
+        if left[-length:] == right[:length]:
+            return length
+    return 0
+
+
+def merge_passages(docs: List[dict]) -> List[Passage]:
+    """
+    Склеивает соседние по chunk_index чанки одного документа, убирая перекрытие
+    текста, и отбрасывает повторы. Фрагменты упорядочены по лучшему чанку в выдаче.
+    """
+    seen_contents = set()
+    passages: List[Passage] = []
+    for rank, doc in enumerate(docs):
+        if doc["content"] in seen_contents:
+            continue
+        seen_contents.add(doc["content"])
+        passages.append(Passage(
+            rank=rank,
+            document_id=doc.get("document_id", doc.get("document_title")),
+            document_title=doc.get("document_title", ""),
+            doc_number=doc.get("doc_number"),
+            first_index=doc.get("chunk_index"),
+            last_index=doc.get("chunk_index"),
+            page_number=doc.get("page_number"),
+            clause_number=doc.get("clause_number"),
+            words=doc["content"].split(),
+        ))
+
+    # Соседние чанки склеиваются в порядке следования в документе
+    by_position = sorted(
+        (passage for passage in passages if passage.first_index is not None),
+        key=lambda passage: (str(passage.document_id), passage.first_index),
+    )
+    merged_into: Dict[int, Passage] = {}
+    previous: Optional[Passage] = None
+    for passage in by_position:
+        if (
+                previous is not None
+                and previous.document_id == passage.document_id
+                and passage.first_index == previous.last_index + 1
+        ):
+            previous.words.extend(passage.words[overlap_length(previous.words, passage.words):])
+            previous.last_index = passage.last_index
+            previous.rank = min(previous.rank, passage.rank)
+            merged_into[id(passage)] = previous
+            continue
+        previous = passage
+
+    result = [passage for passage in passages if id(passage) not in merged_into]
+    return sorted(result, key=lambda passage: passage.rank)
+
+
+def fit_passages(passages: List[Passage], budget: int, counter: TokenCounter) -> tuple[List[str], int, bool]:
+    """
+    Набирает фрагменты по релевантности, пока они помещаются в бюджет токенов.
+    Не поместившиеся пропускаются; если не помещается даже первый, он обрезается.
+    """
+    separator_tokens = counter.count(PASSAGE_SEPARATOR)
+    blocks: List[str] = []
+    tokens = 0
+    truncated = False
+    for passage in passages:
+        block = passage.render(len(blocks) + 1)
+        # Разделитель стоит только между фрагментами
+        block_tokens = counter.count(block) + (separator_tokens if blocks else 0)
+        if tokens + block_tokens <= budget:
+            blocks.append(block)
+            tokens += block_tokens
+        elif not blocks:
+            block = _truncate(passage, budget, counter)
+            if block:
+                blocks.append(block)
+                tokens = counter.count(block)
+                truncated = True
+    return blocks, tokens, truncated
+
+
+def _truncate(passage: Passage, budget: int, counter: TokenCounter) -> Optional[str]:
+    """Самое длинное начало фрагмента, которое помещается в бюджет (бинарный поиск по словам)"""
+    low, high = 0, len(passage.words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if counter.count(passage.render(1, passage.words[:middle] + ["…"])) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return passage.render(1, passage.words[:low] + ["…"]) if low else None
+
+
+def build_prompt(
+        system: str,
+        template: str,
+        docs: List[dict],
+        budget: Optional[int] = None,
+        counter: Optional[TokenCounter] = None,
+        **template_params,
+) -> BuiltPrompt:
+    """
+    Собирает сообщения для LLM: template форматируется с context - пронумерованными
+    фрагментами документов в пределах budget токенов - и template_params
+    """
+    counter = counter or get_token_counter()
+    budget = settings.PROMPT_CONTEXT_TOKEN_BUDGET if budget is None else budget
+
+    passages = merge_passages(docs)
+    blocks, context_tokens, truncated = fit_passages(passages, budget, counter)
+    messages = [
+        {"role": "system", "content": system},
+        {"role": "user", "content": template.format(context=PASSAGE_SEPARATOR.join(blocks), **template_params)},
+    ]
+    return BuiltPrompt(
+        messages=messages,
+        prompt_tokens=sum(counter.count(message["content"]) for message in messages),
+        context_tokens=context_tokens,
+        chunks=len(docs),
+        passages=len(blocks),
+        dropped=len(passages) - len(blocks),
+        truncated=truncated,
+    )
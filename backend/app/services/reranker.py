@@ -0,0 +1,84 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from sentence_transformers import CrossEncoder
+
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RerankStats:
+    candidates: int
+    scored: int
+    batches: int
+    seconds: float
+    budget_exhausted: bool
+
+
+class CrossEncoderReranker:
+    """
+    Переранжирование кандидатов поиска кросс-энкодером.
+
+    Пары (запрос, чанк) оцениваются пачками по batch_size в порядке исходного
+    ранжирования. Если очередная пачка вышла за latency_budget_ms, оставшиеся
+    кандидаты не оцениваются и идут после оцененных в исходном порядке.
+    """
+
+    def __init__(self, model: CrossEncoder, batch_size: int = 16, latency_budget_ms: Optional[float] = None):
+        self.model = model
+        self.batch_size = batch_size
+        self.latency_budget = latency_budget_ms / 1000 if latency_budget_ms else None
+
+    def rerank(self, query: str, candidates: List[dict], top_k: int) -> Tuple[List[dict], RerankStats]:
+        start = time.perf_counter()
+        scored: List[Tuple[float, dict]] = []
+        batches = 0
+        budget_exhausted = False
+
+        for offset in range(0, len(candidates), self.batch_size):
+            if self.latency_budget is not None and time.perf_counter() - start >= self.latency_budget:
+                budget_exhausted = True
+                break
+            batch = candidates[offset:offset + self.batch_size]
+            scores = self.model.predict([(query, row["content"]) for row in batch], batch_size=self.batch_size)
+            scored.extend(zip((float(score) for score in scores), batch))
+            batches += 1
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        ranked = [{**row, "rerank_score": score} for score, row in scored] + candidates[len(scored):]
+
+        stats = RerankStats(
+            candidates=len(candidates),
+            scored=len(scored),
+            batches=batches,
+            seconds=time.perf_counter() - start,
+            budget_exhausted=budget_exhausted,
+        )
+        return ranked[:top_k], stats
+
+
+_reranker: Optional[CrossEncoderReranker] = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> CrossEncoderReranker:
+    """Реранкер процесса; модель загружается при первом обращении"""
+    global _reranker
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                start = time.perf_counter()
+                model = CrossEncoder(settings.RERANK_MODEL_NAME, device=settings.RERANK_DEVICE, max_length=settings.RERANK_MAX_LENGTH)
+                logger.info("Модель %s загружена за %.2f с", settings.RERANK_MODEL_NAME, time.perf_counter() - start)
+                _reranker = CrossEncoderReranker(
+                    model,
+                    batch_size=settings.RERANK_BATCH_SIZE,
+                    latency_budget_ms=settings.RERANK_LATENCY_BUDGET_MS,
+                )
+    return _reranker
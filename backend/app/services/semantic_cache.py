@@ -0,0 +1,103 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import numpy as np
+
+from app.core.config import settings
+
+
+@dataclass
+class CachedAnswer:
+    embedding: np.ndarray
+    summary_query: str
+    decision: str
+    created_at: float
+
+
+class SemanticAnswerCache:
+    """
+    Кэш готовых ответов generate_answer, ключ - эмбеддинг запроса.
+
+    Запрос считается попаданием, если косинусная близость к сохраненному запросу
+    не ниже threshold. Записи живут ttl_seconds, при переполнении вытесняется
+    давно не использованная запись (LRU). Кэш привязан к версии корпуса
+    документов: при ее смене все записи сбрасываются.
+    """
+
+    def __init__(self, threshold: float, ttl_seconds: float, max_entries: int):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self._ids = itertools.count()
+        self._corpus_version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def lookup(self, query_embedding: Sequence[float], corpus_version: str) -> Optional[CachedAnswer]:
+        query = self._normalize(query_embedding)
+
+        with self._lock:
+            self._sync_corpus_version(corpus_version)
+            self._evict_expired()
+            if not self._entries:
+                return None
+
+            keys = list(self._entries.keys())
+            matrix = np.stack([entry.embedding for entry in self._entries.values()])
+            similarities = matrix @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+
+            self._entries.move_to_end(keys[best])
+            return self._entries[keys[best]]
+
+    def store(self, query_embedding: Sequence[float], corpus_version: str, summary_query: str, decision: str) -> None:
+        entry = CachedAnswer(
+            embedding=self._normalize(query_embedding),
+            summary_query=summary_query,
+            decision=decision,
+            created_at=time.monotonic(),
+        )
+
+        with self._lock:
+            self._sync_corpus_version(corpus_version)
+            self._entries[next(self._ids)] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _sync_corpus_version(self, corpus_version: str) -> None:
+        if corpus_version != self._corpus_version:
+            self._entries.clear()
+            self._corpus_version = corpus_version
+
+    def _evict_expired(self) -> None:
+        deadline = time.monotonic() - self.ttl_seconds
+        expired = [key for key, entry in self._entries.items() if entry.created_at < deadline]
+        for key in expired:
+            del self._entries[key]
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+answer_cache = SemanticAnswerCache(
+    threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+    ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+    max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+)
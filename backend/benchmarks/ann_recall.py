@@ -0,0 +1,89 @@
+"""
+Recall@k и задержка ANN-поиска относительно точного поиска.
+
+Запуск из каталога backend при заполненной таблице document_chunks:
+
+    python -m benchmarks.ann_recall --queries 200 --k 5 --ef-search 10 40 100 --probes 1 10 30
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+from sqlalchemy import text
+from sqlmodel import Session, select
+
+from app.core.db import get_engine
+from app.crud.documents import DocumentChunkCRUD
+from app.models.documents import DocumentChunk
+from benchmarks.common import percentile
+
+
+def sample_query_vectors(session: Session, count: int, noise: float, seed: int) -> list[np.ndarray]:
+    """Берет случайные эмбеддинги из корпуса и слегка зашумляет их"""
+    statement = select(DocumentChunk.embedding).order_by(text("random()")).limit(count)
+    rng = np.random.default_rng(seed)
+    vectors = []
+    for embedding in session.exec(statement).all():
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector = vector + rng.normal(0.0, noise, size=vector.shape).astype(np.float32)
+        vectors.append(vector)
+    return vectors
+
+
+def run_search(session: Session, query: np.ndarray, k: int, exact: bool = False, **params) -> tuple[set, float]:
+    crud = DocumentChunkCRUD(session)
+    start = time.perf_counter()
+    if exact:
+        # Без индексного сканирования планировщик выполнит полный точный перебор
+        session.execute(text("SET LOCAL enable_indexscan = off"))
+    rows = crud.search_similar_chunks_sqlmodel(query, limit=k, min_similarity=-1.0, **params)
+    elapsed = time.perf_counter() - start
+    session.rollback()
+    return {row["id"] for row in rows}, elapsed
+
+
+def report(label: str, recalls: list[float], latencies: list[float]) -> None:
+    print(
+        f"{label:<24} recall@k={statistics.fmean(recalls):.4f} "
+        f"p50={percentile(latencies, 50) * 1000:.2f}ms p99={percentile(latencies, 99) * 1000:.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--noise", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--ef-search", type=int, nargs="*", default=[10, 40, 100, 200])
+    parser.add_argument("--probes", type=int, nargs="*", default=[])
+    args = parser.parse_args()
+
+    with Session(get_engine()) as session:
+        queries = sample_query_vectors(session, args.queries, args.noise, args.seed)
+        if not queries:
+            print("Таблица document_chunks пуста")
+            return
+
+        exact_results = []
+        exact_latencies = []
+        for query in queries:
+            ids, elapsed = run_search(session, query, args.k, exact=True)
+            exact_results.append(ids)
+            exact_latencies.append(elapsed)
+        report("exact", [1.0] * len(queries), exact_latencies)
+
+        variants = [("ef_search", value) for value in args.ef_search] + [("probes", value) for value in args.probes]
+        for param, value in variants:
+            recalls = []
+            latencies = []
+            for query, expected in zip(queries, exact_results):
+                ids, elapsed = run_search(session, query, args.k, **{param: value})
+                recalls.append(len(ids & expected) / max(len(expected), 1))
+                latencies.append(elapsed)
+            report(f"{param}={value}", recalls, latencies)
+
+
+if __name__ == "__main__":
+    main()
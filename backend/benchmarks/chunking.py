@@ -0,0 +1,94 @@
+"""
+Скорость разбивки на чанки: split_text_into_chunks и iter_text_chunks против
+прежней реализации с линейным поиском страницы для каждого чанка.
+
+Совпадение результатов с прежней реализацией проверяет tests/test_text_chunking.py.
+
+Запуск из каталога backend:
+
+    python -m benchmarks.chunking --pages 2000 --chunk-size 400 --overlap 50
+"""
+import argparse
+import time
+from dataclasses import asdict
+from typing import Callable, Dict, List
+
+from app.services.pdf_processor import PDFProcessor
+from benchmarks.sample_pdfs import generate_pages
+
+
+def legacy_split_text_into_chunks(text: str, pages_data: List[Dict], chunk_size: int, overlap: int) -> List[Dict]:
+    """Прежняя реализация: на каждый чанк - проход по всем границам страниц"""
+    boundaries = []
+    current_position = 0
+    for page in pages_data:
+        page_word_count = len(page['text'].split())
+        boundaries.append((page['page_number'], current_position, current_position + page_word_count - 1))
+        current_position += page_word_count
+
+    def find_page(position: int) -> int:
+        for page_number, start, end in boundaries:
+            if start <= position <= end:
+                return page_number
+        return 1
+
+    words = text.split()
+    chunks = []
+    for chunk_index, i in enumerate(range(0, len(words), chunk_size - overlap)):
+        chunk_words = words[i:i + chunk_size]
+        chunks.append({
+            'content': ' '.join(chunk_words),
+            'chunk_index': chunk_index,
+            'page_number': find_page(i),
+            'word_count': len(chunk_words),
+            'start_position': i,
+            'end_position': i + len(chunk_words) - 1,
+        })
+    return chunks
+
+
+def as_dicts(chunks) -> List[Dict]:
+    rows = []
+    for chunk in chunks:
+        row = asdict(chunk)
+        row.pop('embedding')
+        row.pop('clause_number')
+        row.pop('content_hash')
+        rows.append(row)
+    return rows
+
+
+def measure(label: str, func: Callable[[], list], repeat: int) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = func()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<16} {best * 1000:9.1f} ms  ({len(chunks)} чанков)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=400)
+    parser.add_argument("--overlap", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages_data = [
+        {'page_number': number, 'text': page_text}
+        for number, page_text in enumerate(generate_pages(args.pages), start=1)
+    ]
+    # Пустые страницы (сканы, разделители) проверяют пропуск страниц без слов
+    for page in pages_data[::97]:
+        page['text'] = ""
+    text = "\n".join(page['text'] for page in pages_data).strip()
+
+    processor = PDFProcessor()
+    measure("legacy", lambda: legacy_split_text_into_chunks(text, pages_data, args.chunk_size, args.overlap), args.repeat)
+    measure("split", lambda: processor.split_text_into_chunks(text, pages_data, args.chunk_size, args.overlap), args.repeat)
+    measure("iter", lambda: list(processor.iter_text_chunks(pages_data, args.chunk_size, args.overlap)), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
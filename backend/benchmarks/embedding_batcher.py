@@ -0,0 +1,91 @@
+"""
+Пропускная способность и задержка кодирования запросов: по одному запросу
+на вызов encode против микро-батчинга EmbeddingBatcher.
+
+Запуск из каталога backend:
+
+    python -m benchmarks.embedding_batcher --requests 2000 --concurrency 64 --max-wait-ms 2 5 10
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_model import model_registry
+from benchmarks.common import latency_summary
+
+
+QUERY_TEMPLATES = [
+    "Можно ли удалить перегородку {}",
+    "Перенос мокрой зоны над жилой комнатой {}",
+    "Объединение балкона с комнатой {}",
+    "Требования к вентиляции кухни {}",
+]
+
+
+def make_queries(count: int) -> list[str]:
+    # Уникальные тексты, чтобы кэш эмбеддингов не искажал замер
+    return [QUERY_TEMPLATES[i % len(QUERY_TEMPLATES)].format(i) for i in range(count)]
+
+
+async def drive(encode, queries: list[str], concurrency: int) -> tuple[float, list[float]]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(query: str):
+        async with semaphore:
+            start = time.perf_counter()
+            await encode(query)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(query) for query in queries))
+    return time.perf_counter() - start, latencies
+
+
+def report(label: str, queries: list[str], elapsed: float, latencies: list[float]) -> None:
+    summary = latency_summary(latencies)
+    print(
+        f"{label:<28} {len(queries) / elapsed:8.1f} req/s "
+        f"p50={summary['p50_ms']:.1f}ms p99={summary['p99_ms']:.1f}ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=4, help="Потоки для пути без батчинга")
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, nargs="*", default=[2.0, 5.0, 10.0])
+    args = parser.parse_args()
+
+    model = model_registry.get()
+    model_registry.warmup()
+    queries = make_queries(args.requests)
+    loop = asyncio.get_running_loop()
+
+    # Текущий путь: каждый запрос - отдельный encode с пачкой из одного текста
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        async def encode_single(query: str):
+            return await loop.run_in_executor(executor, model.encode, [query])
+
+        elapsed, latencies = await drive(encode_single, queries, args.concurrency)
+        report("per-request", queries, elapsed, latencies)
+
+    for max_wait_ms in args.max_wait_ms:
+        batcher = EmbeddingBatcher(
+            model=model,
+            model_name="benchmark",
+            max_batch_size=args.max_batch_size,
+            max_wait_ms=max_wait_ms,
+        )
+        await batcher.start()
+        elapsed, latencies = await drive(batcher.encode, queries, args.concurrency)
+        await batcher.stop()
+        report(f"batched wait={max_wait_ms}ms", queries, elapsed, latencies)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,152 @@
+"""
+Локальная замена GigaChat для нагрузочных тестов: те же контракты /api/v2/oauth
+и /api/v1/chat/completions (в том числе stream), но ответ генерируется с заданной
+задержкой, разбросом и долей ошибок.
+
+Запуск из каталога backend:
+
+    python -m benchmarks.gigachat_stub --port 9090 --latency-ms 800 --jitter-ms 200 --error-rate 0.02
+
+Бэкенд направляется на заглушку переменными окружения:
+
+    GIGACHAT_OAUTH_URL=http://127.0.0.1:9090/api/v2/oauth
+    GIGACHAT_API_URL=http://127.0.0.1:9090/api/v1
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass
+from uuid import uuid4
+
+import uvicorn
+from fastapi import FastAPI, Request
+from starlette.responses import JSONResponse, StreamingResponse
+
+
+ANSWER_WORDS = (
+    "Согласно пункту 7.20 СП 54.13330 размещение мокрой зоны над жилыми комнатами не допускается, "
+    "поэтому перенос возможен только в пределах нежилых помещений с устройством гидроизоляции и "
+    "согласованием проекта перепланировки в жилищной инспекции"
+).split()
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 500.0  # до первого токена (stream) или до начала генерации
+    jitter_ms: float = 100.0  # равномерный разброс задержки +-jitter_ms
+    tokens_per_second: float = 50.0  # скорость генерации; 0 - ответ целиком сразу
+    answer_tokens: int = 60
+    error_rate: float = 0.0  # доля запросов chat/completions, завершающихся error_status
+    error_status: int = 503
+    oauth_latency_ms: float = 50.0
+    token_ttl: float = 1800.0
+
+
+def create_app(config: StubConfig) -> FastAPI:
+    app = FastAPI(title="GigaChat stub")
+    rng = random.Random()
+
+    def delay(ms: float) -> float:
+        return max(0.0, ms + rng.uniform(-config.jitter_ms, config.jitter_ms)) / 1000
+
+    def answer_tokens() -> list[str]:
+        return [ANSWER_WORDS[i % len(ANSWER_WORDS)] + " " for i in range(config.answer_tokens)]
+
+    def usage(messages: list[dict], completion_tokens: int) -> dict:
+        # Оценка по символам: заглушке важен порядок размера промпта, а не точное число
+        prompt_tokens = sum(len(message.get("content", "")) for message in messages) // 3
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    @app.post("/api/v2/oauth")
+    async def oauth(request: Request):
+        if not request.headers.get("Authorization", "").startswith("Basic "):
+            return JSONResponse({"code": 6, "message": "credentials doesn't match db data"}, status_code=401)
+        await asyncio.sleep(delay(config.oauth_latency_ms))
+        return {
+            "access_token": uuid4().hex,
+            "expires_at": int((time.time() + config.token_ttl) * 1000),
+        }
+
+    @app.post("/api/v1/chat/completions")
+    async def chat_completions(request: Request):
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            return JSONResponse({"status": 401, "message": "Unauthorized"}, status_code=401)
+        body = await request.json()
+        model = body.get("model", "GigaChat")
+        messages = body.get("messages", [])
+
+        await asyncio.sleep(delay(config.latency_ms))
+        if rng.random() < config.error_rate:
+            return JSONResponse({"status": config.error_status, "message": "stub error"}, status_code=config.error_status)
+
+        tokens = answer_tokens()
+        token_interval = 1 / config.tokens_per_second if config.tokens_per_second else 0.0
+        created = int(time.time())
+
+        if not body.get("stream"):
+            await asyncio.sleep(token_interval * len(tokens))
+            return {
+                "choices": [{
+                    "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                    "index": 0,
+                    "finish_reason": "stop",
+                }],
+                "created": created,
+                "model": model,
+                "object": "chat.completion",
+                "usage": usage(messages, len(tokens)),
+            }
+
+        async def events():
+            for token in tokens:
+                chunk = {
+                    "choices": [{"delta": {"role": "assistant", "content": token}, "index": 0}],
+                    "created": created,
+                    "model": model,
+                    "object": "chat.completion",
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                if token_interval:
+                    await asyncio.sleep(token_interval)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9090)
+    parser.add_argument("--latency-ms", type=float, default=StubConfig.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=StubConfig.jitter_ms)
+    parser.add_argument("--tokens-per-second", type=float, default=StubConfig.tokens_per_second)
+    parser.add_argument("--answer-tokens", type=int, default=StubConfig.answer_tokens)
+    parser.add_argument("--error-rate", type=float, default=StubConfig.error_rate)
+    parser.add_argument("--error-status", type=int, default=StubConfig.error_status)
+    parser.add_argument("--oauth-latency-ms", type=float, default=StubConfig.oauth_latency_ms)
+    parser.add_argument("--token-ttl", type=float, default=StubConfig.token_ttl, help="Время жизни токена в секундах")
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        tokens_per_second=args.tokens_per_second,
+        answer_tokens=args.answer_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        oauth_latency_ms=args.oauth_latency_ms,
+        token_ttl=args.token_ttl,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Время каждой стадии PDFProcessor на сгенерированных PDF: extract (извлечение
+текста), chunk (разбивка и хеши чанков), embed (эмбеддинги) и save (массовая
+вставка в БД; транзакция откатывается).
+
+Запуск из каталога backend:
+
+    python -m benchmarks.ingest_stages --pages 50 500 --output ingest.json
+"""
+import argparse
+import time
+from typing import List
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import get_engine
+from app.crud.documents import DocumentCRUD
+from app.models.documents import DocumentCreate
+from app.services.pdf_processor import PDFProcessor
+from benchmarks.results import BenchmarkResults, default_output_path
+from benchmarks.sample_pdfs import generate_pages, make_pdf
+
+
+def run(results: BenchmarkResults, page_counts: List[int], save: bool = True, seed: int = 0) -> None:
+    processor = PDFProcessor()
+    # Загрузка модели не должна попасть во время первой стадии embed
+    processor.compute_embeddings(list(processor.iter_text_chunks([{'page_number': 1, 'text': "warmup"}])))
+
+    for page_count in page_counts:
+        file_binary = make_pdf(generate_pages(page_count, seed=seed))
+        params = {"pages": page_count, "chunking": settings.CHUNKING_STRATEGY}
+
+        start = time.perf_counter()
+        pages = list(processor.iter_pages(file_binary))
+        extract_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if settings.CHUNKING_STRATEGY == "clause":
+            chunks = list(processor.iter_clause_chunks(pages))
+        else:
+            chunks = list(processor.iter_text_chunks(pages, chunk_size=400, overlap=50))
+        for chunk in chunks:
+            chunk.content_hash = processor.compute_content_hash(chunk.content)
+        chunk_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        processor.compute_embeddings(chunks)
+        embed_s = time.perf_counter() - start
+
+        results.add("ingest.extract", params, seconds_s=extract_s, pages_per_s=page_count / extract_s)
+        results.add("ingest.chunk", params, seconds_s=chunk_s, chunks=len(chunks), chunks_per_s=len(chunks) / chunk_s)
+        results.add("ingest.embed", params, seconds_s=embed_s, chunks_per_s=len(chunks) / embed_s)
+
+        if save:
+            with Session(get_engine()) as session:
+                start = time.perf_counter()
+                try:
+                    document = DocumentCRUD(session).add_document(DocumentCreate(
+                        title=f"benchmark-{page_count}", doc_type="benchmark", doc_number=None,
+                        file_hash=processor.compute_binary_hash(file_binary), source_url=None,
+                        blob_ref=None,
+                    ))
+                    processor._save_chunks_to_db(session, document.id, chunks)
+                    session.flush()
+                    save_s = time.perf_counter() - start
+                finally:
+                    session.rollback()
+            results.add("ingest.save", params, seconds_s=save_s, chunks_per_s=len(chunks) / save_s)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="*", default=[50, 500])
+    parser.add_argument("--no-save", action="store_true", help="Без стадии save (без БД)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="JSON с результатами (по умолчанию benchmark-results/<время>-<коммит>.json)")
+    args = parser.parse_args()
+
+    results = BenchmarkResults()
+    run(results, args.pages, save=not args.no_save, seed=args.seed)
+    output = args.output or default_output_path()
+    results.save(output)
+    print(f"Результаты: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Нагрузочный тест API: N одновременных пользователей в замкнутом цикле шлют
+запросы в поиск (search), generate_answer (answer) и его SSE-вариант (stream)
+в заданной пропорции. Для каждого эндпоинта выводятся RPS, доля ошибок и
+p50/p95/p99 задержки, для stream еще и время до первого токена.
+
+Нужен запущенный Postgres с pgvector и загруженными документами (parse_pdf.py).
+С --spawn тест сам поднимает заглушку GigaChat (benchmarks.gigachat_stub) и
+приложение через uvicorn, направив его на заглушку. Запуск из каталога backend:
+
+    python -m benchmarks.load_test --spawn --users 32 --duration 60 --mix search=6 answer=3 stream=1
+
+Против уже запущенного приложения:
+
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8000 --users 16 --duration 30 --json results.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import latency_summary
+
+
+QUERY_TEMPLATES = [
+    "Можно ли удалить перегородку между кухней и комнатой",
+    "Перенос мокрой зоны над жилой комнатой",
+    "Объединение балкона с комнатой",
+    "Требования к вентиляции кухни",
+    "Можно ли расширить санузел за счет коридора",
+    "Установка газовой плиты в кухне-нише",
+]
+
+
+@dataclass
+class EndpointStats:
+    latencies: List[float] = field(default_factory=list)
+    first_token: List[float] = field(default_factory=list)
+    errors: int = 0
+
+    def summary(self, duration: float) -> Dict[str, float]:
+        requests = len(self.latencies) + self.errors
+        result = {
+            "requests": requests,
+            "errors": self.errors,
+            "error_rate": self.errors / requests if requests else 0.0,
+            "rps": len(self.latencies) / duration if duration else 0.0,
+            **latency_summary(self.latencies),
+        }
+        if self.first_token:
+            result.update({f"ttft_{key}": value for key, value in latency_summary(self.first_token).items()})
+        return result
+
+
+class LoadTest:
+    def __init__(self, base_url: str, mix: Dict[str, float], unique_queries: bool, think_ms: float, timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.mix = mix
+        self.unique_queries = unique_queries
+        self.think = think_ms / 1000
+        self.timeout = timeout
+        self.stats: Dict[str, EndpointStats] = {endpoint: EndpointStats() for endpoint in mix}
+        self._counter = 0
+
+    def next_query(self, rng: random.Random) -> str:
+        query = rng.choice(QUERY_TEMPLATES)
+        if self.unique_queries:
+            # Уникальный хвост, чтобы кэши эмбеддингов и ответов не искажали замер
+            self._counter += 1
+            query = f"{query} {self._counter}"
+        return query
+
+    async def run(self, users: int, duration: float, warmup: float) -> float:
+        limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=limits) as client:
+            loop = asyncio.get_running_loop()
+            measure_from = loop.time() + warmup
+            stop_at = measure_from + duration
+            await asyncio.gather(*(self._user(client, seed, measure_from, stop_at) for seed in range(users)))
+        return duration
+
+    async def _user(self, client: httpx.AsyncClient, seed: int, measure_from: float, stop_at: float) -> None:
+        loop = asyncio.get_running_loop()
+        rng = random.Random(seed)
+        endpoints, weights = list(self.mix), list(self.mix.values())
+        while loop.time() < stop_at:
+            endpoint = rng.choices(endpoints, weights)[0]
+            measured = loop.time() >= measure_from
+            start = time.perf_counter()
+            try:
+                first_token = await getattr(self, f"_{endpoint}")(client, self.next_query(rng))
+            except (httpx.HTTPError, ValueError) as e:
+                if measured:
+                    self.stats[endpoint].errors += 1
+                    print(f"Ошибка {endpoint}: {e!r}", file=sys.stderr)
+            else:
+                # Запросы, завершившиеся после конца замера, не учитываются - иначе RPS завышен
+                if measured and loop.time() <= stop_at:
+                    self.stats[endpoint].latencies.append(time.perf_counter() - start)
+                    if first_token is not None:
+                        self.stats[endpoint].first_token.append(first_token - start)
+            if self.think:
+                await asyncio.sleep(rng.expovariate(1 / self.think))
+
+    @staticmethod
+    async def _search(client: httpx.AsyncClient, query: str) -> None:
+        response = await client.post("/api/docs/search_query", json={"query": query})
+        response.raise_for_status()
+
+    @staticmethod
+    async def _answer(client: httpx.AsyncClient, query: str) -> None:
+        response = await client.post("/api/chat/generate_answer", json={"query": query})
+        response.raise_for_status()
+
+    @staticmethod
+    async def _stream(client: httpx.AsyncClient, query: str) -> Optional[float]:
+        first_token = None
+        async with client.stream("POST", "/api/chat/generate_answer/stream", json={"query": query}) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line == "event: token" and first_token is None:
+                    first_token = time.perf_counter()
+                elif line == "event: error":
+                    raise ValueError("Сервер вернул событие error")
+        return first_token
+
+
+def parse_mix(items: List[str]) -> Dict[str, float]:
+    mix = {}
+    for item in items:
+        endpoint, _, weight = item.partition("=")
+        if endpoint not in ("search", "answer", "stream"):
+            raise argparse.ArgumentTypeError(f"Неизвестный эндпоинт {endpoint}: ожидается search, answer или stream")
+        mix[endpoint] = float(weight or 1)
+    return mix
+
+
+async def wait_ready(url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            with contextlib.suppress(httpx.HTTPError):
+                if (await client.get(url)).status_code < 500:
+                    return
+            await asyncio.sleep(0.5)
+    raise TimeoutError(f"{url} не ответил за {timeout:.0f} с")
+
+
+@contextlib.asynccontextmanager
+async def spawned_servers(args):
+    """Заглушка GigaChat и приложение в отдельных процессах на время теста"""
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    stub = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.gigachat_stub",
+        "--port", str(args.stub_port),
+        "--latency-ms", str(args.stub_latency_ms),
+        "--jitter-ms", str(args.stub_jitter_ms),
+        "--tokens-per-second", str(args.stub_tokens_per_second),
+        "--error-rate", str(args.stub_error_rate),
+    ])
+    env = {
+        **os.environ,
+        "GIGACHAT_OAUTH_URL": f"{stub_url}/api/v2/oauth",
+        "GIGACHAT_API_URL": f"{stub_url}/api/v1",
+        "CHAT_TOKEN": os.environ.get("CHAT_TOKEN", "stub"),
+    }
+    app = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--port", str(args.app_port), "--workers", str(args.app_workers), "--log-level", "warning",
+    ], env=env)
+    try:
+        await wait_ready(f"{stub_url}/docs", 30)
+        # Приложение готово после загрузки модели эмбеддингов в lifespan
+        await wait_ready(f"{args.base_url}/metrics/", args.startup_timeout)
+        yield
+    finally:
+        for process in (app, stub):
+            process.terminate()
+        for process in (app, stub):
+            with contextlib.suppress(subprocess.TimeoutExpired):
+                process.wait(timeout=10)
+
+
+def print_report(report: Dict[str, Dict[str, float]]) -> None:
+    print(f"{'эндпоинт':<8} {'запросов':>8} {'ошибок':>7} {'RPS':>7} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9}")
+    for endpoint, stats in report.items():
+        line = (
+            f"{endpoint:<8} {stats['requests']:>8} {stats['errors']:>7} {stats['rps']:>7.1f} "
+            f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}"
+        )
+        if "ttft_p50_ms" in stats:
+            line += f"  первый токен p50={stats['ttft_p50_ms']:.1f} p95={stats['ttft_p95_ms']:.1f}"
+        print(line)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=None, help="Адрес приложения (по умолчанию http://127.0.0.1:<app-port>)")
+    parser.add_argument("--users", type=int, default=16, help="Одновременных пользователей")
+    parser.add_argument("--duration", type=float, default=30.0, help="Длительность замера в секундах")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Прогрев в секундах, не входит в замер")
+    parser.add_argument("--mix", nargs="*", default=["search=6", "answer=3", "stream=1"], help="Доли эндпоинтов")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Средняя пауза пользователя между запросами")
+    parser.add_argument("--unique-queries", action="store_true", help="Уникальные запросы в обход кэшей")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--json", help="Записать результаты в JSON-файл")
+
+    spawn = parser.add_argument_group("запуск заглушки и приложения (--spawn)")
+    spawn.add_argument("--spawn", action="store_true")
+    spawn.add_argument("--app-port", type=int, default=8000)
+    spawn.add_argument("--app-workers", type=int, default=1)
+    spawn.add_argument("--startup-timeout", type=float, default=180.0)
+    spawn.add_argument("--stub-port", type=int, default=9090)
+    spawn.add_argument("--stub-latency-ms", type=float, default=500.0)
+    spawn.add_argument("--stub-jitter-ms", type=float, default=100.0)
+    spawn.add_argument("--stub-tokens-per-second", type=float, default=50.0)
+    spawn.add_argument("--stub-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    args.base_url = args.base_url or f"http://127.0.0.1:{args.app_port}"
+
+    load_test = LoadTest(args.base_url, parse_mix(args.mix), args.unique_queries, args.think_ms, args.timeout)
+    async with spawned_servers(args) if args.spawn else contextlib.nullcontext():
+        duration = await load_test.run(args.users, args.duration, args.warmup)
+
+    report = {endpoint: stats.summary(duration) for endpoint, stats in load_test.stats.items()}
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "endpoints": report}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+"""
+Скорость (страниц/с) и точность текста бэкендов извлечения на сгенерированных PDF.
+
+Точность - доля совпадающих слов (difflib) между исходным текстом страницы и извлеченным.
+
+Запуск из каталога backend:
+
+    python -m benchmarks.pdf_extractors --documents 5 --pages 40
+"""
+import argparse
+import difflib
+import statistics
+import time
+
+from app.services.pdf_extractors import open_extractor
+from benchmarks.sample_pdfs import generate_pages, make_pdf
+
+
+BACKENDS = ["pdfplumber", "pypdf", "pdfminer", "auto"]
+
+
+def word_fidelity(expected: str, actual: str) -> float:
+    matcher = difflib.SequenceMatcher(None, expected.split(), actual.split(), autojunk=False)
+    return matcher.ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--backends", nargs="*", default=BACKENDS)
+    args = parser.parse_args()
+
+    corpus = []
+    for seed in range(args.documents):
+        pages = generate_pages(args.pages, seed=seed)
+        corpus.append((pages, make_pdf(pages)))
+
+    for backend in args.backends:
+        page_count = 0
+        fidelities = []
+        start = time.perf_counter()
+        for pages, file_binary in corpus:
+            with open_extractor(file_binary, backend) as extractor:
+                for index in range(extractor.page_count):
+                    page = extractor.extract_page(index)
+                    fidelities.append(word_fidelity(pages[index], page['text']))
+                    page_count += 1
+        elapsed = time.perf_counter() - start
+
+        print(
+            f"{backend:<12} {page_count / elapsed:8.1f} pages/s "
+            f"fidelity mean={statistics.fmean(fidelities):.4f} min={min(fidelities):.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Качество и время поиска с переранжированием кросс-энкодером и без него.
+
+Запросы берутся из JSONL-файла (--queries), по строке на запрос:
+
+    {"query": "Можно ли переносить мокрую зону над жилой комнатой", "relevant_clauses": ["7.20"], "document_title": "SP-54.pdf"}
+
+или генерируются из корпуса (--synthetic N): запрос - фрагмент случайного чанка,
+релевантен сам этот чанк. Для каждого варианта (без переранжирования и с
+переранжированием из разного числа кандидатов) считаются hit@k, MRR@k и задержка.
+
+Запуск из каталога backend:
+
+    python -m benchmarks.rerank_eval --synthetic 100 --k 3 --candidates 10 20 50
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.api.utils.doc_search_query import search_chunks
+from app.core.config import settings
+from app.core.db import get_engine
+from app.services.pdf_processor import PDFProcessor
+from benchmarks.common import latency_summary
+
+
+class EvalQuery:
+    def __init__(self, query: str, relevant_ids=(), relevant_clauses=(), document_title: Optional[str] = None):
+        self.query = query
+        self.relevant_ids = {str(chunk_id) for chunk_id in relevant_ids}
+        self.relevant_clauses = set(relevant_clauses)
+        self.document_title = document_title
+
+    def is_relevant(self, row: dict) -> bool:
+        if str(row["id"]) in self.relevant_ids:
+            return True
+        if self.document_title is not None and row["document_title"] != self.document_title:
+            return False
+        return row.get("clause_number") in self.relevant_clauses
+
+
+def load_queries(path: str) -> List[EvalQuery]:
+    with open(path, encoding="utf-8") as f:
+        return [EvalQuery(**json.loads(line)) for line in f if line.strip()]
+
+
+def synthetic_queries(session: Session, count: int, seed: int) -> List[EvalQuery]:
+    rng = random.Random(seed)
+    rows = session.execute(
+        text("SELECT id, content FROM document_chunks WHERE word_count >= 20 ORDER BY random() LIMIT :count"),
+        {"count": count},
+    ).all()
+    queries = []
+    for chunk_id, content in rows:
+        words = content.split()
+        length = rng.randint(8, 15)
+        start = rng.randrange(0, max(1, len(words) - length))
+        queries.append(EvalQuery(" ".join(words[start:start + length]), relevant_ids=[chunk_id]))
+    return queries
+
+
+async def evaluate(label: str, queries: List[EvalQuery], k: int, mode: Optional[str], rerank: bool) -> None:
+    processor = PDFProcessor()
+    hits, reciprocal_ranks, latencies, rerank_latencies = [], [], [], []
+    exhausted = 0
+
+    for eval_query in queries:
+        with Session(get_engine()) as session:
+            start = time.perf_counter()
+            outcome = await search_chunks(session, eval_query.query, processor, limit=k, min_similarity=-1.0, mode=mode, rerank=rerank)
+            latencies.append(time.perf_counter() - start)
+
+        rank = next((i for i, row in enumerate(outcome.results, start=1) if eval_query.is_relevant(row)), None)
+        hits.append(1.0 if rank else 0.0)
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+        if outcome.rerank_stats is not None:
+            rerank_latencies.append(outcome.rerank_stats.seconds)
+            exhausted += outcome.rerank_stats.budget_exhausted
+
+    total = latency_summary(latencies)
+    line = (
+        f"{label:<22} hit@{k}={statistics.fmean(hits):.3f} MRR@{k}={statistics.fmean(reciprocal_ranks):.3f} "
+        f"p50={total['p50_ms']:.1f}ms p95={total['p95_ms']:.1f}ms"
+    )
+    if rerank_latencies:
+        line += f" rerank p95={latency_summary(rerank_latencies)['p95_ms']:.1f}ms бюджет исчерпан: {exhausted}"
+    print(line)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", help="JSONL-файл с размеченными запросами")
+    parser.add_argument("--synthetic", type=int, default=100, help="Число запросов из корпуса, если нет --queries")
+    parser.add_argument("--k", type=int, default=settings.RERANK_TOP_K)
+    parser.add_argument("--candidates", type=int, nargs="*", default=[10, 20, 50])
+    parser.add_argument("--mode", choices=["vector", "lexical", "hybrid"], default=None)
+    parser.add_argument("--budget-ms", type=float, default=None, help="Бюджет переранжирования (по умолчанию без ограничения)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.queries:
+        queries = load_queries(args.queries)
+    else:
+        with Session(get_engine()) as session:
+            queries = synthetic_queries(session, args.synthetic, args.seed)
+    if not queries:
+        print("Нет запросов для оценки")
+        return
+
+    await evaluate("без переранжирования", queries, args.k, args.mode, rerank=False)
+
+    settings.RERANK_LATENCY_BUDGET_MS = args.budget_ms
+    for candidates in args.candidates:
+        settings.RERANK_CANDIDATES = candidates
+        await evaluate(f"rerank из {candidates}", queries, args.k, args.mode, rerank=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
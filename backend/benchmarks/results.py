@@ -0,0 +1,142 @@
+"""
+Машиночитаемые результаты бенчмарков и их сравнение между коммитами.
+
+Файл результатов - JSON с окружением замера (коммит, машина, ключевые настройки)
+и списком записей {"name", "params", "metrics"}. Записи двух файлов сопоставляются
+по name и params; направление метрики определяется по имени: задержки и время
+(*_ms, *_s) - чем меньше, тем лучше, recall и пропускная способность (*_per_s) - чем больше,
+остальные метрики справочные.
+"""
+import json
+import os
+import platform
+import socket
+import subprocess
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+
+SCHEMA_VERSION = 1
+
+
+@dataclass
+class BenchmarkRecord:
+    name: str
+    params: Dict[str, object]
+    metrics: Dict[str, float]
+
+    @property
+    def key(self) -> str:
+        return self.name + "".join(f" {param}={value}" for param, value in sorted(self.params.items()))
+
+
+@dataclass
+class BenchmarkResults:
+    environment: Dict[str, object] = field(default_factory=lambda: collect_environment())
+    records: List[BenchmarkRecord] = field(default_factory=list)
+
+    def add(self, name: str, params: Dict[str, object], **metrics: float) -> BenchmarkRecord:
+        record = BenchmarkRecord(name, params, {metric: round(float(value), 6) for metric, value in metrics.items()})
+        self.records.append(record)
+        print(f"{record.key:<60} " + "  ".join(f"{metric}={value:.4g}" for metric, value in record.metrics.items()))
+        return record
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        payload = {"schema_version": SCHEMA_VERSION, "environment": self.environment,
+                   "records": [asdict(record) for record in self.records]}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "BenchmarkResults":
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+        return cls(
+            environment=payload["environment"],
+            records=[BenchmarkRecord(**record) for record in payload["records"]],
+        )
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def collect_environment() -> Dict[str, object]:
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "host": socket.gethostname(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            name: getattr(settings, name) for name in (
+                "EMBEDDING_MODEL_NAME", "EMBEDDING_DEVICE", "CHUNKING_STRATEGY", "CHUNK_MAX_TOKENS",
+                "PDF_TEXT_BACKEND", "PDF_EXTRACT_WORKERS", "INGEST_BATCH_SIZE",
+                "VECTOR_INDEX_TYPE", "HNSW_M", "HNSW_EF_CONSTRUCTION", "IVFFLAT_LISTS",
+            )
+        },
+    }
+
+
+def default_output_path(directory: str = "benchmark-results") -> str:
+    commit = (_git("rev-parse", "--short", "HEAD") or "nogit")
+    return os.path.join(directory, f"{datetime.now():%Y%m%d-%H%M%S}-{commit}.json")
+
+
+def higher_is_better(metric: str) -> Optional[bool]:
+    """Направление метрики; None - справочное значение (число чанков и т.п.), не сравнивается"""
+    if metric.startswith("recall") or metric.endswith("_per_s"):
+        return True
+    if metric.endswith("_ms") or metric.endswith("_s"):
+        return False
+    return None
+
+
+@dataclass
+class MetricChange:
+    key: str
+    metric: str
+    base: float
+    new: float
+    regression: bool
+
+    @property
+    def change(self) -> float:
+        return (self.new - self.base) / self.base if self.base else 0.0
+
+
+def compare_results(base: BenchmarkResults, new: BenchmarkResults, tolerance: float = 0.1,
+                    recall_tolerance: float = 0.01) -> List[MetricChange]:
+    """
+    Изменения метрик записей, которые есть в обоих файлах. Регрессия - ухудшение
+    больше tolerance (доля) для задержек и скорости и больше recall_tolerance
+    (абсолютное) для recall.
+    """
+    base_records = {record.key: record for record in base.records}
+    changes = []
+    for record in new.records:
+        base_record = base_records.get(record.key)
+        if base_record is None:
+            continue
+        for metric, value in record.metrics.items():
+            direction = higher_is_better(metric)
+            if metric not in base_record.metrics or direction is None:
+                continue
+            base_value = base_record.metrics[metric]
+            if metric.startswith("recall"):
+                regression = base_value - value > recall_tolerance
+            elif direction:
+                regression = value < base_value * (1 - tolerance)
+            else:
+                regression = value > base_value * (1 + tolerance)
+            changes.append(MetricChange(record.key, metric, base_value, value, regression))
+    return changes
@@ -0,0 +1,210 @@
+"""
+Задержка и recall@k search_similar_chunks_sqlmodel на синтетических корпусах
+от 10 тыс. до миллионов чанков для точного поиска и индексов HNSW и IVFFlat.
+
+Корпус - случайные 384-мерные векторы из смеси кластеров (близко к структуре
+реальных эмбеддингов, в отличие от равномерно распределенных векторов). Чанки
+загружаются через COPY ступенями до каждого размера из --sizes; точные k
+ближайших для запросов считаются в numpy по мере генерации, поэтому recall
+не требует точного поиска в БД. На каждой ступени каждый индекс строится заново
+(время построения - отдельная метрика), затем перебираются ef_search или probes.
+
+Все изменения делаются в одной транзакции и откатываются в конце, но на время
+замера рабочий ANN-индекс удален: запускать на отдельной базе для бенчмарков.
+
+Запуск из каталога backend:
+
+    python -m benchmarks.retrieval_scale --sizes 10000 100000 1000000 5000000 --index-types exact hnsw ivfflat
+"""
+import argparse
+import math
+import statistics
+import time
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+import numpy as np
+from pgvector.psycopg import register_vector
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import VECTOR_INDEX_NAME, create_vector_index, get_engine
+from app.crud.documents import DocumentChunkCRUD
+from app.models.documents import Document
+from benchmarks.common import latency_summary
+from benchmarks.results import BenchmarkResults, default_output_path
+
+
+DIMENSIONS = 384
+COPY_BATCH = 10_000
+COPY_COLUMNS = "id, document_id, content, chunk_index, page_number, embedding, word_count, created_at, updated_at"
+COPY_TYPES = ["uuid", "uuid", "text", "int4", "int4", "vector", "int4", "timestamp", "timestamp"]
+
+
+class ClusteredVectors:
+    """Нормированные векторы вокруг clusters случайных центров; spread - норма отклонения от центра"""
+
+    def __init__(self, rng: np.random.Generator, clusters: int, spread: float):
+        self.rng = rng
+        self.centers = self._normalize(rng.normal(size=(clusters, DIMENSIONS)).astype(np.float32))
+        self.spread = spread
+
+    def sample(self, count: int) -> np.ndarray:
+        centers = self.centers[self.rng.integers(0, len(self.centers), size=count)]
+        noise = self.rng.normal(0.0, self.spread / math.sqrt(DIMENSIONS), size=(count, DIMENSIONS))
+        return self._normalize(centers + noise.astype(np.float32))
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class GroundTruth:
+    """Точные k ближайших (по косинусу) для каждого запроса, обновляются пачками корпуса"""
+
+    def __init__(self, queries: np.ndarray, k: int):
+        self.queries = queries
+        self.k = k
+        self.similarities = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        self.indices = np.full((len(queries), k), -1, dtype=np.int64)
+
+    def update(self, vectors: np.ndarray, first_index: int) -> None:
+        similarities = np.concatenate([self.similarities, self.queries @ vectors.T], axis=1)
+        batch_indices = np.broadcast_to(np.arange(first_index, first_index + len(vectors)), (len(self.queries), len(vectors)))
+        indices = np.concatenate([self.indices, batch_indices], axis=1)
+        top = np.argpartition(-similarities, self.k - 1, axis=1)[:, :self.k]
+        self.similarities = np.take_along_axis(similarities, top, axis=1)
+        self.indices = np.take_along_axis(indices, top, axis=1)
+
+    def neighbours(self, query_number: int) -> set:
+        return set(self.indices[query_number].tolist())
+
+
+def copy_chunks(session: Session, document_id: uuid.UUID, first_index: int, vectors: np.ndarray) -> None:
+    connection = session.connection().connection.driver_connection
+    now = datetime.utcnow()
+    with connection.cursor() as cursor:
+        with cursor.copy(f"COPY document_chunks ({COPY_COLUMNS}) FROM STDIN WITH (FORMAT BINARY)") as copy:
+            copy.set_types(COPY_TYPES)
+            for offset, embedding in enumerate(vectors):
+                chunk_index = first_index + offset
+                copy.write_row((uuid.uuid4(), document_id, f"synthetic chunk {chunk_index}", chunk_index, 1, embedding, 3, now, now))
+
+
+def ivfflat_lists(rows: int) -> int:
+    """Рекомендация pgvector: rows / 1000 до миллиона строк, sqrt(rows) после"""
+    return max(1, rows // 1000) if rows <= 1_000_000 else int(math.sqrt(rows))
+
+
+def measure_queries(crud: DocumentChunkCRUD, truth: GroundTruth, k: int, **search_params) -> dict:
+    latencies, recalls = [], []
+    for query_number, query in enumerate(truth.queries):
+        start = time.perf_counter()
+        rows = crud.search_similar_chunks_sqlmodel(query, limit=k, min_similarity=-1.0, doc_type="benchmark", **search_params)
+        latencies.append(time.perf_counter() - start)
+        recalls.append(len({row["chunk_index"] for row in rows} & truth.neighbours(query_number)) / k)
+    return {
+        **latency_summary(latencies),
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "recall_at_k": statistics.fmean(recalls),
+    }
+
+
+def run(
+        results: BenchmarkResults,
+        sizes: List[int],
+        index_types: List[str],
+        ef_search: List[int],
+        probes: List[int],
+        queries: int = 200,
+        k: int = 5,
+        clusters: int = 1000,
+        spread: float = 0.5,
+        lists: Optional[int] = None,
+        maintenance_work_mem: str = "1GB",
+        seed: int = 42,
+) -> None:
+    corpus = ClusteredVectors(np.random.default_rng(seed), clusters, spread)
+    truth = GroundTruth(corpus.sample(queries), k)
+
+    with Session(get_engine()) as session:
+        connection = session.connection()
+        register_vector(connection.connection.driver_connection)
+        # Построение индекса на миллионах строк дольше statement_timeout приложения
+        connection.execute(text("SET LOCAL statement_timeout = 0"))
+        connection.execute(text(f"SET LOCAL maintenance_work_mem = '{maintenance_work_mem}'"))
+        connection.execute(text(f"DROP INDEX IF EXISTS {VECTOR_INDEX_NAME}"))
+
+        document = Document(
+            title=f"benchmark-{uuid.uuid4()}", doc_type="benchmark", doc_number=None,
+            file_hash="0" * 64, source_url=None,
+        )
+        session.add(document)
+        session.flush()
+
+        crud = DocumentChunkCRUD(session)
+        inserted = 0
+        try:
+            for size in sorted(sizes):
+                start = time.perf_counter()
+                for first_index in range(inserted, size, COPY_BATCH):
+                    vectors = corpus.sample(min(COPY_BATCH, size - first_index))
+                    copy_chunks(session, document.id, first_index, vectors)
+                    truth.update(vectors, first_index)
+                connection.execute(text("ANALYZE document_chunks"))
+                load_s = time.perf_counter() - start
+                results.add("search.load", {"size": size}, seconds_s=load_s, chunks_per_s=(size - inserted) / load_s)
+                inserted = size
+
+                for index_type in index_types:
+                    params = {"size": size, "index": index_type, "k": k}
+                    variants = [{}]
+                    if index_type != "exact":
+                        settings.IVFFLAT_LISTS = lists or ivfflat_lists(size)
+                        start = time.perf_counter()
+                        create_vector_index(connection, index_type)
+                        connection.execute(text("ANALYZE document_chunks"))
+                        build_params = {**params, "lists": settings.IVFFLAT_LISTS} if index_type == "ivfflat" else params
+                        results.add("search.build", build_params, seconds_s=time.perf_counter() - start)
+                        variants = [{"ef_search": value} for value in ef_search] if index_type == "hnsw" \
+                            else [{"probes": value} for value in probes]
+
+                    for variant in variants:
+                        results.add("search.query", {**params, **variant}, **measure_queries(crud, truth, k, **variant))
+
+                    connection.execute(text(f"DROP INDEX IF EXISTS {VECTOR_INDEX_NAME}"))
+        finally:
+            session.rollback()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10_000, 100_000])
+    parser.add_argument("--index-types", nargs="*", choices=["exact", "hnsw", "ivfflat"], default=["exact", "hnsw", "ivfflat"])
+    parser.add_argument("--ef-search", type=int, nargs="*", default=[40, 100, 200])
+    parser.add_argument("--probes", type=int, nargs="*", default=[1, 10, 30])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--spread", type=float, default=0.5)
+    parser.add_argument("--lists", type=int, default=None, help="ivfflat lists (по умолчанию по размеру корпуса)")
+    parser.add_argument("--maintenance-work-mem", default="1GB")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="JSON с результатами (по умолчанию benchmark-results/<время>-<коммит>.json)")
+    args = parser.parse_args()
+
+    results = BenchmarkResults()
+    run(
+        results, args.sizes, args.index_types, args.ef_search, args.probes,
+        queries=args.queries, k=args.k, clusters=args.clusters, spread=args.spread, lists=args.lists,
+        maintenance_work_mem=args.maintenance_work_mem, seed=args.seed,
+    )
+    output = args.output or default_output_path()
+    results.save(output)
+    print(f"Результаты: {output}")
+
+
+if __name__ == "__main__":
+    main()
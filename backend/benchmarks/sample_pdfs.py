@@ -0,0 +1,73 @@
+"""
+Генерация синтетических PDF с текстовым слоем для бенчмарков.
+
+PDF собирается вручную со стандартным шрифтом Helvetica, поэтому текст латиницей:
+стандартные шрифты PDF не содержат кириллицы, а встраивание шрифта не нужно
+для замеров скорости и точности извлечения.
+"""
+import random
+from typing import List, Optional
+
+
+VOCABULARY = [
+    "peregorodka", "nesushchaya", "stena", "pomeshchenie", "kvartira", "mokraya", "zona",
+    "ventilyatsiya", "kukhnya", "sanuzel", "balkon", "lodzhiya", "pereplanirovka", "proekt",
+    "trebovaniya", "dopuskaetsya", "ne", "dopuskaetsya", "razmeshchenie", "nad", "zhilymi",
+    "komnatami", "SP", "54.13330.2022", "SNiP", "GOST", "punkt", "5.2.1", "7.3", "9.22",
+]
+
+
+def random_page_lines(rng: random.Random, lines: int = 45, words_per_line: int = 11) -> List[str]:
+    return [" ".join(rng.choice(VOCABULARY) for _ in range(words_per_line)) for _ in range(lines)]
+
+
+def generate_pages(page_count: int, seed: int = 0, lines: int = 45) -> List[str]:
+    """Тексты страниц: строки разделены переводом строки"""
+    rng = random.Random(seed)
+    return ["\n".join(random_page_lines(rng, lines)) for _ in range(page_count)]
+
+
+def make_pdf(pages: List[str], font_size: int = 10) -> bytes:
+    """Собирает PDF, в котором каждая строка текста страницы - отдельная строка на странице"""
+    objects: List[Optional[bytes]] = []
+
+    def add(body: Optional[bytes]) -> int:
+        objects.append(body)
+        return len(objects)
+
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    pages_id = add(None)
+
+    kids = []
+    for text in pages:
+        leading = font_size + 2
+        lines = " ".join(f"({_escape(line)}) '" for line in text.split("\n"))
+        stream = f"BT /F1 {font_size} Tf 50 800 Td {leading} TL {lines} ET".encode("latin-1")
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, content_id, font_id)
+        ))
+
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids)
+    )
+    catalog_id = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref_offset
+    )
+    return bytes(output)
+
+
+def _escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
@@ -0,0 +1,132 @@
+"""
+Задержка семантического поиска в зависимости от числа чанков.
+
+Синтетические чанки со случайными эмбеддингами добавляются в document_chunks
+ступенями до каждого размера из --sizes; на каждой ступени замеряются
+SEARCH_SIMILAR_CHUNKS_SQL и прежний ORM-запрос (расстояние в select и order by,
+порог в Python). Все изменения делаются в одной транзакции и откатываются в конце.
+
+Запуск из каталога backend:
+
+    python -m benchmarks.search_latency --sizes 10000 50000 100000 --queries 200
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import insert, text
+from sqlmodel import Session, select
+
+from app.core.db import VECTOR_INDEX_NAME, get_engine
+from app.crud.documents import DocumentChunkCRUD
+from app.models.documents import Document, DocumentChunk
+from benchmarks.common import latency_summary
+
+
+DIMENSIONS = 384
+INSERT_BATCH = 5000
+
+
+def random_vectors(rng: np.random.Generator, count: int) -> np.ndarray:
+    vectors = rng.normal(size=(count, DIMENSIONS)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def insert_chunks(session: Session, document_id: uuid.UUID, start: int, count: int, rng: np.random.Generator) -> None:
+    now = datetime.utcnow()
+    for offset in range(0, count, INSERT_BATCH):
+        size = min(INSERT_BATCH, count - offset)
+        rows = [
+            {
+                'id': uuid.uuid4(),
+                'document_id': document_id,
+                'content': f"synthetic chunk {start + offset + i}",
+                'chunk_index': start + offset + i,
+                'page_number': 1,
+                'embedding': embedding,
+                'word_count': 3,
+                'created_at': now,
+                'updated_at': now,
+            }
+            for i, embedding in enumerate(random_vectors(rng, size))
+        ]
+        session.execute(insert(DocumentChunk), rows)
+
+
+def legacy_search(session: Session, query_embedding: np.ndarray, limit: int, min_similarity: float) -> list:
+    """Прежний запрос: расстояние считается дважды, порог применяется после LIMIT"""
+    statement = (
+        select(
+            DocumentChunk.id,
+            DocumentChunk.content,
+            DocumentChunk.page_number,
+            Document.title.label("document_title"),
+            Document.doc_number,
+            (DocumentChunk.embedding.cosine_distance(query_embedding)).label("dissimilarity")
+        )
+        .join(Document)
+        .order_by(DocumentChunk.embedding.cosine_distance(query_embedding))
+        .limit(limit)
+    )
+    return [row for row in session.exec(statement).all() if row.dissimilarity <= 1 - min_similarity]
+
+
+def measure(func, queries: np.ndarray) -> dict:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        func(query)
+        latencies.append(time.perf_counter() - start)
+    return latency_summary(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10_000, 50_000, 100_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--min-similarity", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    queries = random_vectors(rng, args.queries)
+
+    with Session(get_engine()) as session:
+        has_index = session.execute(
+            text("SELECT 1 FROM pg_indexes WHERE indexname = :name"), {"name": VECTOR_INDEX_NAME}
+        ).first() is not None
+        print(f"ANN-индекс {VECTOR_INDEX_NAME}: {'есть' if has_index else 'нет, точный перебор'}")
+
+        document = Document(
+            title=f"benchmark-{uuid.uuid4()}", doc_type="benchmark", doc_number=None,
+            file_hash="0" * 64, source_url=None,
+        )
+        session.add(document)
+        session.flush()
+
+        crud = DocumentChunkCRUD(session)
+        inserted = 0
+        try:
+            for size in sorted(args.sizes):
+                insert_chunks(session, document.id, inserted, size - inserted, rng)
+                inserted = size
+                session.execute(text("ANALYZE document_chunks"))
+
+                for label, func in (
+                        ("single-pass", lambda q: crud.search_similar_chunks_sqlmodel(q, limit=args.k, min_similarity=args.min_similarity)),
+                        ("legacy", lambda q: legacy_search(session, q, args.k, args.min_similarity)),
+                ):
+                    summary = measure(func, queries)
+                    print(
+                        f"{size:>10} чанков  {label:<12} "
+                        + "  ".join(f"{key}={value:.2f}" for key, value in summary.items())
+                    )
+        finally:
+            session.rollback()
+
+
+if __name__ == "__main__":
+    main()
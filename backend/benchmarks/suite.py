@@ -0,0 +1,83 @@
+"""
+Набор бенчмарков горячих путей с машиночитаемыми результатами.
+
+run - стадии загрузки PDFProcessor (benchmarks.ingest_stages) и поиск на
+синтетических корпусах (benchmarks.retrieval_scale), результаты пишутся в JSON.
+compare - сравнение двух JSON (например, main и ветки); код выхода 1, если
+какая-то метрика ухудшилась больше допуска - так регрессия видна до деплоя.
+
+Запуск из каталога backend:
+
+    python -m benchmarks.suite run --output base.json
+    python -m benchmarks.suite run --sizes 10000 100000 1000000 5000000 --output new.json
+    python -m benchmarks.suite compare base.json new.json --tolerance 0.15
+"""
+import argparse
+import sys
+
+from benchmarks import ingest_stages, retrieval_scale
+from benchmarks.results import BenchmarkResults, compare_results, default_output_path
+
+
+def run(args) -> None:
+    results = BenchmarkResults()
+    if not args.skip_ingest:
+        ingest_stages.run(results, args.pages, save=not args.skip_search)
+    if not args.skip_search:
+        retrieval_scale.run(
+            results, args.sizes, args.index_types, args.ef_search, args.probes,
+            queries=args.queries, k=args.k, maintenance_work_mem=args.maintenance_work_mem,
+        )
+    output = args.output or default_output_path()
+    results.save(output)
+    print(f"Результаты: {output}")
+
+
+def compare(args) -> int:
+    base, new = BenchmarkResults.load(args.base), BenchmarkResults.load(args.new)
+    print(f"База: {base.environment.get('commit')}  новое: {new.environment.get('commit')}")
+    if base.environment.get("host") != new.environment.get("host"):
+        print("Внимание: замеры сделаны на разных машинах")
+
+    changes = compare_results(base, new, tolerance=args.tolerance, recall_tolerance=args.recall_tolerance)
+    regressions = [change for change in changes if change.regression]
+    for change in changes if args.all else regressions:
+        mark = "РЕГРЕССИЯ" if change.regression else ""
+        print(f"{change.key:<60} {change.metric:<14} {change.base:>12.4g} -> {change.new:<12.4g} {change.change:+7.1%} {mark}")
+    print(f"Сравнено метрик: {len(changes)}, регрессий: {len(regressions)}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Выполнить бенчмарки")
+    run_parser.add_argument("--pages", type=int, nargs="*", default=[50, 500])
+    run_parser.add_argument("--sizes", type=int, nargs="*", default=[10_000, 100_000])
+    run_parser.add_argument("--index-types", nargs="*", choices=["exact", "hnsw", "ivfflat"], default=["exact", "hnsw", "ivfflat"])
+    run_parser.add_argument("--ef-search", type=int, nargs="*", default=[40, 100])
+    run_parser.add_argument("--probes", type=int, nargs="*", default=[10, 30])
+    run_parser.add_argument("--queries", type=int, default=200)
+    run_parser.add_argument("--k", type=int, default=5)
+    run_parser.add_argument("--maintenance-work-mem", default="1GB")
+    run_parser.add_argument("--skip-ingest", action="store_true")
+    run_parser.add_argument("--skip-search", action="store_true", help="Без поиска и без БД")
+    run_parser.add_argument("--output", default=None)
+
+    compare_parser = commands.add_parser("compare", help="Сравнить два файла результатов")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--tolerance", type=float, default=0.1, help="Допустимое ухудшение задержек и скорости (доля)")
+    compare_parser.add_argument("--recall-tolerance", type=float, default=0.01, help="Допустимое падение recall (абсолютное)")
+    compare_parser.add_argument("--all", action="store_true", help="Показать все метрики, а не только регрессии")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""document_chunks clause number
+
+Revision ID: c7d95e1a2f64
+Revises: 8b41d2e6c903
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d95e1a2f64'
+down_revision: Union[str, None] = '8b41d2e6c903'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('document_chunks', sa.Column('clause_number', sqlmodel.sql.sqltypes.AutoString(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('document_chunks', 'clause_number')
@@ -0,0 +1,29 @@
+"""document_chunks content hash
+
+Revision ID: 5e0b7a93d1c2
+Revises: c7d95e1a2f64
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e0b7a93d1c2'
+down_revision: Union[str, None] = 'c7d95e1a2f64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('document_chunks', sa.Column('content_hash', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True))
+    # Тот же хеш, что считает PDFProcessor.compute_content_hash: уже загруженные чанки не придется кодировать заново
+    op.execute("UPDATE document_chunks SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex')")
+
+
+def downgrade() -> None:
+    op.drop_column('document_chunks', 'content_hash')
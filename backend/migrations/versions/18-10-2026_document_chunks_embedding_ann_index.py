@@ -0,0 +1,32 @@
+"""document_chunks embedding ann index
+
+Revision ID: 8b41d2e6c903
+Revises: 1c7e5a0b9d24
+Create Date: 2026-10-18 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b41d2e6c903'
+down_revision: Union[str, None] = '1c7e5a0b9d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Параметры зафиксированы, чтобы схема не зависела от окружения; индекс с типом
+    # и параметрами из Settings перестраивает create_vector_index (parse_pdf --rebuild)
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS ix_document_chunks_embedding_ann ON document_chunks '
+        'USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)'
+    )
+
+
+def downgrade() -> None:
+    op.execute('DROP INDEX IF EXISTS ix_document_chunks_embedding_ann')
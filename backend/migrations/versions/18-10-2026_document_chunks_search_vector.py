@@ -0,0 +1,40 @@
+"""document_chunks search vector
+
+Revision ID: 2d8f4b6a0e95
+Revises: 9a6c2f48e7b1
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d8f4b6a0e95'
+down_revision: Union[str, None] = '9a6c2f48e7b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Сгенерированный столбец заполняется для существующих строк при добавлении.
+    # Выражение зафиксировано в ревизии: изменение модели требует новой миграции
+    op.add_column(
+        'document_chunks',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed("to_tsvector('russian', coalesce(clause_number, '') || ' ' || content)", persisted=True),
+            nullable=True,
+        ),
+    )
+    op.create_index('ix_document_chunks_search_vector', 'document_chunks', ['search_vector'], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_document_chunks_search_vector', table_name='document_chunks')
+    op.drop_column('document_chunks', 'search_vector')
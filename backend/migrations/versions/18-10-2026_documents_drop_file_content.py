@@ -0,0 +1,29 @@
+"""documents drop file_content
+
+Revision ID: 4b7e1c9d2a86
+Revises: 2d8f4b6a0e95
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7e1c9d2a86'
+down_revision: Union[str, None] = '2d8f4b6a0e95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Полный текст документа нигде не читается, а исходный файл лежит в хранилище блобов
+    op.drop_column('documents', 'file_content')
+
+
+def downgrade() -> None:
+    # Текст не восстанавливается: столбец возвращается пустым
+    op.add_column('documents', sa.Column('file_content', sa.Text(), nullable=True))
@@ -0,0 +1,114 @@
+"""documents file_binary to blob store
+
+Revision ID: 9a6c2f48e7b1
+Revises: 5e0b7a93d1c2
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a6c2f48e7b1'
+down_revision: Union[str, None] = '5e0b7a93d1c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Формат хранилища зафиксирован в ревизии и не зависит от app.services.blob_store:
+# root/ab/cd/<sha256>, ссылка sha256:<hash>
+BLOB_REF_PREFIX = 'sha256:'
+
+
+def _blob_store_dir() -> Path:
+    """
+    Каталог хранилища задается явно: config.attributes["blob_store_dir"] (migrate_db),
+    alembic -x blob_store_dir=... или переменная окружения BLOB_STORE_DIR
+    """
+    blob_store_dir = (
+        context.config.attributes.get('blob_store_dir')
+        or context.get_x_argument(as_dictionary=True).get('blob_store_dir')
+        or os.environ.get('BLOB_STORE_DIR')
+    )
+    if not blob_store_dir:
+        raise RuntimeError(
+            'Не задан каталог хранилища блобов: alembic -x blob_store_dir=... или BLOB_STORE_DIR'
+        )
+    return Path(blob_store_dir)
+
+
+def _blob_path(root: Path, blob_ref: str) -> Path:
+    file_hash = blob_ref[len(BLOB_REF_PREFIX):]
+    return root / file_hash[:2] / file_hash[2:4] / file_hash
+
+
+def _put_bytes(root: Path, data: bytes) -> str:
+    """Запись во временный файл и атомарное переименование; существующий блоб не перезаписывается"""
+    blob_ref = BLOB_REF_PREFIX + hashlib.sha256(data).hexdigest()
+    path = _blob_path(root, blob_ref)
+    if path.exists():
+        return blob_ref
+
+    tmp_dir = root / 'tmp'
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return blob_ref
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('blob_ref', sqlmodel.sql.sqltypes.AutoString(length=80), nullable=True))
+
+    # Файлы переносятся по одному, чтобы в памяти был не больше одного файла
+    conn = op.get_bind()
+    document_ids = conn.execute(sa.text('SELECT id FROM documents WHERE file_binary IS NOT NULL')).scalars().all()
+    if document_ids:
+        root = _blob_store_dir()
+    for document_id in document_ids:
+        file_binary = conn.execute(
+            sa.text('SELECT file_binary FROM documents WHERE id = :id'), {'id': document_id}
+        ).scalar_one()
+        blob_ref = _put_bytes(root, bytes(file_binary))
+        conn.execute(
+            sa.text('UPDATE documents SET blob_ref = :blob_ref WHERE id = :id'),
+            {'blob_ref': blob_ref, 'id': document_id},
+        )
+
+    op.drop_column('documents', 'file_binary')
+
+
+def downgrade() -> None:
+    op.add_column('documents', sa.Column('file_binary', sa.LargeBinary(), nullable=True))
+
+    conn = op.get_bind()
+    rows = conn.execute(sa.text('SELECT id, blob_ref FROM documents WHERE blob_ref IS NOT NULL')).all()
+    if rows:
+        root = _blob_store_dir()
+    for document_id, blob_ref in rows:
+        path = _blob_path(root, blob_ref)
+        if not path.exists():
+            continue
+        conn.execute(
+            sa.text('UPDATE documents SET file_binary = :file_binary WHERE id = :id'),
+            {'file_binary': path.read_bytes(), 'id': document_id},
+        )
+
+    op.drop_column('documents', 'blob_ref')
@@ -0,0 +1,84 @@
+"""initial schema
+
+Revision ID: 1c7e5a0b9d24
+Revises: 3f2a9c1d7b40
+Create Date: 2026-10-18 12:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1c7e5a0b9d24'
+down_revision: Union[str, None] = '3f2a9c1d7b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Схема, которую раньше создавал SQLModel.metadata.create_all; последующие ревизии меняют ее
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sqlmodel.sql.sqltypes.AutoString(length=42), nullable=False),
+        sa.Column('hashed_password', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('photo_file_name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('username'),
+    )
+
+    op.create_table(
+        'documents',
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('title', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('doc_type', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('doc_number', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('file_hash', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('mime_type', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('file_binary', sa.LargeBinary(), nullable=True),
+        sa.Column('file_content', sa.Text(), nullable=True),
+        sa.Column('source_url', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('last_checked', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_documents_id', 'documents', ['id'])
+    op.create_index('ix_documents_title', 'documents', ['title'])
+    op.create_index('ix_documents_doc_number', 'documents', ['doc_number'])
+    op.create_index('ix_documents_file_hash', 'documents', ['file_hash'])
+
+    op.create_table(
+        'document_chunks',
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('document_id', sa.Uuid(), nullable=False),
+        sa.Column('content', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('chunk_index', sa.Integer(), nullable=False),
+        sa.Column('page_number', sa.Integer(), nullable=False),
+        sa.Column('embedding', Vector(384), nullable=True),
+        sa.Column('word_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['document_id'], ['documents.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_document_chunks_id', 'document_chunks', ['id'])
+    op.create_index('ix_document_chunks_document_id', 'document_chunks', ['document_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_document_chunks_document_id', table_name='document_chunks')
+    op.drop_index('ix_document_chunks_id', table_name='document_chunks')
+    op.drop_table('document_chunks')
+    op.drop_index('ix_documents_file_hash', table_name='documents')
+    op.drop_index('ix_documents_doc_number', table_name='documents')
+    op.drop_index('ix_documents_title', table_name='documents')
+    op.drop_index('ix_documents_id', table_name='documents')
+    op.drop_table('documents')
+    op.drop_table('users')
@@ -1,23 +1,48 @@
-from sqlalchemy import text
+import argparse
+import logging
 
 from app.api.utils.process_pdf_background import process_pdf_background
-from sqlmodel import SQLModel, Session
-import app.models.documents
-from app.core.db import get_engine
+from app.core.db import create_vector_index, ensure_vector_index, get_engine, init_db
 
 
 def main():
-    print('back startup')
+    parser = argparse.ArgumentParser(description="Загрузка нормативных документов в БД")
+    parser.add_argument("files", nargs="*", help="Файлы из app/services/baza_doc (по умолчанию - весь базовый набор)")
+    parser.add_argument("--parse-workers", type=int, default=None, help="Процессы парсинга PDF")
+    parser.add_argument("--embed-workers", type=int, default=1, help="Процессы вычисления эмбеддингов")
+    parser.add_argument(
+        "--rebuild", action="store_true",
+        help="Откатить и заново применить миграции, загрузить корпус заново (по умолчанию - только новые и измененные документы)"
+    )
+    args = parser.parse_args()
+
+    # Прогресс загрузки пишется в лог
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 
+    print('back startup')
 
-    SQLModel.metadata.drop_all(get_engine())
-    SQLModel.metadata.create_all(get_engine())
+    # Схемой владеет Alembic: upgrade head, с --rebuild - downgrade base и upgrade head
+    init_db(rebuild=args.rebuild)
 
     # Запускаем обработку
-    process_pdf_background('title', 'СНиП', 'СНиП №', 'example.com')
+    process_pdf_background(
+        'title', 'СНиП', 'СНиП №', 'example.com',
+        file_path_list=args.files or None,
+        parse_workers=args.parse_workers,
+        embed_workers=args.embed_workers,
+        incremental=not args.rebuild,
+    )
 
     print("Ожидание завершения обработки...")
 
+    # Индекс строим по уже загруженным данным: так быстрее, а IVFFlat иначе не обучится.
+    # При инкрементальной загрузке существующий индекс обновляется вставками и не пересоздается
+    with get_engine().begin() as conn:
+        if args.rebuild:
+            create_vector_index(conn)
+        else:
+            ensure_vector_index(conn)
+
     print("Скрипт завершен")
 
 if __name__ == "__main__":
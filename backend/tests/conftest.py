@@ -0,0 +1,20 @@
+import os
+
+import pytest
+
+
+# Settings читает обязательные параметры при импорте app.core.config: тестам БД и GigaChat не нужны
+for name, value in {
+    "PROJECT_NAME": "test",
+    "POSTGRES_SERVER": "localhost",
+    "POSTGRES_USER": "test",
+    "POSTGRES_DB": "test",
+    "POSTGRES_PASSWORD": "test",
+    "CHAT_TOKEN": "test",
+}.items():
+    os.environ.setdefault(name, value)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from app.api.utils import chat_pipeline, doc_search_query
+from app.api.utils.chat_pipeline import ChatPipeline
+from app.core.config import settings
+
+
+pytestmark = pytest.mark.anyio
+
+SEARCH_SECONDS = 0.5
+
+
+class FakeProcessor:
+    async def asearch_query(self, query):
+        return [0.0] * 384
+
+
+class SessionLog:
+    """Какие действия с сессией и в каких потоках выполнялись"""
+
+    def __init__(self):
+        self.events = []
+        self.closed = threading.Event()
+
+    def session_factory(self):
+        log = self
+
+        class FakeSession:
+            def __init__(self, engine):
+                pass
+
+            def __enter__(self):
+                log.events.append(("open", threading.get_ident()))
+                return self
+
+            def __exit__(self, *exc_info):
+                log.events.append(("close", threading.get_ident()))
+                log.closed.set()
+
+        return FakeSession
+
+    def crud_factory(self):
+        log = self
+
+        class SlowChunkCRUD:
+            def __init__(self, session):
+                pass
+
+            def search_similar_chunks_sqlmodel(self, query_embedding, **search_params):
+                time.sleep(SEARCH_SECONDS)
+                log.events.append(("query", threading.get_ident()))
+                return []
+
+        return SlowChunkCRUD
+
+
+@pytest.fixture
+def session_log(monkeypatch):
+    log = SessionLog()
+    monkeypatch.setattr(doc_search_query, "Session", log.session_factory())
+    monkeypatch.setattr(doc_search_query, "DocumentChunkCRUD", log.crud_factory())
+    monkeypatch.setattr(doc_search_query, "get_engine", lambda: None)
+    monkeypatch.setattr(settings, "SEARCH_MODE", "vector")
+    monkeypatch.setattr(settings, "RERANK_ENABLED", False)
+
+    async def summarizer(client, query):
+        return query
+
+    monkeypatch.setattr(chat_pipeline, "user_query_summarizer", summarizer)
+    return log
+
+
+async def test_deadline_during_slow_search_leaves_session_to_worker(session_log):
+    pipeline = ChatPipeline(FakeProcessor(), llm_client=None, search_timeout=0.05, retrieval_deadline=1.0)
+
+    start = time.perf_counter()
+    result = await pipeline.retrieve("высота ограждения балкона")
+    elapsed = time.perf_counter() - start
+
+    assert result.timed_out == ["raw_search"]
+    assert result.docs == []
+    assert elapsed < SEARCH_SECONDS
+
+    # Отмена не закрывает сессию на event loop: поток дорабатывает запрос и закрывает ее сам
+    assert session_log.closed.wait(timeout=5)
+    actions = [action for action, _ in session_log.events]
+    threads = {thread for _, thread in session_log.events}
+    assert actions == ["open", "query", "close"]
+    assert len(threads) == 1 and threading.get_ident() not in threads
@@ -0,0 +1,24 @@
+from app.services.clause_chunker import BoilerplateFilter
+
+
+def page_lines(page_number: int) -> list[str]:
+    # Каждая страница начинается с пункта того же вида: с точностью до цифр строки совпадают
+    return [
+        "СП 54.13330.2016 Здания жилые многоквартирные",
+        f"{page_number}.1 Требования к помещениям",
+        "Высота жилых комнат должна быть не менее 2,5 м.",
+        f"{page_number}.2 Размещение санитарных узлов",
+        str(page_number),
+    ]
+
+
+def test_repeated_clause_headings_are_not_boilerplate():
+    pages = [page_lines(page_number) for page_number in range(1, 11)]
+    boilerplate = BoilerplateFilter()
+    boilerplate.fit(pages)
+
+    assert boilerplate.clean(page_lines(7)) == [
+        "7.1 Требования к помещениям",
+        "Высота жилых комнат должна быть не менее 2,5 м.",
+        "7.2 Размещение санитарных узлов",
+    ]
@@ -0,0 +1,51 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from app.services.embedding_batcher import EmbeddingBatcher
+
+
+pytestmark = pytest.mark.anyio
+
+
+class SlowModel:
+    """encode ждет сигнала, чтобы батчер можно было остановить посреди кодирования"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def encode(self, texts):
+        self.started.set()
+        self.release.wait(5)
+        return np.zeros((len(texts), 4), dtype=np.float32)
+
+
+async def test_stop_fails_batch_being_encoded():
+    model = SlowModel()
+    batcher = EmbeddingBatcher(model, "slow", max_wait_ms=1)
+    await batcher.start()
+
+    requests = [asyncio.ensure_future(batcher.encode(text)) for text in ("a", "b")]
+    await asyncio.to_thread(model.started.wait, 5)
+    await batcher.stop()
+    model.release.set()
+
+    results = await asyncio.wait_for(asyncio.gather(*requests, return_exceptions=True), 1)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+async def test_stop_fails_batch_being_collected():
+    model = SlowModel()
+    batcher = EmbeddingBatcher(model, "slow", max_batch_size=8, max_wait_ms=10_000)
+    await batcher.start()
+
+    request = asyncio.ensure_future(batcher.encode("a"))
+    await asyncio.sleep(0.05)
+    await batcher.stop()
+
+    with pytest.raises(RuntimeError):
+        await asyncio.wait_for(request, 1)
+    assert not model.started.is_set()
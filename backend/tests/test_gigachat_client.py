@@ -0,0 +1,165 @@
+import asyncio
+import contextlib
+import json
+import time
+
+import httpx
+import pytest
+from starlette.responses import JSONResponse, StreamingResponse
+
+from app.services.gigachat_client import GigaChatClient, GigaChatError
+from benchmarks.gigachat_stub import StubConfig, create_app
+
+
+pytestmark = pytest.mark.anyio
+
+MESSAGES = [{"role": "user", "content": "Можно ли перенести кухню?"}]
+
+
+class StubRecorder:
+    """
+    ASGI-обертка над заглушкой GigaChat: считает запросы по путям и отвечает
+    на очередные запросы chat/completions ошибками из faults.
+    """
+
+    def __init__(self, app, faults=()):
+        self.app = app
+        self.faults = list(faults)
+        self.calls = {"oauth": 0, "chat": 0}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            if scope["path"].endswith("/oauth"):
+                self.calls["oauth"] += 1
+            elif scope["path"].endswith("/chat/completions"):
+                self.calls["chat"] += 1
+                if self.faults:
+                    status = self.faults.pop(0)
+                    response = JSONResponse({"status": status, "message": "injected"}, status_code=status)
+                    await response(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
+
+
+def stub(faults=(), **config) -> StubRecorder:
+    params = dict(latency_ms=0, jitter_ms=0, tokens_per_second=0, answer_tokens=5, oauth_latency_ms=0)
+    return StubRecorder(create_app(StubConfig(**{**params, **config})), faults)
+
+
+def client_for(app, **kwargs) -> GigaChatClient:
+    params = dict(
+        auth_key="key",
+        oauth_url="http://gigachat/api/v2/oauth",
+        api_url="http://gigachat/api/v1",
+        backoff_base=0.01,
+        transport=httpx.ASGITransport(app=app),
+    )
+    return GigaChatClient(**{**params, **kwargs})
+
+
+async def test_concurrent_chats_share_one_token():
+    app = stub(latency_ms=20, oauth_latency_ms=20)
+    async with contextlib.aclosing(client_for(app)) as client:
+        answers = await asyncio.gather(*(client.chat("GigaChat", MESSAGES) for _ in range(20)))
+
+    assert all(answers)
+    assert app.calls == {"oauth": 1, "chat": 20}
+
+
+async def test_expired_token_is_refreshed():
+    app = stub(token_ttl=0.3)
+    async with contextlib.aclosing(client_for(app, token_refresh_margin=0.1)) as client:
+        await client.chat("GigaChat", MESSAGES)
+        await client.chat("GigaChat", MESSAGES)
+        assert app.calls["oauth"] == 1
+
+        await asyncio.sleep(0.25)
+        await client.chat("GigaChat", MESSAGES)
+
+    assert app.calls["oauth"] == 2
+
+
+async def test_unauthorized_response_refreshes_token():
+    app = stub(faults=[401])
+    async with contextlib.aclosing(client_for(app)) as client:
+        assert await client.chat("GigaChat", MESSAGES)
+
+    assert app.calls == {"oauth": 2, "chat": 2}
+
+
+async def test_transient_errors_are_retried():
+    app = stub(faults=[429, 503, 502])
+    async with contextlib.aclosing(client_for(app, max_retries=3)) as client:
+        assert await client.chat("GigaChat", MESSAGES)
+
+    assert app.calls["chat"] == 4
+
+
+async def test_gives_up_after_max_retries():
+    app = stub(faults=[503] * 10)
+    async with contextlib.aclosing(client_for(app, max_retries=2)) as client:
+        with pytest.raises(GigaChatError, match="после 3 попыток"):
+            await client.chat("GigaChat", MESSAGES)
+
+    assert app.calls["chat"] == 3
+
+
+async def test_client_error_is_not_retried():
+    app = stub(faults=[400])
+    async with contextlib.aclosing(client_for(app)) as client:
+        with pytest.raises(GigaChatError, match="400"):
+            await client.chat("GigaChat", MESSAGES)
+
+    assert app.calls["chat"] == 1
+
+
+async def test_backoff_does_not_hold_concurrency_slot():
+    # Первый запрос получает 503 и ждет повтора; единственный слот в это время свободен для второго
+    app = stub(faults=[503])
+    finished = []
+
+    async def chat(name):
+        await client.chat("GigaChat", MESSAGES)
+        finished.append(name)
+
+    async with contextlib.aclosing(client_for(app, max_concurrency=1, backoff_base=0.2)) as client:
+        await client.get_token()
+        first = asyncio.create_task(chat("first"))
+        await asyncio.sleep(0)
+        await asyncio.gather(first, chat("second"))
+
+    assert finished == ["second", "first"]
+
+
+async def test_stream_chat_yields_answer_and_releases_slot():
+    app = stub(faults=[503], answer_tokens=7)
+    async with contextlib.aclosing(client_for(app, max_concurrency=1)) as client:
+        pieces = [piece async for piece in client.stream_chat("GigaChat", MESSAGES)]
+        # Слот освобожден: следующий запрос не ждет
+        await asyncio.wait_for(client.chat("GigaChat", MESSAGES), timeout=1)
+
+    assert len(pieces) == 7
+    assert app.calls["chat"] == 3
+
+
+async def test_stream_chat_rejects_malformed_chunk():
+    async def completions(scope, receive, send):
+        if scope["path"].endswith("/oauth"):
+            response = JSONResponse({"access_token": "token", "expires_at": int((time.time() + 600) * 1000)})
+        else:
+            async def events():
+                yield 'data: {"choices": [{"delta": {"content": "Ответ"}}]}\n\n'
+                yield f"data: {json.dumps({'status': 500, 'message': 'generation failed'})}\n\n"
+
+            response = StreamingResponse(events(), media_type="text/event-stream")
+        await response(scope, receive, send)
+
+    pieces = []
+    async with contextlib.aclosing(client_for(completions, max_concurrency=1)) as client:
+        with pytest.raises(GigaChatError, match="Неожиданный ответ"):
+            async for piece in client.stream_chat("GigaChat", MESSAGES):
+                pieces.append(piece)
+        # Ошибка посреди потока не оставляет слот занятым
+        assert not client._semaphore.locked()
+
+    assert pieces == ["Ответ"]
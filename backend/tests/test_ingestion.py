@@ -0,0 +1,69 @@
+import os
+import uuid
+
+import pytest
+
+from app.core.config import settings
+from app.models.chunks import TextChunk
+from app.services.ingestion import IngestionJob, iter_chunk_batches, parse_document
+from app.services.pdf_extractors import iter_pdf_pages
+from app.services.pdf_processor import PDFProcessor
+from benchmarks.chunking import as_dicts
+from benchmarks.sample_pdfs import generate_pages, make_pdf
+
+
+@pytest.fixture
+def pdf_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHUNKING_STRATEGY", "window")
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(make_pdf(generate_pages(12, seed=3)))
+    return path
+
+
+def expected_chunks(file_binary):
+    processor = PDFProcessor()
+    return as_dicts(processor.iter_text_chunks(list(iter_pdf_pages(file_binary)), chunk_size=400, overlap=50))
+
+
+def test_read_and_split_yields_batches_with_hashes(pdf_file):
+    file_binary = pdf_file.read_bytes()
+    batches = list(PDFProcessor().read_and_split(file_binary, batch_size=4))
+
+    assert len(batches) > 2
+    assert all(len(batch) == 4 for batch in batches[:-1]) and 0 < len(batches[-1]) <= 4
+    chunks = [chunk for batch in batches for chunk in batch]
+    assert as_dicts(chunks) == expected_chunks(file_binary)
+    assert all(chunk.content_hash == PDFProcessor().compute_content_hash(chunk.content) for chunk in chunks)
+
+
+def test_parse_document_spills_batches_to_file(pdf_file):
+    parsed = parse_document(IngestionJob(file_path=str(pdf_file), title="doc", doc_type="t"), batch_size=4)
+    try:
+        batches = list(iter_chunk_batches(parsed.chunks_path))
+    finally:
+        os.unlink(parsed.chunks_path)
+
+    assert parsed.pages == 12
+    assert parsed.chunks == sum(len(batch) for batch in batches)
+    assert as_dicts([chunk for batch in batches for chunk in batch]) == expected_chunks(pdf_file.read_bytes())
+
+
+def make_chunk(index, content):
+    return TextChunk(
+        content=content, chunk_index=index, page_number=1, word_count=1,
+        start_position=index, end_position=index, content_hash=content,
+    )
+
+
+def test_iter_chunk_diffs_by_batches():
+    kept_id, duplicate_id, stale_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    stored = {"a": [kept_id], "b": [duplicate_id], "c": [stale_id]}
+    batches = [[make_chunk(0, "a"), make_chunk(1, "b")], [make_chunk(2, "b"), make_chunk(3, "d")]]
+
+    diffs = list(PDFProcessor().iter_chunk_diffs(stored, batches))
+
+    assert [row['id'] for row in diffs[0].kept] == [kept_id, duplicate_id]
+    assert diffs[0].new == []
+    # Повтор уже сохраненного текста и новый текст кодируются заново
+    assert [chunk.content for chunk in diffs[1].new] == ["b", "d"]
+    assert diffs[2].stale_ids == [stale_id] and not diffs[2].new and not diffs[2].kept
@@ -0,0 +1,33 @@
+from app.services.prompt_builder import PASSAGE_SEPARATOR, TokenCounter, fit_passages, merge_passages
+
+
+def make_docs(count, words=20):
+    return [
+        {"content": " ".join(f"w{i}_{j}" for j in range(words)), "document_title": f"doc{i}", "chunk_index": 0}
+        for i in range(count)
+    ]
+
+
+def test_fit_passages_counts_real_separator():
+    # Один символ - один токен: бюджет проверяется по длине итогового контекста
+    counter = TokenCounter(chars_per_token=1)
+    passages = merge_passages(make_docs(5))
+    blocks = [passage.render(number) for number, passage in enumerate(passages, start=1)]
+    budget = len(PASSAGE_SEPARATOR.join(blocks[:3])) + len(PASSAGE_SEPARATOR)
+
+    fitted, tokens, truncated = fit_passages(passages, budget, counter)
+
+    context = PASSAGE_SEPARATOR.join(fitted)
+    assert len(fitted) == 3
+    assert tokens == len(context) <= budget
+    assert not truncated
+
+
+def test_fit_passages_truncates_first_passage_to_budget():
+    counter = TokenCounter(chars_per_token=1)
+    passages = merge_passages(make_docs(1, words=200))
+
+    fitted, tokens, truncated = fit_passages(passages, 100, counter)
+
+    assert truncated
+    assert tokens == len(fitted[0]) <= 100
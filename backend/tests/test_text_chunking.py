@@ -0,0 +1,27 @@
+import pytest
+
+from app.services.pdf_processor import PDFProcessor
+from benchmarks.chunking import as_dicts, legacy_split_text_into_chunks
+from benchmarks.sample_pdfs import generate_pages
+
+
+@pytest.fixture(scope="module")
+def pages_data():
+    pages = [
+        {'page_number': number, 'text': page_text}
+        for number, page_text in enumerate(generate_pages(300, seed=7, lines=12), start=1)
+    ]
+    # Пустые страницы (сканы, разделители), в том числе подряд и в начале документа
+    for page in pages[:1] + pages[40:43] + pages[::97]:
+        page['text'] = ""
+    return pages
+
+
+@pytest.mark.parametrize("chunk_size, overlap", [(400, 50), (200, 50), (37, 0), (5, 4)])
+def test_bisect_splitter_matches_reference(pages_data, chunk_size, overlap):
+    text = "\n".join(page['text'] for page in pages_data).strip()
+    processor = PDFProcessor()
+    expected = legacy_split_text_into_chunks(text, pages_data, chunk_size, overlap)
+
+    assert as_dicts(processor.split_text_into_chunks(text, pages_data, chunk_size, overlap)) == expected
+    assert as_dicts(processor.iter_text_chunks(pages_data, chunk_size, overlap)) == expected